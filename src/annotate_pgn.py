@@ -0,0 +1,229 @@
+"""
+Annotate PGN games with engine evaluations.
+
+  python src/annotate_pgn.py games.pgn -o annotated.pgn --depth 22
+  python src/annotate_pgn.py database.pgn more.pgn -o annotated.pgn --movetime 500 --pool-size 8
+
+Every position of a game is searched on an EnginePool. A game is cut into
+contiguous runs of plies, one job each, and a job walks its run backwards
+on a single engine with the full move list (`position ... moves ...`), so
+each search finds the transposition table already filled by the search of
+the position after it. A long game is spread over every engine; in a
+database several games are in flight at once, each on as few engines as
+keeps the pool busy.
+
+Each move gets a [%eval] comment (White's point of view, after the move)
+and, when it lost enough winning chances, a ?!/?/?? NAG with the engine's
+choice. Games are written in input order as soon as they are done.
+"""
+import sys
+import math
+import time
+import logging
+import argparse
+import threading
+from collections import deque
+
+from utils.logging_setup import setup_console_logging
+from executor.bitboard import Position, WHITE
+from executor.engine_pool import EnginePool
+from executor.game_tracker import engine_position
+from executor.pgn import read_games, format_pgn
+
+logger = logging.getLogger(__name__)
+
+MATE_SCORE = 100000
+# Losses in winning chances (-1..1) that make a move an inaccuracy, mistake or blunder.
+JUDGEMENTS = ((0.3, 4, "Blunder"), (0.2, 2, "Mistake"), (0.1, 6, "Inaccuracy"))
+PROGRESS_INTERVAL = 5.0
+
+
+def winning_chances(score):
+    """Expected result (-1..1) for the side a centipawn (or MATE_SCORE-scaled) score belongs to."""
+    cp = max(-1000, min(1000, score))
+    return 2 / (1 + math.exp(-0.00368208 * cp)) - 1
+
+
+def score_of(result):
+    """Side-to-move score in centipawns, mates mapped near +-MATE_SCORE."""
+    mate = result.get("score_mate")
+    if mate is not None:
+        return MATE_SCORE - abs(mate) if mate > 0 else -MATE_SCORE + abs(mate)
+    return result.get("score_cp")
+
+
+def format_eval(result, turn):
+    """[%eval] value from White's point of view."""
+    sign = 1 if turn == WHITE else -1
+    mate = result.get("score_mate")
+    if mate is not None:
+        return f"#{sign * mate}"
+    return f"{sign * result['score_cp'] / 100:.2f}"
+
+
+class GameJob:
+    """The positions of one game, their analyses, and how they are split across engines."""
+
+    def __init__(self, number, game):
+        self.number = number
+        self.game = game
+        self.positions = [Position(game.root_fen)]
+        for uci in game.moves:
+            self.positions.append(self.positions[-1].copy())
+            self.positions[-1].push_uci(uci)
+        self.results = [None] * len(self.positions)
+        self.remaining = 0
+        self.done = threading.Event()
+
+    def segments(self, count):
+        """Split the position indices into `count` contiguous runs."""
+        n = len(self.positions)
+        count = max(1, min(count, n))
+        bounds = [n * i // count for i in range(count + 1)]
+        return [range(bounds[i], bounds[i + 1]) for i in range(count)]
+
+
+class Annotator:
+    def __init__(self, pool, go):
+        self.pool = pool
+        self.go = go
+        self.searched = 0
+        self._lock = threading.Lock()
+
+    def _analyse_segment(self, job, indices, supervisor):
+        root, moves = job.game.root_fen, job.game.moves
+        for i in reversed(indices):
+            position = job.positions[i]
+            if position.is_checkmate():
+                result = {"score_mate": 0, "best_move": None}
+            elif position.is_stalemate():
+                result = {"score_cp": 0, "best_move": None}
+            else:
+                result = supervisor.search(engine_position(root, moves[:i]), self.go)
+            job.results[i] = result
+            with self._lock:
+                self.searched += 1
+
+    def _segment_done(self, job, future):
+        if future.exception():
+            logger.error("Game %s: analysis failed: %s", job.number, future.exception())
+        with self._lock:
+            job.remaining -= 1
+            finished = job.remaining == 0
+        if finished:
+            job.done.set()
+
+    def submit(self, job, engines):
+        segments = job.segments(engines)
+        job.remaining = len(segments)
+        for indices in segments:
+            future = self.pool.submit(lambda supervisor, indices=indices: self._analyse_segment(job, indices, supervisor))
+            future.add_done_callback(lambda f: self._segment_done(job, f))
+
+    def run(self, games, write):
+        """Annotate `games` (an iterable of PgnGame), calling write(job) for each in input order."""
+        in_flight = deque()
+        numbered = enumerate(games, 1)
+        while True:
+            added = []
+            while len(in_flight) < self.pool.size:
+                item = next(numbered, None)
+                if item is None:
+                    break
+                added.append(GameJob(*item))
+                in_flight.append(added[-1])
+            # A lone game is split over every engine; with a full window each game gets one.
+            for job in added:
+                self.submit(job, max(1, self.pool.size // len(in_flight)))
+            if not in_flight:
+                return
+            job = in_flight.popleft()
+            job.done.wait()
+            write(job)
+
+
+def annotate(job):
+    """(comments, nags) for the moves of a finished GameJob."""
+    comments, nags = {}, {}
+    positions, results = job.positions, job.results
+    for i, uci in enumerate(job.game.moves):
+        before, after = results[i], results[i + 1]
+        if before is None or after is None or score_of(after) is None:
+            continue
+        # No eval after a mating move; the result says it all.
+        text = "" if positions[i + 1].is_checkmate() else f"[%eval {format_eval(after, positions[i + 1].turn)}]"
+        best = before.get("best_move")
+        if best and best != uci and score_of(before) is not None:
+            loss = winning_chances(score_of(before)) - winning_chances(-score_of(after))
+            for threshold, nag, name in JUDGEMENTS:
+                if loss >= threshold:
+                    nags[i] = nag
+                    text = f"{text} {name}. {positions[i].san(positions[i].parse_uci(best))} was best.".strip()
+                    break
+        comments[i] = text
+    return comments, nags
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Annotate PGN games with engine evaluations and mistakes.")
+    parser.add_argument("pgn", nargs="+", help="PGN files (any number of games each)")
+    parser.add_argument("-o", "--output", help="annotated PGN to write (default: stdout)")
+    limits = parser.add_mutually_exclusive_group()
+    limits.add_argument("--depth", type=int, default=18, help="search depth per position (default: 18)")
+    limits.add_argument("--movetime", type=int, help="milliseconds per position instead of a fixed depth")
+    parser.add_argument("--pool-size", type=int, default=None, help="engines to run (default: pool_size from the batch profile)")
+    args = parser.parse_args()
+
+    setup_console_logging()
+    go = f"movetime {args.movetime}" if args.movetime else f"depth {args.depth}"
+    pool = EnginePool(size=args.pool_size).start()
+    annotator = Annotator(pool, go)
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    started = time.perf_counter()
+    totals = {"games": 0, "plies": 0, 2: 0, 4: 0, 6: 0}
+    stop_progress = threading.Event()
+
+    def progress():
+        while not stop_progress.wait(PROGRESS_INTERVAL):
+            elapsed = time.perf_counter() - started
+            logger.info("%d games written, %d positions searched (%.1f/s)", totals["games"], annotator.searched,
+                        annotator.searched / elapsed)
+
+    def write(job):
+        comments, nags = annotate(job)
+        headers = dict(job.game.headers, Annotator=f"ChessPilot ({go})")
+        output.write(format_pgn(job.game.moves, job.game.root_fen, headers, comments, job.game.result, nags) + "\n")
+        output.flush()
+        totals["games"] += 1
+        totals["plies"] += len(job.game.moves)
+        for nag in nags.values():
+            totals[nag] += 1
+        white, black = job.game.headers.get("White", "?"), job.game.headers.get("Black", "?")
+        logger.info("Game %d (%s - %s): %d plies, %d inaccuracies, %d mistakes, %d blunders", job.number, white, black,
+                    len(job.game.moves), *(sum(1 for n in nags.values() if n == nag) for nag in (6, 2, 4)))
+
+    def games():
+        for path in args.pgn:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                yield from read_games(f)
+
+    threading.Thread(target=progress, name="progress", daemon=True).start()
+    try:
+        annotator.run(games(), write)
+    except KeyboardInterrupt:
+        logger.info("Interrupted")
+    except OSError as e:
+        logger.error(str(e))
+    finally:
+        stop_progress.set()
+        pool.shutdown()
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.perf_counter() - started
+    logger.info("%d games, %d plies in %.1fs (%.1f positions/s): %d inaccuracies, %d mistakes, %d blunders",
+                totals["games"], totals["plies"], elapsed, annotator.searched / elapsed if elapsed else 0,
+                totals[6], totals[2], totals[4])
+
+
+if __name__ == "__main__":
+    main()
@@ -52,6 +52,7 @@ def auto_move_loop(app):
             continue
 
         placement, active_color = current_fen.split()[:2]
+        tracked_moves = app.game_tracker.update(current_fen)
 
         if active_color == opp_color:
             if _handle_opponent_turn(opp_color, placement, app.last_fen_by_color):
@@ -59,14 +60,23 @@ def auto_move_loop(app):
 
         elif active_color == color_indicator:
             if _handle_player_turn(opp_color, placement, app.last_fen_by_color):
+                search_fen, history = current_fen, None
+                if tracked_moves is not None:
+                    tracked = app.game_tracker.search_args(color_indicator)
+                    if tracked is None:
+                        logger.debug("Board changed but the game tracker has the opponent to move.")
+                        time.sleep(screenshot_interval)
+                        continue
+                    search_fen, history = tracked
+
                 delay = _get_realistic_delay(app, last_opponent_move_time)
-                logger.info(f"Waiting for {delay:.2f} seconds before making a move.")
+                logger.info("Waiting for %.2f seconds before making a move.", delay)
                 time.sleep(delay)
 
-                move_data = get_best_move(22, current_fen)
+                move_data = get_best_move(22, search_fen, history=history)
                 if move_data and move_data[0]:
                     best_move = move_data[0]
-                    threading.Thread(target=process_move, args=(app, best_move), daemon=True).start()
+                    threading.Thread(target=process_move, args=(app, best_move), name="process-move", daemon=True).start()
 
         elapsed_time = time.time() - start_time
         sleep_time = max(0, screenshot_interval - elapsed_time)
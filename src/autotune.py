@@ -0,0 +1,47 @@
+import os
+import sys
+import argparse
+import logging
+from pathlib import Path
+
+from utils.logging_setup import setup_console_logging
+from utils.chess_resources_manager import find_stockfish_executable
+from executor.get_best_move import CONFIG_FILE, read_engine_config
+from executor.engine_autotune import autotune, write_engine_config
+
+logger = logging.getLogger(__name__)
+
+# Hash/Threads are owned by the tuned profiles; keep every other shared line.
+_TUNED_OPTIONS = ("name Hash ", "name Threads ")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Stockfish on this machine and tune engine_config.txt.")
+    parser.add_argument("--depth", type=int, default=12, help="bench depth per position (default: 12)")
+    parser.add_argument("--pool-size", type=int, default=None, help="number of batch engines to tune for (default: cores - 1)")
+    parser.add_argument("--config", default=CONFIG_FILE, help=f"config file to write (default: {CONFIG_FILE})")
+    parser.add_argument("--dry-run", action="store_true", help="print the results without writing the config")
+    args = parser.parse_args()
+
+    setup_console_logging()
+    stockfish_path = find_stockfish_executable(Path(os.path.dirname(os.path.abspath(__file__))))
+    if not stockfish_path:
+        sys.exit(1)
+
+    profiles = autotune(stockfish_path, depth=args.depth, pool_size=args.pool_size)
+    for name in ("interactive", "batch"):
+        logger.info("%s: %s", name, profiles[name])
+    if args.dry_run:
+        return
+
+    common_lines = []
+    if os.path.exists(args.config):
+        commands, settings = read_engine_config(profile=None, config_path=args.config)
+        common_lines = [line for line in commands if not any(opt in line for opt in _TUNED_OPTIONS)]
+        # ChessPilot's own keys (hot_spare, pool_size) come back separately.
+        common_lines += [f"{key} {value}" for key, value in settings.items()]
+    write_engine_config(args.config, profiles, common_lines)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+"""
+Recognize and analyse a folder of board screenshots.
+
+  python src/batch_analyze.py screenshots/ -o results.jsonl --depth 18
+  python src/batch_analyze.py "shots/**/*.png" -o results.jsonl --checkpoint results.ckpt
+
+Images are read in a fixed order (sorted directory walk or sorted glob matches),
+decoded by a few threads, recognized in batches with get_positions_batch,
+and every distinct position (by Zobrist key) is searched once on an
+EnginePool. A line is written to the JSONL output as soon as its image is
+done:
+
+  {"file": "...", "fen": "...", "color": "w", "best_move": "e2e4", "score_cp": 31, "depth": 18,
+   "pv": [...], "cached": false, "timings": {"decode": 0.004, "recognize": 0.021, "engine": 0.412}}
+
+Images without a board get {"file": ..., "error": "..."}. The checkpoint
+records which images are done and how much of the output was written, so
+an interrupted run picks up where it stopped; an existing output without a
+checkpoint is only replaced with --overwrite. Work in flight, the result
+cache and the checkpoint are all bounded, so memory stays flat however
+many images there are.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from utils.logging_setup import setup_console_logging
+from utils.chess_resources_manager import setup_resources
+from board_detection import get_positions_batch, get_fen_from_position, load_model, warm_up, ModelNotFoundError
+from board_detection.side_detector import detect_side_from_fen
+from board_detection.vision_worker import start_vision_service, stop_vision_service
+from executor.bitboard import Position, repair_fen
+from executor.engine_pool import EnginePool
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".webp")
+CHECKPOINT_INTERVAL = 2.0
+RESULT_FIELDS = ("best_move", "ponder", "score_cp", "score_mate", "mate_flag", "depth", "nodes", "pv", "updated_fen")
+
+
+def iter_images(source):
+    """
+    Image paths under a directory (sorted walk) or matching a glob (sorted),
+    always in the same order: the checkpoint records positions in it.
+    """
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    yield os.path.join(root, name)
+    else:
+        # Only the path strings are held; glob order depends on the filesystem.
+        for path in sorted(glob.glob(source, recursive=True)):
+            if path.lower().endswith(IMAGE_EXTENSIONS):
+                yield path
+
+
+class Checkpoint:
+    """
+    Completed image indices as a contiguous prefix plus the few finished
+    out of order, and the output size they account for. Saved atomically.
+    """
+
+    def __init__(self, path, source):
+        self.path = path
+        self.source = source
+        self.done_through = -1
+        self.extra = set()
+        self.output_size = 0
+        self._last_save = 0.0
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return self
+        with open(self.path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("source") != self.source:
+            raise ValueError(f"Checkpoint {self.path} belongs to {state.get('source')}, not {self.source}")
+        self.done_through = state["done_through"]
+        self.extra = set(state["extra"])
+        self.output_size = state["output_size"]
+        return self
+
+    def is_done(self, index):
+        return index <= self.done_through or index in self.extra
+
+    def mark(self, index):
+        self.extra.add(index)
+        while self.done_through + 1 in self.extra:
+            self.done_through += 1
+            self.extra.discard(self.done_through)
+
+    def save(self, output_size, force=False):
+        now = time.monotonic()
+        if not self.path or (not force and now - self._last_save < CHECKPOINT_INTERVAL):
+            return
+        self.output_size = output_size
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"source": self.source, "done_through": self.done_through, "extra": sorted(self.extra),
+                       "output_size": output_size}, f)
+        os.replace(tmp, self.path)
+        self._last_save = now
+
+
+class BatchAnalyzer:
+    def __init__(self, pool, output, checkpoint, depth=None, movetime=None, color="auto",
+                 max_in_flight=None, cache_size=50000):
+        self.pool = pool
+        self.output = output
+        self.checkpoint = checkpoint
+        self.depth = depth
+        self.movetime = movetime
+        self.color = color
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        # Positions being searched, with the images waiting for each.
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.max_in_flight = max_in_flight or 2 * pool.size
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        # Set on interrupt: searches cut short are redone on resume, not recorded.
+        self.closing = False
+        self.stats = {"images": 0, "no_board": 0, "searches": 0, "cache_hits": 0, "errors": 0}
+
+    def _write(self, index, record):
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            self.output.write(line)
+            self.output.flush()
+            self.checkpoint.mark(index)
+            self.checkpoint.save(self.output.tell())
+
+    def _recognize(self, boxes):
+        color = self.color
+        if color not in ("w", "b"):
+            detected = get_fen_from_position("w", boxes)
+            if not detected:
+                return None, None
+            color = detect_side_from_fen(detected[3])
+        extracted = get_fen_from_position(color, boxes)
+        return (extracted[3], color) if extracted else (None, None)
+
+    def _finish(self, key, future):
+        try:
+            result = future.result()
+            analysis = {field: result[field] for field in RESULT_FIELDS if result.get(field) is not None}
+            error = None
+        except Exception as e:
+            analysis, error = None, str(e)
+        with self._lock:
+            waiting = self._pending.pop(key)
+            if analysis is not None:
+                self._cache[key] = analysis
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            elif not self.closing:
+                self.stats["errors"] += len(waiting)
+        try:
+            if self.closing:
+                return
+            for i, (index, record) in enumerate(waiting):
+                if error:
+                    record["error"] = error
+                else:
+                    record.update(analysis)
+                    record["cached"] = i > 0
+                    record["timings"]["engine"] = result.get("elapsed") if i == 0 else 0.0
+                self._write(index, record)
+        finally:
+            # Released last so drain() also waits for the writes.
+            self._slots.release()
+
+    def _analyse(self, index, record):
+        fen = repair_fen(record["fen"])
+        if fen is None:
+            record["error"] = "impossible position"
+            self.stats["errors"] += 1
+            self._write(index, record)
+            return
+        # Report the position that was actually analysed.
+        record["fen"] = fen
+        key = Position(fen).zobrist_key()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached:
+                self._cache.move_to_end(key)
+            elif key in self._pending:
+                self._pending[key].append((index, record))
+                self.stats["cache_hits"] += 1
+                return
+        if cached:
+            self.stats["cache_hits"] += 1
+            record.update(cached, cached=True)
+            record["timings"]["engine"] = 0.0
+            self._write(index, record)
+            return
+        # Blocks while the pool has enough work queued.
+        self._slots.acquire()
+        with self._lock:
+            self._pending[key] = [(index, record)]
+        self.stats["searches"] += 1
+        future = self.pool.analyse(fen, depth=self.depth, movetime=self.movetime)
+        future.add_done_callback(lambda f: self._finish(key, f))
+
+    def run_batch(self, batch, decoder):
+        """Recognize a batch of (index, path) and hand each board to the engines."""
+        started = time.perf_counter()
+        decoded = list(decoder.map(_decode, [path for _, path in batch]))
+        decode_time = (time.perf_counter() - started) / len(batch)
+        images = [image for image, _ in decoded if image is not None]
+        started = time.perf_counter()
+        positions = iter(get_positions_batch(images)) if images else iter(())
+        recognize_time = (time.perf_counter() - started) / max(1, len(images))
+
+        for (index, path), (image, error) in zip(batch, decoded):
+            self.stats["images"] += 1
+            record = {"file": path}
+            if image is None:
+                record["error"] = error
+                self.stats["errors"] += 1
+                self._write(index, record)
+                continue
+            boxes, _, _ = next(positions)
+            fen, color = self._recognize(boxes) if boxes else (None, None)
+            if not fen:
+                record["error"] = "no board detected"
+                self.stats["no_board"] += 1
+                self._write(index, record)
+                continue
+            record.update(fen=fen, color=color, timings={"decode": decode_time, "recognize": recognize_time})
+            self._analyse(index, record)
+
+    def drain(self):
+        """Wait for every search still running."""
+        for _ in range(self.max_in_flight):
+            self._slots.acquire()
+        for _ in range(self.max_in_flight):
+            self._slots.release()
+
+
+def open_output(path, checkpoint, overwrite=False):
+    """
+    Open the JSONL output positioned after the lines `checkpoint` accounts
+    for. Lines written after the last checkpoint are dropped (those images
+    are redone); an output the checkpoint knows nothing about raises
+    FileExistsError unless `overwrite` is set.
+    """
+    if overwrite and os.path.exists(checkpoint.path):
+        os.unlink(checkpoint.path)
+    if overwrite or not os.path.exists(path):
+        return open(path, "w", encoding="utf-8")
+    if os.path.getsize(path) and not os.path.exists(checkpoint.path):
+        raise FileExistsError(f"{path} exists but {checkpoint.path} does not; pass --overwrite to replace it")
+    output = open(path, "r+", encoding="utf-8")
+    output.truncate(checkpoint.output_size)
+    output.seek(checkpoint.output_size)
+    return output
+
+
+def _decode(path):
+    try:
+        image = Image.open(path).convert("RGB")
+        return image, None
+    except OSError as e:
+        return None, f"cannot read image: {e}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recognize and analyse every board screenshot in a folder.")
+    parser.add_argument("source", help="directory (searched recursively) or glob pattern, e.g. 'shots/**/*.png'")
+    parser.add_argument("-o", "--output", required=True, help="JSONL file to write; continued when resuming")
+    parser.add_argument("--checkpoint", help="checkpoint file for resuming (default: <output>.ckpt)")
+    parser.add_argument("--depth", type=int, default=15, help="search depth (default: 15)")
+    parser.add_argument("--movetime", type=int, help="milliseconds per position instead of a fixed depth")
+    parser.add_argument("--color", choices=("auto", "w", "b"), default="auto", help="side at the bottom (default: auto)")
+    parser.add_argument("--pool-size", type=int, default=None, help="engines to run (default: pool_size from the batch profile)")
+    parser.add_argument("--batch-size", type=int, default=8, help="images per inference call (default: 8)")
+    parser.add_argument("--decode-threads", type=int, default=4, help="threads decoding images (default: 4)")
+    parser.add_argument("--vision-workers", type=int, default=0,
+                        help="recognize in N worker processes instead of in-process (default: 0)")
+    parser.add_argument("--overwrite", action="store_true", help="start over, replacing the output and its checkpoint")
+    parser.add_argument("--cache-size", type=int, default=50000, help="analysed positions kept for duplicates (default: 50000)")
+    args = parser.parse_args()
+
+    setup_console_logging()
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    if not setup_resources(src_dir, os.path.dirname(src_dir)):
+        sys.exit(1)
+    try:
+        if start_vision_service(args.vision_workers) is None:
+            load_model()
+            warm_up()
+    except (ModelNotFoundError, RuntimeError) as e:
+        logger.error(str(e))
+        sys.exit(1)
+
+    source = os.path.abspath(args.source) if os.path.isdir(args.source) else args.source
+    checkpoint = Checkpoint(args.checkpoint or args.output + ".ckpt", source)
+    try:
+        if not args.overwrite:
+            checkpoint.load()
+        output = open_output(args.output, checkpoint, overwrite=args.overwrite)
+    except (ValueError, KeyError, FileExistsError) as e:
+        logger.error("Cannot resume: %s", e)
+        sys.exit(1)
+    if checkpoint.done_through >= 0 or checkpoint.extra:
+        logger.info("Resuming after %d images", checkpoint.done_through + 1 + len(checkpoint.extra))
+
+    pool = EnginePool(size=args.pool_size).start()
+    analyzer = BatchAnalyzer(pool, output, checkpoint, depth=None if args.movetime else args.depth,
+                             movetime=args.movetime, color=args.color, cache_size=args.cache_size)
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.decode_threads, thread_name_prefix="decode") as decoder:
+            batch = []
+            for index, path in enumerate(iter_images(args.source)):
+                if checkpoint.is_done(index):
+                    continue
+                batch.append((index, path))
+                if len(batch) == args.batch_size:
+                    analyzer.run_batch(batch, decoder)
+                    batch = []
+            if batch:
+                analyzer.run_batch(batch, decoder)
+        analyzer.drain()
+    except KeyboardInterrupt:
+        logger.info("Interrupted; run again with the same arguments to resume")
+    finally:
+        analyzer.closing = True
+        pool.shutdown()
+        stop_vision_service()
+        with analyzer._lock:
+            checkpoint.save(output.tell(), force=True)
+        output.close()
+
+    elapsed = time.perf_counter() - started
+    stats = analyzer.stats
+    logger.info("%d images in %.1fs (%.1f/s): %d searches, %d duplicate positions, %d without a board, %d errors",
+                stats["images"], elapsed, stats["images"] / elapsed if elapsed else 0, stats["searches"],
+                stats["cache_hits"], stats["no_board"], stats["errors"])
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,2 @@
-from .get_positions import get_positions
+from .get_positions import get_positions, get_positions_batch, load_model, warm_up, ModelNotFoundError
 from .fen_extractor import get_fen_from_position
\ No newline at end of file
@@ -1,11 +1,12 @@
 import logging
 from .get_positions import get_positions
+from utils.metrics import timed
 
 # Setup Logger
 # Logger setup
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 
+@timed("fen")
 def get_fen_from_position(color, boxes):
     # Find the chessboard (class_id 12.0)
     chessboard_boxes = [box for box in boxes if box[5] == 12.0]
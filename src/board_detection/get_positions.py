@@ -1,31 +1,72 @@
-import numpy as np
-import onnxruntime as ort
 from PIL import Image
 from utils.resource_path import resource_path
-import sys
+from utils.metrics import timed, stage_timer
+from utils.profiling import allocation_snapshot
 import os
 import logging
+import threading
 
 # Logger setup
 logger = logging.getLogger("getpositions")
-logger.setLevel(logging.DEBUG)
-
-# Use the helper function to get the correct model path
-model_path = resource_path("chess_detection.onnx")
-if not os.path.exists(model_path):
-    logger.error(
-        "Missing chess_detection.onnx – please download and place it in the project root. "
-        "See README for instructions: https://github.com/OTAKUWeBer/ChessPilot/blob/main/README.md"
-    )
-    sys.exit(1)
-
-# Load the ONNX model from the correct path
-session = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
-input_name = session.get_inputs()[0].name
-output_name = session.get_outputs()[0].name
 
 conf = 0.7
 
+# The ONNX session is created on first use (or by load_model() from a
+# background thread) so importing this module stays cheap and a missing
+# model is reported instead of exiting the process.
+session = None
+input_name = None
+output_name = None
+# Whether the model accepts more than one image per run (dynamic batch axis).
+batch_capable = False
+_session_lock = threading.Lock()
+# A VisionService serving get_positions() from worker processes, if one is installed.
+remote = None
+
+
+class ModelNotFoundError(FileNotFoundError):
+    pass
+
+
+def load_model(threads=None):
+    """Create the ONNX session if needed and return it; `threads` caps intra-op threads (e.g. 1 per worker process)."""
+    global session, input_name, output_name, batch_capable
+    with _session_lock:
+        if session is not None:
+            return session
+
+        model_path = resource_path("chess_detection.onnx")
+        if not os.path.exists(model_path):
+            raise ModelNotFoundError(
+                "Missing chess_detection.onnx – please download and place it in the project root. "
+                "See README for instructions: https://github.com/OTAKUWeBer/ChessPilot/blob/main/README.md"
+            )
+
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        loaded = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        batch_dim = loaded.get_inputs()[0].shape[0]
+        batch_capable = not isinstance(batch_dim, int) or batch_dim > 1
+        input_name = loaded.get_inputs()[0].name
+        output_name = loaded.get_outputs()[0].name
+        session = loaded
+        logger.info("Loaded detection model from %s", model_path)
+        return session
+
+
+def warm_up():
+    """Run one inference on a blank frame so the first real capture is not slowed by lazy allocations."""
+    import numpy as np
+    model = load_model()
+    model.run([output_name], {input_name: np.zeros((1, 3, 640, 640), dtype=np.float32)})
+
+
+def is_model_loaded():
+    return session is not None
+
 def letterbox_resize(image, target_size):
     """
     Resizes the image to fit within the target_size, maintaining the aspect ratio.
@@ -47,10 +88,12 @@ def letterbox_resize(image, target_size):
 
     return padded, x_offset, y_offset, scale
 
+@timed("preprocess")
 def preprocess_image(image):
     """
     Prepares the image for model inference by resizing, normalizing, and formatting.
     """
+    import numpy as np
     image, x_offset, y_offset, scale = letterbox_resize(image, 640)
     image = np.array(image).astype(np.float32) / 255.0  # Normalize
     image = image.transpose(2, 0, 1)  # HWC to CHW
@@ -71,22 +114,41 @@ def scale_bbox(detection, x_offset, y_offset, scale):
     scaled[:4] = [new_x, new_y, new_w, new_h]
     return scaled
 
+@timed("predict")
 def predict(image):
     """
     Runs model inference and returns processed detections.
     """
+    import numpy as np
+    model = load_model()
     img_array, x_offset, y_offset, scale = preprocess_image(image)
-    output = session.run([output_name], {input_name: img_array})[0]
-    output = np.squeeze(output)
-    
+    with stage_timer("inference"), allocation_snapshot("inference"):
+        output = model.run([output_name], {input_name: img_array})[0]
+    with stage_timer("decode"):
+        return decode_detections(np.squeeze(output), x_offset, y_offset, scale)
+
+def decode_detections(output, x_offset, y_offset, scale):
     detections = []
     for r in output:
         if r[4] > conf:
             scaled = scale_bbox(r, x_offset, y_offset, scale)
             detections.append(scaled.tolist())  # Convert to list for compatibility
-    
     return detections
 
+@timed("predict_batch")
+def predict_batch(images):
+    """predict() for several images with one inference call when the model has a batch axis."""
+    import numpy as np
+    model = load_model()
+    if not batch_capable:
+        return [predict(image) for image in images]
+    prepared = [preprocess_image(image) for image in images]
+    batch = np.concatenate([p[0] for p in prepared])
+    with stage_timer("inference"), allocation_snapshot("inference"):
+        output = model.run([output_name], {input_name: batch})[0]
+    with stage_timer("decode"):
+        return [decode_detections(rows, *p[1:]) for rows, p in zip(output, prepared)]
+
 def get_positions(image_input):
     """
     Handles image loading, executes prediction, and returns detections, midpoints, and offset.
@@ -100,7 +162,14 @@ def get_positions(image_input):
         print(f"Error loading image: {e}")
         return None, None, None
 
-    predictions = predict(image)
+    service = remote
+    try:
+        if service is not None:
+            return service.get_positions(image)
+        predictions = predict(image)
+    except (ModelNotFoundError, RuntimeError) as e:
+        logger.error(str(e))
+        return None, None, None
     if not predictions:
         return None, None, None
 
@@ -108,6 +177,18 @@ def get_positions(image_input):
 
     return predictions, midpoints, drag_offset
 
+def get_positions_batch(images):
+    """get_positions() over a list of PIL images; returns one (detections, midpoints, offset) per image."""
+    service = remote
+    try:
+        if service is not None:
+            return service.get_positions_batch(images)
+        batch = predict_batch(images)
+    except (ModelNotFoundError, RuntimeError) as e:
+        logger.error(str(e))
+        return [(None, None, None)] * len(images)
+    return [(p, *calculate_midpoints_and_offset(p)) if p else (None, None, None) for p in batch]
+
 def calculate_midpoints_and_offset(detections):
     """
     Calculates the midpoints of each square and a drag offset.
@@ -1,14 +1,13 @@
 import logging
 
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 
 def detect_side_from_fen(fen):
     """
     Detects which side is at the bottom of the board based on the FEN.
     The side with more pieces on its starting side of the board is considered to be at the bottom.
     """
-    logger.info(f"Detecting side from FEN: {fen}")
+    logger.debug("Detecting side from FEN: %s", fen)
     piece_placement = fen.split(' ')[0]
     rows = piece_placement.split('/')
 
@@ -26,8 +25,8 @@ def detect_side_from_fen(fen):
             else:
                 black_pieces_bottom += 1
 
-    logger.info(f"White pieces on bottom half: {white_pieces_bottom}")
-    logger.info(f"Black pieces on bottom half: {black_pieces_bottom}")
+    logger.debug("White pieces on bottom half: %d", white_pieces_bottom)
+    logger.debug("Black pieces on bottom half: %d", black_pieces_bottom)
 
     if white_pieces_bottom > black_pieces_bottom:
         return 'w'
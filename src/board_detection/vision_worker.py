@@ -0,0 +1,383 @@
+"""
+Board recognition in separate worker processes.
+
+Inference and preprocessing hold the GIL for most of a frame, so running
+them next to the Tk mainloop makes the window stutter. A VisionService
+starts one or more worker processes, each with its own ONNX session, and
+hands them frames through a multiprocessing.shared_memory ring: the
+client copies the raw RGB pixels into a free slot and sends only
+(request id, op, slot, size) down a pipe; the worker reads the pixels in
+place and replies with the detections. Nothing large is pickled.
+
+Once installed with set_vision_service(), get_positions() and
+get_positions_batch() are served by the workers; a batch is spread over
+all of them. Enable it with --vision-workers N or CHESSPILOT_VISION_WORKERS.
+A worker that does not answer within the service's timeout is killed and
+respawned, and the requests it held fail with VisionWorkerError.
+"""
+import os
+import time
+import importlib
+import logging
+import threading
+import itertools
+import multiprocessing
+from queue import Queue, Empty
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+ENV_VAR = "CHESSPILOT_VISION_WORKERS"
+# Slots in flight per worker: one being recognized, one being filled.
+SLOTS_PER_WORKER = 2
+# Frames are rounded up to this so a slightly larger window does not regrow the ring.
+SLOT_ROUNDING = 1 << 20
+# A worker that has not answered a frame in this many seconds is considered
+# hung: it is killed and respawned, and its requests fail.
+REQUEST_TIMEOUT = 30.0
+
+
+class VisionWorkerError(RuntimeError):
+    pass
+
+
+def _worker_main(conn, ring_name, slot_bytes, threads):
+    """Worker process: recognize frames from the ring until told to stop."""
+    from PIL import Image
+    from board_detection.get_positions import load_model, warm_up, get_positions
+    from board_detection.fen_extractor import get_fen_from_position
+    logging.getLogger("board_detection.fen_extractor").setLevel(logging.ERROR)
+
+    ring = shared_memory.SharedMemory(name=ring_name)
+    try:
+        load_model(threads=threads)
+        warm_up()
+    except Exception as e:
+        conn.send((None, False, f"{type(e).__name__}: {e}"))
+        return
+    conn.send((None, True, "ready"))
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        if message[0] == "attach":
+            # The client grew the ring; every older request has been answered.
+            ring.close()
+            ring = shared_memory.SharedMemory(name=message[1])
+            slot_bytes = message[2]
+            continue
+        request_id, op, slot, size, color = message
+        start = slot * slot_bytes
+        view = ring.buf[start:start + size[0] * size[1] * 3]
+        image = None
+        try:
+            image = Image.frombuffer("RGB", size, view, "raw", "RGB", 0, 1)
+            result = get_positions(image)
+            if op == "recognize":
+                boxes = result[0]
+                result += (get_fen_from_position(color, boxes) if boxes else None,)
+            reply = (request_id, True, result)
+        except Exception as e:
+            reply = (request_id, False, f"{type(e).__name__}: {e}")
+        finally:
+            image = None
+            try:
+                view.release()
+            except BufferError:
+                pass
+        conn.send(reply)
+    ring.close()
+
+
+class _Worker:
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.send_lock = threading.Lock()
+        self.failed = False
+        # request id -> (future, slot, time sent)
+        self.pending = {}
+
+
+class VisionService:
+    """Pool of recognition processes fed through a shared-memory frame ring."""
+
+    def __init__(self, workers=1, threads=None, timeout=REQUEST_TIMEOUT):
+        self.size = workers
+        self.timeout = timeout
+        # Cores are shared out between the workers unless told otherwise.
+        self.threads = threads or max(1, (os.cpu_count() or 1) // workers)
+        self.slots = SLOTS_PER_WORKER * workers
+        self._context = multiprocessing.get_context("spawn")
+        self._workers = []
+        self._free = Queue()
+        self._ring = None
+        self._slot_bytes = 0
+        self._ids = itertools.count()
+        # Guards the worker list and the ring name; _ring_lock serializes resizes.
+        self._lock = threading.Lock()
+        self._ring_lock = threading.Lock()
+        self._closing = False
+        self._receiver = None
+        self._stats_lock = threading.Lock()
+        self.stats = {"frames": 0, "errors": 0, "restarts": 0, "resizes": 0, "timeouts": 0}
+
+    def start(self, slot_bytes=1920 * 1080 * 3, timeout=120.0):
+        """Create the ring, spawn the workers and wait until each has loaded the model."""
+        self._create_ring(slot_bytes)
+        for slot in range(self.slots):
+            self._free.put(slot)
+        self._workers = [self._spawn() for _ in range(self.size)]
+        for worker in self._workers:
+            if not worker.conn.poll(timeout):
+                self.close()
+                raise VisionWorkerError("Vision worker did not start in time")
+            try:
+                _, ok, detail = worker.conn.recv()
+            except EOFError:
+                ok, detail = False, f"exited with code {worker.process.exitcode}"
+            if not ok:
+                self.close()
+                raise VisionWorkerError(f"Vision worker failed to start: {detail}")
+        self._receiver = threading.Thread(target=self._receive, name="vision-results", daemon=True)
+        self._receiver.start()
+        logger.info("Vision service ready with %d workers (%d threads each)", self.size, self.threads)
+        return self
+
+    def _create_ring(self, nbytes):
+        slot_bytes = -(-nbytes // SLOT_ROUNDING) * SLOT_ROUNDING
+        ring = shared_memory.SharedMemory(create=True, size=slot_bytes * self.slots)
+        with self._lock:
+            previous, self._ring, self._slot_bytes = self._ring, ring, slot_bytes
+            for worker in self._workers:
+                with worker.send_lock:
+                    worker.conn.send(("attach", ring.name, slot_bytes))
+        if previous is not None:
+            previous.close()
+            previous.unlink()
+
+    def _spawn(self):
+        parent, child = self._context.Pipe()
+        with self._lock:
+            args = (child, self._ring.name, self._slot_bytes, self.threads)
+        process = self._context.Process(target=_worker_main, args=args, name="vision-worker", daemon=True)
+        process.start()
+        child.close()
+        return _Worker(process, parent)
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def get_stats(self):
+        with self._stats_lock:
+            return dict(self.stats)
+
+    def _take_slot(self):
+        """A free ring slot; if none frees up in time the workers holding them are hung."""
+        try:
+            return self._free.get(timeout=self.timeout)
+        except Empty:
+            self._kill_stalled()
+            raise VisionWorkerError(f"No frame slot freed up in {self.timeout:.0f} s") from None
+
+    def _kill_stalled(self, future=None):
+        """
+        Kill the worker holding `future` (or every worker with a request
+        older than the timeout); the receiver then fails its requests and
+        respawns it.
+        """
+        deadline = time.monotonic() - self.timeout
+
+        def stalled_request(f, sent):
+            return f is future if future is not None else sent <= deadline
+
+        with self._lock:
+            stalled = [worker for worker in self._workers
+                       if any(stalled_request(f, sent) for f, _, sent in worker.pending.values())]
+        for worker in stalled:
+            logger.error("Vision worker %s did not answer in %.0f s; killing it", worker.process.pid, self.timeout)
+            self._count("timeouts")
+            worker.process.kill()
+
+    def _result(self, future):
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            if future.done():
+                return future.result()
+            self._kill_stalled(future)
+            raise VisionWorkerError(f"Vision worker did not answer in {self.timeout:.0f} s") from None
+
+    def _resize(self, nbytes):
+        """Grow the slots to `nbytes`; waits until every frame in flight is answered."""
+        taken = []
+        try:
+            for _ in range(self.slots):
+                taken.append(self._take_slot())
+            self._create_ring(nbytes)
+            self._count("resizes")
+            logger.info("Vision ring grown to %.1f MB per frame", self._slot_bytes / 1e6)
+        finally:
+            for slot in taken:
+                self._free.put(slot)
+
+    def _receive(self):
+        while not self._closing:
+            with self._lock:
+                conns = {worker.conn: worker for worker in self._workers}
+            for conn in wait(list(conns), timeout=0.5):
+                worker = conns[conn]
+                try:
+                    request_id, ok, payload = conn.recv()
+                except (EOFError, OSError):
+                    self._restart(worker)
+                    continue
+                if request_id is None:
+                    # Start-up report from a restarted worker.
+                    if not ok:
+                        logger.error("Vision worker failed to start: %s", payload)
+                        worker.failed = True
+                    continue
+                with self._lock:
+                    future, slot, _ = worker.pending.pop(request_id)
+                self._free.put(slot)
+                if ok:
+                    future.set_result(payload)
+                else:
+                    self._count("errors")
+                    future.set_exception(VisionWorkerError(payload))
+
+    def _restart(self, worker):
+        with self._lock:
+            pending, worker.pending = worker.pending, {}
+        for future, slot, _ in pending.values():
+            self._free.put(slot)
+            future.set_exception(VisionWorkerError("Vision worker exited"))
+        worker.conn.close()
+        worker.process.join(timeout=1)
+        if self._closing:
+            return
+        if worker.failed:
+            # Restarting would fail the same way.
+            with self._lock:
+                self._workers.remove(worker)
+            return
+        logger.error("Vision worker exited with code %s; restarting", worker.process.exitcode)
+        self._count("restarts")
+        replacement = self._spawn()
+        with self._lock:
+            self._workers[self._workers.index(worker)] = replacement
+
+    def submit(self, image, op="positions", color="w"):
+        """Queue one PIL image; the Future resolves to get_positions()'s tuple ("recognize" adds the FEN tuple)."""
+        if self._closing:
+            raise VisionWorkerError("Vision service is closed")
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        nbytes = image.size[0] * image.size[1] * 3
+        with self._ring_lock:
+            if nbytes > self._slot_bytes:
+                self._resize(nbytes)
+            # Blocks while every slot is in flight.
+            slot = self._take_slot()
+        start = slot * self._slot_bytes
+        self._ring.buf[start:start + nbytes] = image.tobytes()
+        future = Future()
+        with self._lock:
+            if not self._workers:
+                self._free.put(slot)
+                raise VisionWorkerError("No vision worker running")
+            worker = min(self._workers, key=lambda w: len(w.pending))
+            request_id = next(self._ids)
+            worker.pending[request_id] = (future, slot, time.monotonic())
+        self._count("frames")
+        try:
+            with worker.send_lock:
+                worker.conn.send((request_id, op, slot, image.size, color))
+        except OSError:
+            # The receiver notices the dead worker and fails the request.
+            pass
+        return future
+
+    def get_positions(self, image):
+        with metrics.timer("vision_worker"):
+            return self._result(self.submit(image))
+
+    def get_positions_batch(self, images):
+        futures = [self.submit(image) for image in images]
+        return [self._result(future) for future in futures]
+
+    def recognize(self, image, color):
+        """(detections, midpoints, drag offset, get_fen_from_position result or None) in one round trip."""
+        with metrics.timer("vision_worker"):
+            return self._result(self.submit(image, "recognize", color))
+
+    def close(self):
+        self._closing = True
+        with self._lock:
+            workers = list(self._workers)
+        for worker in workers:
+            try:
+                with worker.send_lock:
+                    worker.conn.send(None)
+            except OSError:
+                pass
+        for worker in workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join()
+        if self._receiver is not None:
+            self._receiver.join()
+        for worker in workers:
+            for future, _, _ in worker.pending.values():
+                future.set_exception(VisionWorkerError("Vision service closed"))
+            worker.pending.clear()
+            worker.conn.close()
+        if self._ring is not None:
+            self._ring.close()
+            self._ring.unlink()
+            self._ring = None
+        logger.info("Vision service stats: %s", self.get_stats())
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_vision_service():
+    return _service
+
+
+def set_vision_service(service):
+    """Install `service` (closing the previous one) so get_positions() uses it; None goes back in-process."""
+    global _service
+    with _service_lock:
+        previous, _service = _service, service
+        # The package re-exports the get_positions function under the module's name.
+        importlib.import_module("board_detection.get_positions").remote = service
+    if previous is not None and previous is not service:
+        previous.close()
+    return service
+
+
+def start_vision_service(workers=None, threads=None):
+    """Start and install a service with `workers` processes (default: CHESSPILOT_VISION_WORKERS); None if 0."""
+    if workers is None:
+        workers = int(os.environ.get(ENV_VAR) or 0)
+    if workers <= 0:
+        return None
+    return set_vision_service(VisionService(workers, threads).start())
+
+
+def stop_vision_service():
+    set_vision_service(None)
@@ -0,0 +1,330 @@
+"""
+Synthetic board screenshot generator.
+
+Renders positions into screen-sized images with a random board theme, piece
+set, board size and placement, surrounding UI panels, last-move highlights
+and sensor noise, and writes a labels.jsonl next to them that
+vision_benchmark.py reads directly:
+
+  python src/board_generator.py out/ --count 5000 --pieces sprites/cburnett sprites/neo
+  python src/vision_benchmark.py out/
+
+Piece sets are folders of PNG sprites named wK.png, bQ.png, ... (the
+lichess/chess.com naming; lower-case piece letters work too). Without
+--pieces, pieces are drawn as plain silhouettes, or as chess glyphs when
+--font points at a font that has them. Positions come from --fens (one FEN
+or EPD per line) or from random games. Rendering runs in a process pool;
+each image depends only on --seed and its index, so runs are reproducible.
+The images/ folder also serves as a calibration set for model tooling.
+"""
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+from multiprocessing import Pool, cpu_count
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from utils.logging_setup import setup_console_logging
+from executor.bitboard import Position, STARTING_FEN
+
+logger = logging.getLogger(__name__)
+
+THEMES = {
+    "green": ((238, 238, 210), (118, 150, 86)),
+    "brown": ((240, 217, 181), (181, 136, 99)),
+    "blue": ((222, 227, 230), (140, 162, 173)),
+    "gray": ((220, 220, 220), (171, 171, 171)),
+    "purple": ((239, 239, 239), (136, 119, 183)),
+    "wood": ((230, 200, 150), (150, 100, 60)),
+}
+HIGHLIGHT = (246, 246, 105)
+BACKGROUNDS = [(49, 46, 43), (38, 36, 33), (22, 21, 18), (245, 245, 245), (48, 48, 48), (30, 34, 42)]
+GLYPHS = {"K": "♚", "Q": "♛", "R": "♜", "B": "♝", "N": "♞", "P": "♟"}
+
+# Silhouettes in unit-square coordinates, drawn when no sprites are given.
+_BASE = [(0.2, 0.8), (0.8, 0.8), (0.8, 0.9), (0.2, 0.9)]
+_SHAPES = {
+    "P": [("ellipse", (0.37, 0.2, 0.63, 0.46)), ("polygon", [(0.34, 0.8), (0.66, 0.8), (0.56, 0.44), (0.44, 0.44)])],
+    "R": [("polygon", [(0.3, 0.8), (0.7, 0.8), (0.65, 0.35), (0.35, 0.35)]),
+          ("polygon", [(0.27, 0.37), (0.73, 0.37), (0.73, 0.18), (0.64, 0.18), (0.64, 0.25), (0.55, 0.25),
+                       (0.55, 0.18), (0.45, 0.18), (0.45, 0.25), (0.36, 0.25), (0.36, 0.18), (0.27, 0.18)])],
+    "N": [("polygon", [(0.28, 0.8), (0.72, 0.8), (0.7, 0.45), (0.62, 0.18), (0.5, 0.12), (0.46, 0.2),
+                       (0.26, 0.38), (0.3, 0.48), (0.46, 0.42), (0.34, 0.62)])],
+    "B": [("ellipse", (0.35, 0.22, 0.65, 0.62)), ("ellipse", (0.45, 0.1, 0.55, 0.2)),
+          ("polygon", [(0.32, 0.8), (0.68, 0.8), (0.58, 0.55), (0.42, 0.55)])],
+    "Q": [("polygon", [(0.26, 0.8), (0.74, 0.8), (0.82, 0.22), (0.66, 0.48), (0.5, 0.16), (0.34, 0.48),
+                       (0.18, 0.22)])],
+    "K": [("polygon", [(0.28, 0.8), (0.72, 0.8), (0.76, 0.4), (0.24, 0.4)]),
+          ("polygon", [(0.46, 0.4), (0.54, 0.4), (0.54, 0.24), (0.64, 0.24), (0.64, 0.17), (0.54, 0.17),
+                       (0.54, 0.07), (0.46, 0.07), (0.46, 0.17), (0.36, 0.17), (0.36, 0.24), (0.46, 0.24)])],
+}
+
+NOISE_MARGIN = 64
+
+_sprite_cache = {}
+_noise = None
+_config = None
+
+
+def random_position(rng, max_plies=80):
+    """FEN after a random number of random legal moves from the start."""
+    position = Position(STARTING_FEN)
+    for _ in range(rng.randint(0, max_plies)):
+        moves = position.legal_moves()
+        if not moves:
+            break
+        position.push(rng.choice(moves))
+    return position.fen()
+
+
+def read_fens(path):
+    fens = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            fields = line.split(";")[0].split()
+            if len(fields) >= 4:
+                # EPD lines have no move counters.
+                fens.append(" ".join(fields[:6]) if len(fields) >= 6 else " ".join(fields[:4]) + " 0 1")
+    return fens
+
+
+def placement_grid(fen, color):
+    """8x8 rows of piece letters (None for empty) as seen on screen from `color`'s side."""
+    rows = []
+    for row in fen.split()[0].split("/"):
+        cells = []
+        for ch in row:
+            cells.extend([None] * int(ch) if ch.isdigit() else [ch])
+        rows.append(cells)
+    if color == "b":
+        rows = [list(reversed(row)) for row in reversed(rows)]
+    return rows
+
+
+def _load_sprites(folder, size):
+    key = (folder, size)
+    sprites = _sprite_cache.get(key)
+    if sprites is None:
+        sprites = {}
+        for piece in "PNBRQKpnbrqk":
+            prefix = "w" if piece.isupper() else "b"
+            for name in (f"{prefix}{piece.upper()}", f"{prefix}{piece.lower()}"):
+                path = os.path.join(folder, f"{name}.png")
+                if os.path.exists(path):
+                    sprites[piece] = Image.open(path).convert("RGBA").resize((size, size), Image.LANCZOS)
+                    break
+            else:
+                raise FileNotFoundError(f"{folder} has no sprite for {piece}")
+        _sprite_cache[key] = sprites
+    return sprites
+
+
+def _draw_silhouette(draw, piece, x, y, size):
+    white = piece.isupper()
+    fill, outline = ((248, 248, 248), (30, 30, 30)) if white else ((40, 40, 40), (230, 230, 230))
+    width = max(1, size // 28)
+    for kind, coords in _SHAPES[piece.upper()] + [("polygon", _BASE)]:
+        if kind == "ellipse":
+            x0, y0, x1, y1 = coords
+            draw.ellipse((x + x0 * size, y + y0 * size, x + x1 * size, y + y1 * size),
+                         fill=fill, outline=outline, width=width)
+        else:
+            draw.polygon([(x + px * size, y + py * size) for px, py in coords], fill=fill, outline=outline)
+
+
+def _draw_glyph(draw, font, piece, x, y, size):
+    white = piece.isupper()
+    draw.text((x + size / 2, y + size * 0.55), GLYPHS[piece.upper()], font=font, anchor="mm",
+              fill=(250, 250, 250) if white else (20, 20, 20), stroke_width=max(1, size // 30),
+              stroke_fill=(20, 20, 20) if white else (200, 200, 200))
+
+
+def _draw_clutter(draw, rng, width, height, board_box):
+    """Side panels, a move list and buttons around the board, like a chess site."""
+    bx, by, bsize = board_box
+    panel = tuple(min(255, c + rng.randint(8, 30)) for c in rng.choice(BACKGROUNDS))
+    text = (200, 200, 200) if sum(panel) < 384 else (40, 40, 40)
+    if width - (bx + bsize) > 120:
+        px = bx + bsize + rng.randint(10, 40)
+        pw = min(width - px - 10, rng.randint(200, 420))
+        draw.rectangle((px, by, px + pw, by + bsize), fill=panel)
+        for i in range(rng.randint(5, 25)):
+            ty = by + 20 + i * 22
+            if ty > by + bsize - 20:
+                break
+            draw.text((px + 12, ty), f"{i + 1}. {rng.choice('abcdefgh')}{rng.randint(1, 8)}", fill=text)
+        for _ in range(rng.randint(1, 4)):
+            bw = rng.randint(60, max(61, pw - 20))
+            btn_y = by + bsize - rng.randint(30, 120)
+            draw.rectangle((px + 10, btn_y, px + 10 + bw, btn_y + 24), fill=rng.choice(BACKGROUNDS))
+    if bx > 120:
+        draw.rectangle((rng.randint(0, 20), by, bx - rng.randint(10, 40), by + bsize // 3), fill=panel)
+    # Player name bars above and below the board.
+    for bar_y in (by - 34, by + bsize + 8):
+        if 0 <= bar_y and bar_y + 26 <= height:
+            draw.rectangle((bx, bar_y, bx + rng.randint(100, 240), bar_y + 26), fill=panel)
+            draw.text((bx + 8, bar_y + 7), f"Player{rng.randint(1, 9999)} ({rng.randint(800, 2800)})", fill=text)
+
+
+def _noise_crop(rng, width, height):
+    """Random window of a per-process noise field; generating noise per frame costs more than the rest of the render."""
+    global _noise
+    if _noise is None or _noise.size[0] < width + NOISE_MARGIN or _noise.size[1] < height + NOISE_MARGIN:
+        _noise = Image.effect_noise((width + NOISE_MARGIN, height + NOISE_MARGIN), 20).convert("RGB")
+    x, y = rng.randint(0, NOISE_MARGIN), rng.randint(0, NOISE_MARGIN)
+    return _noise.crop((x, y, x + width, y + height))
+
+
+def render(fen, color, rng, config):
+    width, height = config["screen"]
+    image = Image.new("RGB", (width, height), rng.choice(BACKGROUNDS))
+    draw = ImageDraw.Draw(image)
+
+    scale = rng.uniform(*config["board_scale"])
+    square = max(8, int(min(width, height) * scale) // 8)
+    bsize = square * 8
+    bx = rng.randint(0, width - bsize)
+    by = rng.randint(0, height - bsize)
+    if config["clutter"]:
+        _draw_clutter(draw, rng, width, height, (bx, by, bsize))
+
+    light, dark = THEMES[rng.choice(config["themes"])]
+    highlighted = set(rng.sample(range(64), 2)) if rng.random() < config["highlight"] else set()
+    for row in range(8):
+        for col in range(8):
+            base = light if (row + col) % 2 == 0 else dark
+            if row * 8 + col in highlighted:
+                base = tuple((b + h) // 2 for b, h in zip(base, HIGHLIGHT))
+            x, y = bx + col * square, by + row * square
+            draw.rectangle((x, y, x + square - 1, y + square - 1), fill=base)
+
+    piece_set = rng.choice(config["pieces"]) if config["pieces"] else None
+    sprites = _load_sprites(piece_set, square) if piece_set else None
+    font = ImageFont.truetype(config["font"], int(square * 0.85)) if config["font"] and not sprites else None
+    for row, cells in enumerate(placement_grid(fen, color)):
+        for col, piece in enumerate(cells):
+            if not piece:
+                continue
+            x, y = bx + col * square, by + row * square
+            if sprites:
+                image.paste(sprites[piece], (x, y), sprites[piece])
+            elif font:
+                _draw_glyph(draw, font, piece, x, y, square)
+            else:
+                _draw_silhouette(draw, piece, x, y, square)
+
+    if rng.random() < config["noise"]:
+        if rng.random() < 0.5:
+            image = image.filter(ImageFilter.GaussianBlur(rng.uniform(0.3, 1.2)))
+        image = Image.blend(image, _noise_crop(rng, width, height), rng.uniform(0.02, 0.12))
+    return image, (bx, by, bsize)
+
+
+def _init_worker(config):
+    global _config
+    _config = config
+
+
+def _generate(index):
+    config = _config
+    rng = random.Random(config["seed"] * 1_000_003 + index)
+    fens = config["fens"]
+    fen = fens[index % len(fens)] if fens else random_position(rng)
+    color = "b" if rng.random() < config["black_ratio"] else "w"
+    image, (bx, by, bsize) = render(fen, color, rng, config)
+
+    extension = "jpg" if config["jpeg_quality"] else "png"
+    name = f"images/{index:06d}.{extension}"
+    path = os.path.join(config["output"], name)
+    if config["jpeg_quality"]:
+        image.save(path, quality=config["jpeg_quality"])
+    else:
+        image.save(path, compress_level=1)
+    return {"image": name, "fen": fen, "color": color, "board": [bx, by, bsize]}
+
+
+def _parse_size(value):
+    try:
+        width, height = (int(v) for v in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("size must look like 1920x1080")
+    return width, height
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render labeled synthetic board screenshots.")
+    parser.add_argument("output", help="folder for images/ and labels.jsonl")
+    parser.add_argument("--count", type=int, default=1000, help="images to render (default: 1000)")
+    parser.add_argument("--fens", help="file with one FEN/EPD per line (default: random games)")
+    parser.add_argument("--screen", type=_parse_size, default=(1920, 1080), help="image size (default: 1920x1080)")
+    parser.add_argument("--board-scale", type=float, nargs=2, default=(0.4, 0.9), metavar=("MIN", "MAX"),
+                        help="board size as a fraction of the shorter screen side (default: 0.4 0.9)")
+    parser.add_argument("--themes", default=",".join(THEMES), help=f"comma-separated board themes (default: all of {', '.join(THEMES)})")
+    parser.add_argument("--pieces", nargs="*", default=[], help="sprite folders to choose piece sets from")
+    parser.add_argument("--font", help="font with chess glyphs, used when no sprite folders are given")
+    parser.add_argument("--highlight", type=float, default=0.5, help="share of images with last-move highlights (default: 0.5)")
+    parser.add_argument("--noise", type=float, default=0.3, help="share of images with blur/noise (default: 0.3)")
+    parser.add_argument("--no-clutter", action="store_true", help="plain background without UI panels")
+    parser.add_argument("--black-ratio", type=float, default=0.5, help="share of images seen from Black's side (default: 0.5)")
+    parser.add_argument("--jpeg-quality", type=int, default=0, help="write JPEG at this quality instead of PNG")
+    parser.add_argument("--workers", type=int, default=cpu_count(), help="rendering processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    args = parser.parse_args()
+
+    setup_console_logging()
+    themes = [t.strip() for t in args.themes.split(",") if t.strip()]
+    unknown = [t for t in themes if t not in THEMES]
+    if unknown or not themes:
+        logger.error("Unknown theme(s): %s", ", ".join(unknown) or "none given")
+        sys.exit(1)
+    for folder in args.pieces:
+        try:
+            _load_sprites(folder, 8)
+        except FileNotFoundError as e:
+            logger.error(str(e))
+            sys.exit(1)
+
+    fens = read_fens(args.fens) if args.fens else []
+    if args.fens and not fens:
+        logger.error("No FENs found in %s", args.fens)
+        sys.exit(1)
+
+    config = {
+        "output": args.output,
+        "seed": args.seed,
+        "fens": fens,
+        "screen": args.screen,
+        "board_scale": tuple(sorted(args.board_scale)),
+        "themes": themes,
+        "pieces": [os.path.abspath(p) for p in args.pieces],
+        "font": args.font,
+        "highlight": args.highlight,
+        "noise": args.noise,
+        "clutter": not args.no_clutter,
+        "black_ratio": args.black_ratio,
+        "jpeg_quality": args.jpeg_quality,
+    }
+    os.makedirs(os.path.join(args.output, "images"), exist_ok=True)
+
+    started = time.perf_counter()
+    labels = []
+    with Pool(max(1, args.workers), initializer=_init_worker, initargs=(config,)) as pool:
+        for label in pool.imap_unordered(_generate, range(args.count), chunksize=8):
+            labels.append(label)
+            if len(labels) % 500 == 0:
+                logger.info("%d/%d rendered", len(labels), args.count)
+    labels.sort(key=lambda label: label["image"])
+    with open(os.path.join(args.output, "labels.jsonl"), "w", encoding="utf-8") as f:
+        for label in labels:
+            f.write(json.dumps(label) + "\n")
+
+    elapsed = time.perf_counter() - started
+    logger.info("Rendered %d images in %.1fs (%.0f per minute)", len(labels), elapsed, len(labels) / elapsed * 60)
+
+
+if __name__ == "__main__":
+    main()
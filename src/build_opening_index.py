@@ -0,0 +1,145 @@
+"""
+Build an opening index from PGN files for the book lookups in the GUI and get_best_move.
+
+  python src/build_opening_index.py games/*.pgn -o openings.idx
+  python src/build_opening_index.py lichess_2024.pgn -o openings.idx --max-ply 40 --min-games 3 --workers 8
+
+Files are cut into byte ranges at game boundaries ("[Event" lines) and
+every range is indexed by a worker process: each of the first --max-ply
+positions of every finished game is hashed (Polyglot key) and the
+White/draw/Black counts of the move played are added up. A worker spills
+its counts as a sorted run whenever it holds --run-size moves, and the
+runs are merged into the index, so memory stays bounded however large the
+archive. Point CHESSPILOT_OPENING_INDEX at the result to use it.
+"""
+import os
+import sys
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import multiprocessing
+
+from utils.logging_setup import setup_console_logging
+from executor.bitboard import Position
+from executor.pgn import read_games
+from executor.opening_index import encode_move, write_run, merge_runs
+
+logger = logging.getLogger(__name__)
+
+# Column of the W/D/L counts a result adds to.
+RESULT_COLUMNS = {"1-0": 0, "1/2-1/2": 1, "0-1": 2}
+EVENT_TAG = b"[Event "
+
+
+def split_file(path, chunk_size):
+    """(path, start, end) byte ranges of about `chunk_size`; games belong to the range their tags start in."""
+    size = os.path.getsize(path)
+    bounds = list(range(0, size, chunk_size)) + [size]
+    return [(path, start, end) for start, end in zip(bounds, bounds[1:])]
+
+
+def _range_lines(f, start, end):
+    """Lines of the games whose "[Event" tag starts in [start, end)."""
+    if start:
+        # Skip to the first line starting at or after `start`; the line
+        # it cuts belongs to the previous range.
+        f.seek(start - 1)
+        f.readline()
+    offset = f.tell()
+    line = f.readline()
+    while line and not line.startswith(EVENT_TAG):
+        offset = f.tell()
+        line = f.readline()
+    while line:
+        if line.startswith(EVENT_TAG) and offset >= end:
+            return
+        yield line.decode("utf-8", "replace")
+        offset = f.tell()
+        line = f.readline()
+
+
+def index_range(task):
+    """Worker: index one byte range, spilling sorted runs into `run_dir`. Returns (runs, games, positions, bytes)."""
+    (path, start, end), run_dir, max_ply, run_size = task
+    counts, runs = {}, []
+    games = positions = 0
+
+    def spill():
+        # Unique even for same-named files in different directories.
+        fd, run = tempfile.mkstemp(suffix=".run", dir=run_dir)
+        os.close(fd)
+        write_run(run, counts)
+        runs.append(run)
+        counts.clear()
+
+    with open(path, "rb") as f:
+        for game in read_games(_range_lines(f, start, end), max_plies=max_ply or None):
+            column = RESULT_COLUMNS.get(game.result)
+            if column is None:
+                continue
+            games += 1
+            position = Position(game.root_fen)
+            for uci in game.moves:
+                move = encode_move(uci)
+                wdl = counts.setdefault((position.zobrist_key(), move), [0, 0, 0])
+                wdl[column] += 1
+                position.push(move)
+            positions += len(game.moves)
+            if len(counts) >= run_size:
+                spill()
+    if counts:
+        spill()
+    return runs, games, positions, end - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index the opening moves of PGN files for fast book lookups.")
+    parser.add_argument("pgn", nargs="+", help="PGN files")
+    parser.add_argument("-o", "--output", required=True, help="index file to write")
+    parser.add_argument("--max-ply", type=int, default=30, help="moves indexed per game, 0 for all (default: 30)")
+    parser.add_argument("--min-games", type=int, default=1, help="drop moves played in fewer games (default: 1)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="indexing processes (default: one per core)")
+    parser.add_argument("--chunk-mb", type=int, default=64, help="size of the file ranges handed to workers (default: 64)")
+    parser.add_argument("--run-size", type=int, default=2000000,
+                        help="moves a worker holds in memory before spilling a run (default: 2000000)")
+    parser.add_argument("--tmp-dir", help="directory for the sorted runs (default: next to the output)")
+    args = parser.parse_args()
+
+    setup_console_logging()
+    tasks = [task for path in args.pgn for task in split_file(path, args.chunk_mb << 20)]
+    total_bytes = sum(end - start for _, start, end in tasks)
+    run_dir = tempfile.mkdtemp(prefix="openings-", dir=args.tmp_dir or os.path.dirname(os.path.abspath(args.output)))
+    started = time.perf_counter()
+    runs, games, positions, done_bytes = [], 0, 0, 0
+    try:
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(processes=max(1, min(args.workers, len(tasks)))) as pool:
+            work = [(task, run_dir, args.max_ply, args.run_size) for task in tasks]
+            for task_runs, task_games, task_positions, task_bytes in pool.imap_unordered(index_range, work):
+                runs.extend(task_runs)
+                games += task_games
+                positions += task_positions
+                done_bytes += task_bytes
+                elapsed = time.perf_counter() - started
+                logger.info("%.0f%% read: %d games, %d positions (%.0f games/s)", 100 * done_bytes / max(1, total_bytes),
+                            games, positions, games / elapsed)
+        if len(set(runs)) != len(runs):
+            raise RuntimeError("Duplicate run files; the index would count games twice")
+        logger.info("Merging %d runs", len(runs))
+        count = merge_runs(runs, args.output, min_games=args.min_games)
+    except KeyboardInterrupt:
+        logger.info("Interrupted; no index written")
+        sys.exit(1)
+    except (OSError, RuntimeError) as e:
+        logger.error(str(e))
+        sys.exit(1)
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+    logger.info("Indexed %d games, %d positions in %.1fs: %d moves in %s (%.1f MB)", games, positions,
+                time.perf_counter() - started, count, args.output, os.path.getsize(args.output) / 1e6)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""
+Headless ChessPilot service.
+
+Loads the detection model and an engine pool once, then serves newline-
+delimited JSON over a Unix-domain socket or localhost TCP. Every request
+carries an "id" that is echoed in its response; requests on one connection
+are processed concurrently and answered as they finish, so clients may
+pipeline. Operations:
+
+  {"id": 1, "op": "ping"}
+  {"id": 2, "op": "analyse", "fen": "...", "moves": ["e2e4", ...], "depth": 18, "movetime": 500}
+  {"id": 3, "op": "recognize", "image": "<base64 PNG/JPEG>", "color": "w", "analyse": true}
+  {"id": 4, "op": "recognize", "image_path": "board.png"}
+  {"id": 5, "op": "recognize", "shm": {"name": "frame0", "width": 1920, "height": 1080, "mode": "RGB"}}
+  {"id": 6, "op": "stats"}
+  {"id": 7, "op": "metrics"}          per-stage latencies as Prometheus text
+
+Responses are {"id": ..., "ok": true, ...} or {"id": ..., "ok": false, "error": "..."}.
+"""
+import io
+import os
+import sys
+import json
+import time
+import base64
+import socket
+import logging
+import argparse
+import threading
+import socketserver
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from utils.logging_setup import setup_console_logging
+from utils.chess_resources_manager import setup_resources
+from board_detection import get_positions, get_fen_from_position, load_model, warm_up
+from board_detection.side_detector import detect_side_from_fen
+from executor.bitboard import Position, move_to_uci
+from executor.engine_pool import EnginePool
+from utils.metrics import metrics, start_metrics_export
+from utils.profiling import profiler, add_profile_argument
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+DEFAULT_DEPTH = 15
+MAX_LINE_BYTES = 64 * 1024 * 1024
+
+
+class RequestError(Exception):
+    pass
+
+
+# Set when the detection model failed to load; recognize requests then fail with it.
+_model_error = None
+
+
+def _positive_int(request, key, default=None):
+    """request[key] as a positive int (or `default` when absent); RequestError otherwise."""
+    value = request.get(key)
+    if value is None:
+        return default
+    if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+        raise RequestError(f"{key} must be a positive integer")
+    return value
+
+
+def _attach_shared_memory(name):
+    """
+    Open a segment owned by the client without taking ownership of it.
+    Attaching normally registers the segment with this process's resource
+    tracker, which would unlink the client's buffer when the daemon exits.
+    """
+    from multiprocessing import shared_memory, resource_tracker
+
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    if os.name == "posix":
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def _load_shared_image(spec):
+    try:
+        width, height = int(spec["width"]), int(spec["height"])
+        mode = spec.get("mode", "RGB")
+        shm = _attach_shared_memory(spec["name"])
+    except (KeyError, ValueError, FileNotFoundError) as e:
+        raise RequestError(f"Bad shared-memory handle: {e}") from e
+    try:
+        size = width * height * len(mode)
+        # Copy out so the client may reuse the buffer as soon as we answer.
+        return Image.frombytes(mode, (width, height), bytes(shm.buf[:size]))
+    finally:
+        shm.close()
+
+
+def load_image(request):
+    if "image" in request:
+        try:
+            return Image.open(io.BytesIO(base64.b64decode(request["image"]))).convert("RGB")
+        except Exception as e:
+            raise RequestError(f"Cannot decode image: {e}") from e
+    if "image_path" in request:
+        try:
+            return Image.open(request["image_path"]).convert("RGB")
+        except OSError as e:
+            raise RequestError(f"Cannot open image: {e}") from e
+    if "shm" in request:
+        return _load_shared_image(request["shm"])
+    raise RequestError("recognize needs one of image, image_path or shm")
+
+
+class AnalysisService:
+    """Request handlers shared by all connections."""
+
+    def __init__(self, pool, max_concurrency):
+        self.pool = pool
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._workers = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="daemon")
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "in_flight": 0, "busy_seconds": 0.0}
+        self.started = time.time()
+
+    def submit(self, request, reply):
+        """Run `request` on a worker and pass its response to `reply`; blocks while at the concurrency limit."""
+        self._slots.acquire()
+        with self._stats_lock:
+            self.stats["requests"] += 1
+            self.stats["in_flight"] += 1
+        self._workers.submit(self._handle, request, reply)
+
+    def _handle(self, request, reply):
+        started = time.monotonic()
+        response = {"id": request.get("id")}
+        try:
+            response.update(self.dispatch(request))
+            response["ok"] = True
+        except RequestError as e:
+            response.update(ok=False, error=str(e))
+        except Exception as e:
+            logger.error("Request %s failed: %s", request.get('id'), e, exc_info=True)
+            response.update(ok=False, error=str(e))
+        finally:
+            self._slots.release()
+            with self._stats_lock:
+                self.stats["in_flight"] -= 1
+                self.stats["busy_seconds"] += time.monotonic() - started
+                if not response.get("ok"):
+                    self.stats["errors"] += 1
+        reply(response)
+
+    def dispatch(self, request):
+        op = request.get("op")
+        if op == "ping":
+            return {"result": "pong"}
+        if op == "analyse":
+            return {"analysis": self.analyse(request)}
+        if op == "recognize":
+            return self.recognize(request)
+        if op == "stats":
+            with self._stats_lock:
+                return {"stats": dict(self.stats, uptime=round(time.time() - self.started, 1),
+                                      engines=self.pool.size, max_concurrency=self.max_concurrency)}
+        if op == "metrics":
+            return {"metrics": metrics.render_prometheus()}
+        raise RequestError(f"Unknown op: {op}")
+
+    def analyse(self, request, fen=None):
+        fen = fen or request.get("fen")
+        if not fen or not isinstance(fen, str):
+            raise RequestError("analyse needs a fen")
+        depth = _positive_int(request, "depth", DEFAULT_DEPTH)
+        movetime = _positive_int(request, "movetime")
+        moves = request.get("moves") or []
+        if not isinstance(moves, list) or not all(isinstance(move, str) for move in moves):
+            raise RequestError("moves must be a list of UCI strings")
+        history = None
+        if moves:
+            try:
+                position = Position(fen)
+                # Only the parsed moves are passed on, never the client's strings.
+                played = []
+                for move in moves:
+                    parsed = position.parse_uci(move)
+                    position.push(parsed)
+                    played.append(move_to_uci(parsed))
+            except ValueError as e:
+                raise RequestError(str(e)) from e
+            history = (fen, tuple(played))
+            fen = position.fen()
+        try:
+            future = self.pool.analyse(fen, depth=depth, movetime=movetime, history=history)
+        except ValueError as e:
+            raise RequestError(str(e)) from e
+        return future.result()
+
+    def recognize(self, request):
+        if _model_error is not None:
+            raise RequestError(f"Detection model unavailable: {_model_error}")
+        image = load_image(request)
+        boxes, _, _ = get_positions(image)
+        if not boxes:
+            raise RequestError("No board detected")
+        color = request.get("color")
+        if color not in ("w", "b"):
+            detected = get_fen_from_position("w", boxes)
+            if not detected:
+                raise RequestError("No board detected")
+            color = detect_side_from_fen(detected[3])
+        extracted = get_fen_from_position(color, boxes)
+        if not extracted:
+            raise RequestError("No board detected")
+        fen = extracted[3]
+        response = {"detections": boxes, "color": color, "fen": fen}
+        if request.get("analyse"):
+            response["analysis"] = self.analyse(request, fen=fen)
+        return response
+
+    def shutdown(self):
+        self._workers.shutdown(wait=True)
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        service = self.server.service
+        write_lock = threading.Lock()
+
+        def reply(response):
+            data = (json.dumps(response) + "\n").encode()
+            with write_lock:
+                try:
+                    self.wfile.write(data)
+                    self.wfile.flush()
+                except OSError:
+                    pass
+
+        for line in iter(lambda: self.rfile.readline(MAX_LINE_BYTES), b""):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("request must be a JSON object")
+            except ValueError as e:
+                reply({"id": None, "ok": False, "error": f"Bad request: {e}"})
+                continue
+            service.submit(request, reply)
+
+
+class ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socket, "AF_UNIX"):
+    class ThreadingUnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+def create_server(service, socket_path=None, host="127.0.0.1", port=DEFAULT_PORT):
+    if socket_path:
+        if not hasattr(socket, "AF_UNIX"):
+            raise RuntimeError("Unix-domain sockets are not available on this platform")
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = ThreadingUnixServer(socket_path, RequestHandler)
+        os.chmod(socket_path, 0o600)
+    else:
+        server = ThreadingTCPServer((host, port), RequestHandler)
+    server.service = service
+    return server
+
+
+def _load_model():
+    global _model_error
+    try:
+        load_model()
+        warm_up()
+    except Exception as e:
+        logger.error("Detection model unavailable: %s", e)
+        _model_error = str(e)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run ChessPilot recognition and analysis as a local service.")
+    parser.add_argument("--socket", help="listen on this Unix-domain socket instead of TCP")
+    parser.add_argument("--host", default="127.0.0.1", help="TCP address to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"TCP port (default: {DEFAULT_PORT})")
+    parser.add_argument("--pool-size", type=int, default=None, help="engines to run (default: pool_size from the batch profile)")
+    parser.add_argument("--max-concurrency", type=int, default=None, help="requests processed at once (default: 2 x pool size)")
+    parser.add_argument("--metrics-port", type=int, help="also serve Prometheus metrics on 127.0.0.1:PORT/metrics")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    setup_console_logging()
+    start_metrics_export(port=args.metrics_port)
+    profiler.start_if_requested(args.profile)
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    if not setup_resources(src_dir, os.path.dirname(src_dir), require_model=False):
+        sys.exit(1)
+
+    # Load the model while the engines spawn; a missing model only disables recognize.
+    model_thread = threading.Thread(target=_load_model, name="model-load", daemon=True)
+    model_thread.start()
+    pool = EnginePool(size=args.pool_size).start()
+    model_thread.join()
+    service = AnalysisService(pool, args.max_concurrency or 2 * pool.size)
+    server = create_server(service, args.socket, args.host, args.port)
+    where = args.socket or f"{args.host}:{args.port}"
+    logger.info("ChessPilot daemon listening on %s", where)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down")
+    finally:
+        server.server_close()
+        service.shutdown()
+        pool.shutdown()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
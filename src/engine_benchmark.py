@@ -0,0 +1,359 @@
+"""
+Engine benchmark over an EPD position suite.
+
+Each position is searched under a fixed limit (depth, movetime or nodes),
+serially and at each requested concurrency level, either through an
+EnginePool (one engine per concurrent search) or through get_best_move and
+its scheduler (one engine, concurrent callers queue). The report covers
+positions per second, nodes per second, time to each depth, time until the
+final best move first appeared in the pv, and the solution rate against the
+suite's bm/am operations:
+
+  python src/engine_benchmark.py suites/wac.epd --depth 14 --concurrency 1,2,4 --output before.json
+  python src/engine_benchmark.py suites/wac.epd --depth 14 --option Threads=2 --compare before.json
+
+Plain FEN lines are accepted too; they only count towards speed.
+"""
+import os
+import sys
+import json
+import time
+import shlex
+import logging
+import argparse
+import platform
+import threading
+
+from utils.logging_setup import setup_console_logging
+from utils.metrics import metrics
+from executor.bitboard import Position, move_to_uci
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (50, 90, 99)
+
+
+def parse_epd_line(line):
+    """(fen, operations) for an EPD or FEN line; operation operands are lists of strings."""
+    fields = line.split(None, 4)
+    if len(fields) < 4:
+        raise ValueError("expected at least four FEN fields")
+    rest = fields[4] if len(fields) > 4 else ""
+    counters = rest.split()[:2]
+    if len(counters) == 2 and all(c.isdigit() for c in counters):
+        # A full FEN: keep its move counters.
+        return " ".join(fields[:4] + counters), {}
+    operations = {}
+    for op in filter(None, (part.strip() for part in rest.split(";"))):
+        try:
+            tokens = shlex.split(op)
+        except ValueError:
+            tokens = op.split()
+        operations[tokens[0]] = tokens[1:]
+    return " ".join(fields[:4]) + " 0 1", operations
+
+
+def load_suite(path, limit=None):
+    """Positions as dicts with id, fen and UCI best/avoid moves (empty when unlabeled)."""
+    suite = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                fen, operations = parse_epd_line(line)
+                position = Position(fen)
+                best = [move_to_uci(position.parse_san(san)) for san in operations.get("bm", [])]
+                avoid = [move_to_uci(position.parse_san(san)) for san in operations.get("am", [])]
+            except ValueError as e:
+                raise ValueError(f"{path}:{line_number}: {e}") from e
+            suite.append({
+                "id": " ".join(operations.get("id", [])) or f"#{line_number}",
+                "fen": fen,
+                "best": best,
+                "avoid": avoid,
+            })
+            if limit and len(suite) >= limit:
+                break
+    return suite
+
+
+def go_command(args):
+    if args.movetime:
+        return f"movetime {args.movetime}"
+    if args.nodes:
+        return f"nodes {args.nodes}"
+    return f"depth {args.depth}"
+
+
+def percentiles(values):
+    if not values:
+        return {f"p{p}": None for p in PERCENTILES}
+    ordered = sorted(values)
+    return {f"p{p}": ordered[min(len(ordered) - 1, len(ordered) * p // 100)] for p in PERCENTILES}
+
+
+def is_solved(entry, move):
+    if not entry["best"] and not entry["avoid"]:
+        return None
+    if move is None:
+        return False
+    if entry["best"] and move not in entry["best"]:
+        return False
+    return move not in entry["avoid"]
+
+
+def time_to_bestmove(trace, move):
+    """Elapsed seconds from which the pv kept starting with `move`."""
+    first = None
+    for elapsed, _, pv_move in reversed(trace):
+        if pv_move != move:
+            break
+        first = elapsed
+    return first
+
+
+def _record(entry, move, wall, result=None, trace=None, error=None):
+    record = {"id": entry["id"], "move": move, "solved": is_solved(entry, move),
+              "wall": wall}
+    if error:
+        record["error"] = error
+    if result:
+        record.update(depth=result.get("depth"), nodes=result.get("nodes"), nps=result.get("nps"),
+                      engine_time=result["time"] / 1000 if result.get("time") is not None else None)
+    if trace is not None:
+        reached = {}
+        for elapsed, depth, _ in trace:
+            if depth is not None:
+                reached.setdefault(depth, elapsed)
+        record["time_to_depth"] = reached
+        record["time_to_bestmove"] = time_to_bestmove(trace, move) if move else None
+    return record
+
+
+def run_pool_level(suite, go, concurrency, args, options):
+    """Search the suite on a pool of `concurrency` engines; engine start-up is not timed."""
+    from executor.engine_pool import EnginePool
+    pool = EnginePool(size=concurrency, profile=args.profile, name=f"bench{concurrency}", options=options).start()
+
+    def job(entry):
+        def search(supervisor):
+            trace = []
+            started = time.perf_counter()
+            result = supervisor.search(f"fen {entry['fen']}", go,
+                                       on_info=lambda info, t: trace.append(
+                                           (t, info.get("depth"), (info.get("pv") or [None])[0])))
+            return result, trace, time.perf_counter() - started
+        return search
+
+    records = []
+    try:
+        started = time.perf_counter()
+        futures = [(entry, pool.submit(job(entry))) for entry in suite]
+        for entry, future in futures:
+            try:
+                result, trace, wall = future.result()
+                records.append(_record(entry, result["best_move"], wall, result, trace))
+            except Exception as e:
+                records.append(_record(entry, None, None, error=str(e)))
+        elapsed = time.perf_counter() - started
+    finally:
+        pool.shutdown()
+    return records, elapsed
+
+
+def run_best_move_level(suite, depth, concurrency):
+    """Search the suite through get_best_move from `concurrency` client threads."""
+    from executor.get_best_move import get_best_move, cleanup_stockfish, _initialize_stockfish
+    from executor.engine_scheduler import BATCH
+    # Fresh engine and an empty result cache for every level.
+    cleanup_stockfish()
+    _initialize_stockfish()
+    records = [None] * len(suite)
+    pending = iter(range(len(suite)))
+    lock = threading.Lock()
+
+    def client():
+        while True:
+            with lock:
+                i = next(pending, None)
+            if i is None:
+                return
+            entry = suite[i]
+            started = time.perf_counter()
+            try:
+                move, _, _ = get_best_move(depth, entry["fen"], priority=BATCH)
+                records[i] = _record(entry, move, time.perf_counter() - started)
+            except Exception as e:
+                records[i] = _record(entry, None, None, error=str(e))
+
+    threads = [threading.Thread(target=client, name=f"bench-client-{n}", daemon=True) for n in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    cleanup_stockfish()
+    return records, elapsed
+
+
+def summarize(records, elapsed, concurrency):
+    searched = [r for r in records if "error" not in r]
+    labeled = [r for r in records if r["solved"] is not None]
+    nodes = sum(r.get("nodes") or 0 for r in searched)
+    engine_time = sum(r.get("engine_time") or 0 for r in searched)
+    depths = {}
+    for r in searched:
+        for depth, t in (r.get("time_to_depth") or {}).items():
+            depths.setdefault(depth, []).append(t)
+    return {
+        "concurrency": concurrency,
+        "positions": len(records),
+        "errors": len(records) - len(searched),
+        "elapsed": elapsed,
+        "positions_per_second": len(records) / elapsed if elapsed else None,
+        # Per engine, from the engines' own node counts and times.
+        "nps": nodes / engine_time if engine_time else None,
+        "total_nps": nodes / elapsed if nodes and elapsed else None,
+        "solution_rate": sum(1 for r in labeled if r["solved"]) / len(labeled) if labeled else None,
+        "latency": percentiles([r["wall"] for r in searched]),
+        "time_to_bestmove": percentiles([r["time_to_bestmove"] for r in searched
+                                         if r.get("time_to_bestmove") is not None]),
+        # Median time to each depth, over the positions that reached it.
+        "time_to_depth": {d: {"p50": percentiles(ts)["p50"], "positions": len(ts)} for d, ts in sorted(depths.items())},
+        "records": records,
+    }
+
+
+def environment(options):
+    from executor.get_best_move import get_engine_command, read_engine_config
+    from executor.engine_autotune import get_cpu_count
+    info = {"python": platform.python_version(), "platform": platform.platform(), "cpus": get_cpu_count()}
+    try:
+        info["engine"] = get_engine_command()
+    except FileNotFoundError:
+        pass
+    info["options"] = options
+    return info
+
+
+def _fmt(value, scale=1, suffix="", width=9, digits=1):
+    return f"{'n/a':>{width}}" if value is None else f"{value * scale:>{width}.{digits}f}{suffix}"
+
+
+def print_report(report, baseline=None):
+    print(f"{report['suite']}: {report['positions']} positions, go {report['go']}, target {report['target']}")
+    print(f"{'clients':>7}{'pos/s':>9}{'knps':>10}{'total knps':>12}{'solved':>9}{'p50 ms':>9}{'p99 ms':>9}"
+          f"{'ttbm ms':>9}{'errors':>8}")
+    for level in report["levels"]:
+        print(f"{level['concurrency']:>7}{_fmt(level['positions_per_second'])}{_fmt(level['nps'], 1e-3, width=10)}"
+              f"{_fmt(level['total_nps'], 1e-3, width=12)}{_fmt(level['solution_rate'], 100, width=8)}%"
+              f"{_fmt(level['latency']['p50'], 1000)}{_fmt(level['latency']['p99'], 1000)}"
+              f"{_fmt(level['time_to_bestmove']['p50'], 1000)}{level['errors']:>8}")
+    serial = report["levels"][0]
+    if serial["time_to_depth"]:
+        print()
+        print(f"Time to depth at {serial['concurrency']} client(s), median ms:")
+        print("  " + "  ".join(f"d{d} {_fmt(v['p50'], 1000, width=0)}" for d, v in serial["time_to_depth"].items()))
+    if report.get("stages"):
+        print()
+        columns = list(next(iter(report["stages"].values())))
+        print(f"{'stage (ms)':<16}" + "".join(f"{c:>9}" for c in columns))
+        for name, values in report["stages"].items():
+            print(f"{name:<16}" + "".join(_fmt(values[c], 1000) for c in columns))
+
+    if baseline:
+        print()
+        print("Compared with baseline:")
+        old_levels = {level["concurrency"]: level for level in baseline["levels"]}
+        for level in report["levels"]:
+            old = old_levels.get(level["concurrency"])
+            if not old:
+                continue
+            print(f"  {level['concurrency']} client(s): pos/s {_fmt(old['positions_per_second'], width=0)} -> "
+                  f"{_fmt(level['positions_per_second'], width=0)}, knps {_fmt(old['nps'], 1e-3, width=0)} -> "
+                  f"{_fmt(level['nps'], 1e-3, width=0)}, solved {_fmt(old['solution_rate'], 100, width=0)}% -> "
+                  f"{_fmt(level['solution_rate'], 100, width=0)}%")
+
+
+def parse_options(values):
+    options = {}
+    for value in values or []:
+        name, sep, setting = value.partition("=")
+        if not sep:
+            raise ValueError(f"--option expects NAME=VALUE, got '{value}'")
+        options[name.strip()] = setting.strip()
+    return options
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the engine layer on an EPD position suite.")
+    parser.add_argument("suite", help="EPD (or FEN-per-line) file")
+    limits = parser.add_mutually_exclusive_group()
+    limits.add_argument("--depth", type=int, default=12, help="search depth per position (default: 12)")
+    limits.add_argument("--movetime", type=int, help="milliseconds per position")
+    limits.add_argument("--nodes", type=int, help="nodes per position")
+    parser.add_argument("--concurrency", default="1,2,4",
+                        help="comma-separated numbers of concurrent searches (default: 1,2,4)")
+    parser.add_argument("--target", choices=("pool", "best-move"), default="pool",
+                        help="EnginePool with one engine per search, or get_best_move and its scheduler (default: pool)")
+    parser.add_argument("--profile", default="batch", help="engine_config.txt profile for pool engines (default: batch)")
+    parser.add_argument("--option", action="append", metavar="NAME=VALUE",
+                        help="UCI option overriding the profile, e.g. Threads=2 or Hash=256; repeatable")
+    parser.add_argument("--limit", type=int, help="only use the first N positions")
+    parser.add_argument("--output", help="write the full results as JSON")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    try:
+        options = parse_options(args.option)
+        levels = [int(n) for n in args.concurrency.split(",")]
+    except ValueError as e:
+        parser.error(str(e))
+    if args.target == "best-move" and (args.movetime or args.nodes or options):
+        parser.error("the best-move target searches to --depth with the interactive profile; "
+                     "--movetime, --nodes and --option need --target pool")
+
+    setup_console_logging()
+    try:
+        suite = load_suite(args.suite, args.limit)
+    except (OSError, ValueError) as e:
+        logger.error(str(e))
+        sys.exit(1)
+    if not suite:
+        logger.error("No positions found in %s", args.suite)
+        sys.exit(1)
+
+    go = go_command(args)
+    report = {"suite": os.path.abspath(args.suite), "positions": len(suite), "go": go, "target": args.target,
+              "environment": environment(options), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "levels": []}
+    metrics.reset()
+    for concurrency in levels:
+        logger.info("Running %d positions at concurrency %d", len(suite), concurrency)
+        if args.target == "pool":
+            records, elapsed = run_pool_level(suite, go, concurrency, args, options)
+        else:
+            records, elapsed = run_best_move_level(suite, args.depth, concurrency)
+        report["levels"].append(summarize(records, elapsed, concurrency))
+    if args.target == "best-move":
+        # Client-side overhead shows up as the gap between these two stages.
+        report["stages"] = {name: {f"p{int(q * 100)}": v for q, v in data["percentiles"].items()}
+                            for name, data in metrics.snapshot()["stages"].items()
+                            if name in ("best_move", "engine_search") and data["count"]}
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        logger.info("Results written to %s", args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,9 +8,13 @@ from .execute_normal_move import execute_normal_move
 from .process_move import process_move
 from .store_board_positions import store_board_positions
 from .verify_move import verify_move
-from .get_best_move import get_best_move, cleanup_stockfish, initialize_stockfish_at_startup
+from .get_best_move import get_best_move, cleanup_stockfish, initialize_stockfish_at_startup, get_engine_queue_stats
+from .engine_scheduler import INTERACTIVE, BACKGROUND, BATCH
 from .get_current_fen import get_current_fen
 from .is_two_square_king_move import is_two_square_king_move
+from .tablebase import get_tablebase_stats
+from .board import Board, get_piece_at_square
+from .game_tracker import GameTracker
 
 __all__ = [
     "capture_screenshot_in_memory",
@@ -28,4 +32,12 @@ __all__ = [
     "is_two_square_king_move",
     "cleanup_stockfish",
     "initialize_stockfish_at_startup",
+    "get_tablebase_stats",
+    "Board",
+    "get_piece_at_square",
+    "GameTracker",
+    "get_engine_queue_stats",
+    "INTERACTIVE",
+    "BACKGROUND",
+    "BATCH",
 ]
@@ -0,0 +1,638 @@
+import re
+import logging
+
+from executor.board import SQUARES, SQUARE_INDEX
+from executor.zobrist import PIECE_SQUARE_KEYS, CASTLING_KEYS, EP_KEYS, TURN_KEY
+
+logger = logging.getLogger(__name__)
+
+# Bitboards are 64-bit ints with a1 = bit 0 ... h8 = bit 63, matching executor.board.
+M64 = (1 << 64) - 1
+FILE_A = 0x0101010101010101
+RANK_1 = 0xFF
+RANK_3 = RANK_1 << 16
+RANK_6 = RANK_1 << 40
+RANK_8 = RANK_1 << 56
+BACK_RANKS = RANK_1 | RANK_8
+
+STARTING_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+WHITE, BLACK = 0, 1
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+PIECE_SYMBOLS = "PNBRQKpnbrqk"
+PROMOTION_SYMBOLS = {KNIGHT: "n", BISHOP: "b", ROOK: "r", QUEEN: "q"}
+PROMOTION_TYPES = {v: k for k, v in PROMOTION_SYMBOLS.items()}
+
+# Castling rights as bits.
+WHITE_OO, WHITE_OOO, BLACK_OO, BLACK_OOO = 1, 2, 4, 8
+CASTLING_SYMBOLS = ((WHITE_OO, "K"), (WHITE_OOO, "Q"), (BLACK_OO, "k"), (BLACK_OOO, "q"))
+# Placements that parse but are not written the canonical way ("44", "0").
+_NON_CANONICAL_PLACEMENT = re.compile(r"\d\d|0")
+_FEN_PIECES = {symbol: index for index, symbol in enumerate(PIECE_SYMBOLS)}
+# Runs of empty squares in a placement, longest first.
+_EMPTY_RUNS = ["1" * n for n in range(8, 1, -1)]
+# Touching any of these squares removes the listed rights.
+CASTLING_SQUARE_RIGHTS = {
+    SQUARE_INDEX["e1"]: WHITE_OO | WHITE_OOO,
+    SQUARE_INDEX["h1"]: WHITE_OO,
+    SQUARE_INDEX["a1"]: WHITE_OOO,
+    SQUARE_INDEX["e8"]: BLACK_OO | BLACK_OOO,
+    SQUARE_INDEX["h8"]: BLACK_OO,
+    SQUARE_INDEX["a8"]: BLACK_OOO,
+}
+# right: (king from, king to, rook from, rook to, squares that must be empty, squares the king crosses)
+CASTLING_MOVES = {
+    WHITE_OO: (4, 6, 7, 5, 0x60, (4, 5, 6)),
+    WHITE_OOO: (4, 2, 0, 3, 0x0E, (4, 3, 2)),
+    BLACK_OO: (60, 62, 63, 61, 0x60 << 56, (60, 61, 62)),
+    BLACK_OOO: (60, 58, 56, 59, 0x0E << 56, (60, 59, 58)),
+}
+
+
+def _bswap(bb):
+    """Mirror ranks (byte swap), used by hyperbola quintessence."""
+    return int.from_bytes(bb.to_bytes(8, "little"), "big")
+
+
+def _step_attacks(deltas):
+    table = []
+    for sq in range(64):
+        rank, file = divmod(sq, 8)
+        bb = 0
+        for dr, df in deltas:
+            r, f = rank + dr, file + df
+            if 0 <= r < 8 and 0 <= f < 8:
+                bb |= 1 << (r * 8 + f)
+        table.append(bb)
+    return table
+
+
+KNIGHT_ATTACKS = _step_attacks([(1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)])
+KING_ATTACKS = _step_attacks([(1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)])
+PAWN_ATTACKS = (_step_attacks([(1, -1), (1, 1)]), _step_attacks([(-1, -1), (-1, 1)]))
+
+SQUARE_BB = [1 << sq for sq in range(64)]
+SQUARE_BB_SWAPPED = [_bswap(1 << sq) for sq in range(64)]
+FILE_MASKS = [FILE_A << (sq & 7) for sq in range(64)]
+DIAG_MASKS = []
+ANTI_DIAG_MASKS = []
+for _sq in range(64):
+    _rank, _file = divmod(_sq, 8)
+    DIAG_MASKS.append(sum(1 << (r * 8 + f) for r in range(8) for f in range(8) if r - f == _rank - _file))
+    ANTI_DIAG_MASKS.append(sum(1 << (r * 8 + f) for r in range(8) for f in range(8) if r + f == _rank + _file))
+
+
+def _first_rank_attacks():
+    # RANK_ATTACKS[file][occupancy of the rank] -> 8-bit attack set.
+    table = []
+    for file in range(8):
+        row = []
+        for occ in range(256):
+            attacks = 0
+            for step in (1, -1):
+                f = file + step
+                while 0 <= f < 8:
+                    attacks |= 1 << f
+                    if occ & (1 << f):
+                        break
+                    f += step
+            row.append(attacks)
+        table.append(row)
+    return table
+
+
+RANK_ATTACKS = _first_rank_attacks()
+
+
+def _line_attacks(sq, occupied, mask):
+    occ = occupied & mask
+    forward = (occ - 2 * SQUARE_BB[sq]) & M64
+    reverse = (_bswap(occ) - 2 * SQUARE_BB_SWAPPED[sq]) & M64
+    return (forward ^ _bswap(reverse)) & mask
+
+
+def bishop_attacks(sq, occupied):
+    return _line_attacks(sq, occupied, DIAG_MASKS[sq]) | _line_attacks(sq, occupied, ANTI_DIAG_MASKS[sq])
+
+
+def rook_attacks(sq, occupied):
+    shift = sq & 56
+    rank = RANK_ATTACKS[sq & 7][(occupied >> shift) & 0xFF] << shift
+    return rank | _line_attacks(sq, occupied, FILE_MASKS[sq])
+
+
+def iter_squares(bb):
+    while bb:
+        lsb = bb & -bb
+        yield lsb.bit_length() - 1
+        bb ^= lsb
+
+
+def popcount(bb):
+    return bin(bb).count("1")
+
+
+def move_to_uci(move):
+    from_sq, to_sq, promotion = move & 63, (move >> 6) & 63, move >> 12
+    return SQUARES[from_sq] + SQUARES[to_sq] + PROMOTION_SYMBOLS.get(promotion, "")
+
+
+def make_move(from_sq, to_sq, promotion=0):
+    return from_sq | (to_sq << 6) | (promotion << 12)
+
+
+class Position:
+    """
+    Bitboard position: one 64-bit int per piece type and colour. Moves are
+    ints packing from/to/promotion (see make_move) so generation and perft
+    avoid per-move objects.
+    """
+
+    __slots__ = ("bb", "occupied_co", "turn", "castling", "ep_square", "halfmove", "fullmove", "_key", "_placement")
+
+    def __init__(self, fen=None):
+        self.bb = [0] * 12
+        self.occupied_co = [0, 0]
+        self.turn = WHITE
+        self.castling = 0
+        self.ep_square = None
+        self.halfmove = 0
+        self.fullmove = 1
+        self._key = None
+        self._placement = None
+        if fen:
+            self._set_fen(fen)
+
+    def _set_fen(self, fen):
+        fields = fen.split()
+        rows = fields[0].split("/")
+        if len(rows) != 8:
+            raise ValueError(f"Invalid FEN placement: {fields[0]}")
+        bb = self.bb
+        for r, row in enumerate(rows):
+            file, base = 0, (7 - r) * 8
+            for ch in row:
+                index = _FEN_PIECES.get(ch)
+                if index is None:
+                    if not ch.isdigit():
+                        raise ValueError(f"Invalid FEN row: {row}")
+                    file += int(ch)
+                    continue
+                if file > 7:
+                    raise ValueError(f"Invalid FEN row: {row}")
+                bb[index] |= 1 << (base + file)
+                file += 1
+            if file != 8:
+                raise ValueError(f"Invalid FEN row: {row}")
+        # Colour occupancy once at the end rather than per piece.
+        self.occupied_co = [bb[0] | bb[1] | bb[2] | bb[3] | bb[4] | bb[5],
+                            bb[6] | bb[7] | bb[8] | bb[9] | bb[10] | bb[11]]
+        # A placement that parsed and is written the canonical way is exactly
+        # what placement() would rebuild.
+        if not _NON_CANONICAL_PLACEMENT.search(fields[0]):
+            self._placement = fields[0]
+
+        self.turn = BLACK if len(fields) > 1 and fields[1] == "b" else WHITE
+        castling = fields[2] if len(fields) > 2 else "-"
+        self.castling = sum(bit for bit, symbol in CASTLING_SYMBOLS if symbol in castling)
+        ep = fields[3] if len(fields) > 3 else "-"
+        self.ep_square = SQUARE_INDEX.get(ep)
+        self.halfmove = int(fields[4]) if len(fields) > 4 else 0
+        self.fullmove = int(fields[5]) if len(fields) > 5 else 1
+
+    @classmethod
+    def from_fen(cls, fen):
+        return cls(fen)
+
+    def copy(self):
+        position = Position.__new__(Position)
+        position.bb = self.bb[:]
+        position.occupied_co = self.occupied_co[:]
+        position.turn = self.turn
+        position.castling = self.castling
+        position.ep_square = self.ep_square
+        position.halfmove = self.halfmove
+        position.fullmove = self.fullmove
+        position._key = self._key
+        position._placement = self._placement
+        return position
+
+    @property
+    def occupied(self):
+        return self.occupied_co[WHITE] | self.occupied_co[BLACK]
+
+    def piece_at(self, sq):
+        """Index into PIECE_SYMBOLS of the piece on `sq`, or None."""
+        bit = 1 << sq
+        if not (self.occupied & bit):
+            return None
+        start = 0 if self.occupied_co[WHITE] & bit else 6
+        for index in range(start, start + 6):
+            if self.bb[index] & bit:
+                return index
+        return None
+
+    def placement(self):
+        if self._placement is not None:
+            return self._placement
+        # Walk the pieces rather than the squares, then fold runs of empty
+        # squares (marked "1") into their counts, longest first.
+        cells = ["1"] * 64
+        for index, pieces in enumerate(self.bb):
+            symbol = PIECE_SYMBOLS[index]
+            for sq in iter_squares(pieces):
+                cells[sq] = symbol
+        placement = "/".join("".join(cells[rank * 8:rank * 8 + 8]) for rank in range(7, -1, -1))
+        for run in _EMPTY_RUNS:
+            placement = placement.replace(run, str(len(run)))
+        self._placement = placement
+        return placement
+
+    def _castling_field(self):
+        return "".join(symbol for bit, symbol in CASTLING_SYMBOLS if self.castling & bit) or "-"
+
+    def _capturable_ep(self):
+        """The en passant square if a pawn can actually capture there (as in Polyglot), else None."""
+        ep = self.ep_square
+        if ep is not None and PAWN_ATTACKS[self.turn ^ 1][ep] & self.bb[self.turn * 6 + PAWN]:
+            return ep
+        return None
+
+    def _ep_field(self):
+        ep = self._capturable_ep()
+        return SQUARES[ep] if ep is not None else "-"
+
+    def fen(self):
+        """FEN of the position; the en passant square only appears when a capture there is possible."""
+        return (f"{self.placement()} {'wb'[self.turn]} {self._castling_field()} {self._ep_field()} "
+                f"{self.halfmove} {self.fullmove}")
+
+    def king_square(self, color):
+        king = self.bb[color * 6 + KING]
+        return king.bit_length() - 1 if king else None
+
+    def attackers(self, sq, by_color, occupied=None):
+        """Bitboard of `by_color` pieces attacking `sq`."""
+        if occupied is None:
+            occupied = self.occupied
+        base = by_color * 6
+        bb = self.bb
+        queens = bb[base + QUEEN]
+        return (
+            (PAWN_ATTACKS[by_color ^ 1][sq] & bb[base + PAWN])
+            | (KNIGHT_ATTACKS[sq] & bb[base + KNIGHT])
+            | (KING_ATTACKS[sq] & bb[base + KING])
+            | (bishop_attacks(sq, occupied) & (bb[base + BISHOP] | queens))
+            | (rook_attacks(sq, occupied) & (bb[base + ROOK] | queens))
+        )
+
+    def is_attacked(self, sq, by_color):
+        return bool(self.attackers(sq, by_color))
+
+    def is_check(self, color=None):
+        color = self.turn if color is None else color
+        king = self.king_square(color)
+        return king is not None and self.is_attacked(king, color ^ 1)
+
+    def pseudo_legal_moves(self):
+        us, them = self.turn, self.turn ^ 1
+        base = us * 6
+        bb = self.bb
+        own, enemy = self.occupied_co[us], self.occupied_co[them]
+        occupied = own | enemy
+        empty = ~occupied & M64
+        moves = []
+
+        # Pawns
+        pawns = bb[base + PAWN]
+        if us == WHITE:
+            single = (pawns << 8) & empty
+            double = ((single & RANK_3) << 8) & empty
+            push = -8
+        else:
+            single = (pawns >> 8) & empty
+            double = ((single & RANK_6) >> 8) & empty
+            push = 8
+        for to_sq in iter_squares(single):
+            self._add_pawn_moves(moves, to_sq + push, to_sq)
+        for to_sq in iter_squares(double):
+            moves.append(make_move(to_sq + 2 * push, to_sq))
+        ep_bb = SQUARE_BB[self.ep_square] if self.ep_square is not None else 0
+        for from_sq in iter_squares(pawns):
+            for to_sq in iter_squares(PAWN_ATTACKS[us][from_sq] & (enemy | ep_bb)):
+                self._add_pawn_moves(moves, from_sq, to_sq)
+
+        # Pieces
+        targets = ~own & M64
+        for from_sq in iter_squares(bb[base + KNIGHT]):
+            moves.extend(make_move(from_sq, t) for t in iter_squares(KNIGHT_ATTACKS[from_sq] & targets))
+        for from_sq in iter_squares(bb[base + BISHOP] | bb[base + QUEEN]):
+            moves.extend(make_move(from_sq, t) for t in iter_squares(bishop_attacks(from_sq, occupied) & targets))
+        for from_sq in iter_squares(bb[base + ROOK] | bb[base + QUEEN]):
+            moves.extend(make_move(from_sq, t) for t in iter_squares(rook_attacks(from_sq, occupied) & targets))
+        king = self.king_square(us)
+        if king is not None:
+            moves.extend(make_move(king, t) for t in iter_squares(KING_ATTACKS[king] & targets))
+            moves.extend(self._castling_moves(us, king, occupied))
+        return moves
+
+    def _add_pawn_moves(self, moves, from_sq, to_sq):
+        if SQUARE_BB[to_sq] & BACK_RANKS:
+            moves.extend(make_move(from_sq, to_sq, p) for p in (QUEEN, ROOK, BISHOP, KNIGHT))
+        else:
+            moves.append(make_move(from_sq, to_sq))
+
+    def _castling_moves(self, us, king, occupied):
+        rights = (WHITE_OO, WHITE_OOO) if us == WHITE else (BLACK_OO, BLACK_OOO)
+        them = us ^ 1
+        for right in rights:
+            if not self.castling & right:
+                continue
+            king_from, king_to, rook_from, _, between, crossed = CASTLING_MOVES[right]
+            if king != king_from or not self.bb[us * 6 + ROOK] & SQUARE_BB[rook_from]:
+                continue
+            if occupied & between:
+                continue
+            if any(self.is_attacked(sq, them) for sq in crossed):
+                continue
+            yield make_move(king_from, king_to)
+
+    def push(self, move):
+        """Play `move` in place (no legality check)."""
+        from_sq, to_sq, promotion = move & 63, (move >> 6) & 63, move >> 12
+        us, them = self.turn, self.turn ^ 1
+        bb, occ = self.bb, self.occupied_co
+        from_bit, to_bit = SQUARE_BB[from_sq], SQUARE_BB[to_sq]
+
+        piece = self.piece_at(from_sq)
+        if piece is None:
+            raise ValueError(f"No piece on {SQUARES[from_sq]}")
+        ptype = piece % 6
+        key = self._key
+        self._placement = None
+
+        captured = self.piece_at(to_sq)
+        if captured is not None:
+            bb[captured] &= ~to_bit
+            occ[them] &= ~to_bit
+            if key is not None:
+                key ^= PIECE_SQUARE_KEYS[captured][to_sq]
+
+        bb[piece] &= ~from_bit
+        occ[us] &= ~from_bit
+        placed = us * 6 + promotion if promotion else piece
+        bb[placed] |= to_bit
+        occ[us] |= to_bit
+        if key is not None:
+            key ^= PIECE_SQUARE_KEYS[piece][from_sq] ^ PIECE_SQUARE_KEYS[placed][to_sq]
+
+        if ptype == PAWN and to_sq == self.ep_square:
+            victim = to_sq - 8 if us == WHITE else to_sq + 8
+            bb[them * 6 + PAWN] &= ~SQUARE_BB[victim]
+            occ[them] &= ~SQUARE_BB[victim]
+            captured = them * 6 + PAWN
+            if key is not None:
+                key ^= PIECE_SQUARE_KEYS[captured][victim]
+        elif ptype == KING and abs(to_sq - from_sq) == 2:
+            for right, (king_from, king_to, rook_from, rook_to, _, _) in CASTLING_MOVES.items():
+                if king_from == from_sq and king_to == to_sq:
+                    rook_bits = SQUARE_BB[rook_from] | SQUARE_BB[rook_to]
+                    bb[us * 6 + ROOK] ^= rook_bits
+                    occ[us] ^= rook_bits
+                    if key is not None:
+                        rook_keys = PIECE_SQUARE_KEYS[us * 6 + ROOK]
+                        key ^= rook_keys[rook_from] ^ rook_keys[rook_to]
+
+        castling = self.castling & ~(CASTLING_SQUARE_RIGHTS.get(from_sq, 0) | CASTLING_SQUARE_RIGHTS.get(to_sq, 0))
+        if key is not None:
+            self._key = key ^ CASTLING_KEYS[self.castling] ^ CASTLING_KEYS[castling] ^ TURN_KEY
+        self.castling = castling
+        self.ep_square = (from_sq + to_sq) // 2 if ptype == PAWN and abs(to_sq - from_sq) == 16 else None
+        self.halfmove = 0 if ptype == PAWN or captured is not None else self.halfmove + 1
+        if us == BLACK:
+            self.fullmove += 1
+        self.turn = them
+        return self
+
+    def pass_turn(self):
+        """Hand the move to the other side without moving (a null move)."""
+        self.turn ^= 1
+        self.ep_square = None
+        if self._key is not None:
+            self._key ^= TURN_KEY
+        return self
+
+    def set_castling(self, rights):
+        if self._key is not None:
+            self._key ^= CASTLING_KEYS[self.castling] ^ CASTLING_KEYS[rights]
+        self.castling = rights
+
+    def zobrist_key(self):
+        """
+        Polyglot-compatible 64-bit key. Computed once, then updated
+        incrementally by push(); the en passant file only counts when a pawn
+        can actually capture there, as Polyglot specifies.
+        """
+        if self._key is None:
+            key = CASTLING_KEYS[self.castling] ^ (TURN_KEY if self.turn == WHITE else 0)
+            for index, pieces in enumerate(self.bb):
+                square_keys = PIECE_SQUARE_KEYS[index]
+                for sq in iter_squares(pieces):
+                    key ^= square_keys[sq]
+            self._key = key
+        ep = self._capturable_ep()
+        return self._key ^ EP_KEYS[ep & 7] if ep is not None else self._key
+
+    def legal_moves(self):
+        us = self.turn
+        legal = []
+        for move in self.pseudo_legal_moves():
+            child = self.copy().push(move)
+            king = child.king_square(us)
+            if king is None or not child.is_attacked(king, us ^ 1):
+                legal.append(move)
+        return legal
+
+    def is_checkmate(self):
+        return self.is_check() and not self.legal_moves()
+
+    def is_stalemate(self):
+        return not self.is_check() and not self.legal_moves()
+
+    def parse_uci(self, uci):
+        """Legal move matching a UCI string, or ValueError."""
+        from_sq, to_sq = SQUARE_INDEX.get(uci[:2]), SQUARE_INDEX.get(uci[2:4])
+        promotion = PROMOTION_TYPES.get(uci[4:5], 0)
+        if from_sq is None or to_sq is None or len(uci) != 4 + bool(promotion):
+            raise ValueError(f"Invalid UCI move: {uci!r}")
+        move = make_move(from_sq, to_sq, promotion)
+        if move not in self.legal_moves():
+            raise ValueError(f"Illegal move {uci} in {self.fen()}")
+        return move
+
+    def push_uci(self, uci):
+        return self.push(self.parse_uci(uci))
+
+    def _san_body(self, move, legal):
+        """SAN of a legal `move` without the check suffix."""
+        from_sq, to_sq, promotion = move & 63, (move >> 6) & 63, move >> 12
+        ptype = self.piece_at(from_sq) % 6
+        if ptype == KING and abs(to_sq - from_sq) == 2:
+            return "O-O" if to_sq > from_sq else "O-O-O"
+        capture = bool(self.occupied & SQUARE_BB[to_sq]) or (ptype == PAWN and to_sq == self.ep_square)
+        if ptype == PAWN:
+            san = (SQUARES[from_sq][0] + "x" if capture else "") + SQUARES[to_sq]
+            return san + ("=" + PROMOTION_SYMBOLS[promotion].upper() if promotion else "")
+        san = PIECE_SYMBOLS[ptype]
+        rivals = [m & 63 for m in legal if (m >> 6) & 63 == to_sq and m & 63 != from_sq
+                  and self.piece_at(m & 63) % 6 == ptype]
+        if rivals:
+            if all(sq & 7 != from_sq & 7 for sq in rivals):
+                san += SQUARES[from_sq][0]
+            elif all(sq >> 3 != from_sq >> 3 for sq in rivals):
+                san += SQUARES[from_sq][1]
+            else:
+                san += SQUARES[from_sq]
+        return san + ("x" if capture else "") + SQUARES[to_sq]
+
+    def san(self, move, legal=None):
+        """Standard algebraic notation for a legal `move`, with +/# suffix."""
+        legal = self.legal_moves() if legal is None else legal
+        san = self._san_body(move, legal)
+        child = self.copy().push(move)
+        if child.is_check():
+            san += "#" if not child.legal_moves() else "+"
+        return san
+
+    def parse_san(self, san):
+        """Legal move matching a SAN string (check marks, annotations and 0-0 tolerated), or ValueError."""
+        wanted = san.rstrip("+#!?").replace("0", "O").replace("=", "")
+        legal = self.legal_moves()
+        for move in legal:
+            if self._san_body(move, legal).replace("=", "") == wanted:
+                return move
+        raise ValueError(f"Illegal or ambiguous SAN move {san} in {self.fen()}")
+
+    def push_san(self, san):
+        return self.push(self.parse_san(san))
+
+    def perft(self, depth):
+        if depth == 0:
+            return 1
+        moves = self.legal_moves()
+        if depth == 1:
+            return len(moves)
+        return sum(self.copy().push(move).perft(depth - 1) for move in moves)
+
+
+def validate_position(position):
+    """List of reasons the position cannot arise in a game (empty if it can)."""
+    problems = []
+    bb = position.bb
+    for color, name in ((WHITE, "white"), (BLACK, "black")):
+        kings = popcount(bb[color * 6 + KING])
+        if kings != 1:
+            problems.append(f"{name} has {kings} kings")
+        if popcount(bb[color * 6 + PAWN]) > 8:
+            problems.append(f"{name} has more than 8 pawns")
+        if popcount(position.occupied_co[color]) > 16:
+            problems.append(f"{name} has more than 16 pieces")
+    if (bb[PAWN] | bb[6 + PAWN]) & BACK_RANKS:
+        problems.append("pawn on the first or eighth rank")
+    if problems:
+        return problems
+
+    white_king, black_king = position.king_square(WHITE), position.king_square(BLACK)
+    if KING_ATTACKS[white_king] & SQUARE_BB[black_king]:
+        problems.append("kings are adjacent")
+    if position.is_check(position.turn ^ 1):
+        problems.append("side not to move is in check")
+    return problems
+
+
+def _consistent_castling(position):
+    rights = position.castling
+    for right, (king_from, _, rook_from, _, _, _) in CASTLING_MOVES.items():
+        color = WHITE if right in (WHITE_OO, WHITE_OOO) else BLACK
+        if not (position.bb[color * 6 + KING] & SQUARE_BB[king_from]
+                and position.bb[color * 6 + ROOK] & SQUARE_BB[rook_from]):
+            rights &= ~right
+    return rights
+
+
+def _valid_ep_square(position):
+    ep = position.ep_square
+    if ep is None:
+        return None
+    us, them = position.turn, position.turn ^ 1
+    expected_rank = 5 if us == WHITE else 2
+    pawn_sq = ep - 8 if us == WHITE else ep + 8
+    if (ep >> 3) != expected_rank or position.occupied & SQUARE_BB[ep]:
+        return None
+    if not position.bb[them * 6 + PAWN] & SQUARE_BB[pawn_sq]:
+        return None
+    return ep
+
+
+def repair_fen(fen):
+    """
+    Return a FEN the engine can safely search, fixing what can be inferred
+    (stale castling/en passant fields, a side to move that contradicts a
+    check) or None if the position is impossible (king count, pawns on the
+    back rank, too many pieces, both kings in check, adjacent kings).
+    The result is always rebuilt from the parsed fields, never the input string.
+    """
+    try:
+        position = Position(fen)
+    except ValueError as e:
+        logger.warning("Rejected unparsable FEN %s: %s", fen, e)
+        return None
+
+    position.set_castling(_consistent_castling(position))
+    position.ep_square = _valid_ep_square(position)
+
+    problems = validate_position(position)
+    if problems == ["side not to move is in check"] and not position.is_check():
+        # The recognizer assumes it is our move; a check against the other
+        # side means they are actually the ones to move.
+        position.pass_turn()
+        problems = validate_position(position)
+    if problems:
+        logger.warning("Rejected impossible position %s: %s", fen, ', '.join(problems))
+        return None
+    # Always rebuilt: the caller's string may carry anything after the FEN
+    # fields, and it goes straight into a UCI "position fen" command.
+    repaired = position.fen()
+    if repaired.split()[:4] != fen.split()[:4]:
+        logger.info("Repaired position %s -> %s", fen, repaired)
+    return repaired
+
+
+def fen_after_move(fen, uci):
+    """FEN after playing the UCI move `uci` from `fen`."""
+    return Position(fen).push_uci(uci).fen()
+
+
+if __name__ == "__main__":
+    import time
+    import timeit
+
+    # Reference perft counts from the Chess Programming Wiki.
+    suite = [
+        ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1", 3, 8902),
+        ("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", 3, 97862),
+        ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", 4, 43238),
+        ("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", 3, 9467),
+        ("rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", 3, 62379),
+    ]
+    for fen, depth, expected in suite:
+        started = time.perf_counter()
+        nodes = Position(fen).perft(depth)
+        elapsed = time.perf_counter() - started
+        status = "ok" if nodes == expected else f"FAILED (expected {expected})"
+        print(f"perft({depth}) {nodes:>7} {status:<6} {nodes / elapsed:9.0f} nodes/s  {fen}")
+
+    fen = "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4"
+    number = 10_000
+    seconds = timeit.timeit(lambda: repair_fen(fen), number=number)
+    print(f"repair_fen: {seconds / number * 1e6:.1f} us/call")
@@ -0,0 +1,180 @@
+import re
+import logging
+from functools import lru_cache
+from executor.expend_fen_row import expend_fen_row
+
+logger = logging.getLogger(__name__)
+
+FILES = "abcdefgh"
+# Square indices run a1=0, b1=1, ..., h8=63.
+SQUARES = [f"{f}{r}" for r in range(1, 9) for f in FILES]
+SQUARE_INDEX = {name: i for i, name in enumerate(SQUARES)}
+
+EMPTY = 0
+_RUNS = re.compile(r" +")
+
+
+def square_index(square):
+    """'e4' -> 28; ints pass through. Returns None for anything off the board."""
+    if isinstance(square, int):
+        return square if 0 <= square < 64 else None
+    return SQUARE_INDEX.get(square[:2]) if square else None
+
+
+class Board:
+    """
+    A position parsed once from FEN: 64 squares in a bytearray (ASCII piece
+    letter or 0) plus the side-to-move, castling, en passant and clock fields.
+    The FEN string is rebuilt lazily and cached until the board changes.
+    """
+
+    __slots__ = ("squares", "turn", "castling", "ep_square", "halfmove", "fullmove", "_fen")
+
+    def __init__(self, fen=None):
+        self._fen = None
+        if fen is None:
+            self.squares = bytearray(64)
+            self.turn, self.castling, self.ep_square = "w", "-", "-"
+            self.halfmove, self.fullmove = 0, 1
+            return
+
+        fields = fen.split()
+        # Expand the whole placement at once; rows come rank 8 first, squares are stored rank 1 first.
+        rows = expend_fen_row(fields[0]).split("/")
+        if len(rows) != 8 or any(len(row) != 8 for row in rows):
+            raise ValueError(f"Invalid FEN placement: {fields[0]}")
+        rows.reverse()
+        self.squares = bytearray("".join(rows).encode().replace(b" ", b"\0"))
+
+        self.turn = fields[1] if len(fields) > 1 else "w"
+        self.castling = fields[2] if len(fields) > 2 else "-"
+        self.ep_square = fields[3] if len(fields) > 3 else "-"
+        self.halfmove = int(fields[4]) if len(fields) > 4 else 0
+        self.fullmove = int(fields[5]) if len(fields) > 5 else 1
+        if len(fields) == 6 and fields[4:6] == [str(self.halfmove), str(self.fullmove)]:
+            self._fen = fen
+
+    @classmethod
+    def from_fen(cls, fen):
+        return cls(fen)
+
+    def copy(self):
+        board = Board.__new__(Board)
+        board.squares = bytearray(self.squares)
+        board.turn, board.castling, board.ep_square = self.turn, self.castling, self.ep_square
+        board.halfmove, board.fullmove = self.halfmove, self.fullmove
+        board._fen = self._fen
+        return board
+
+    def piece_at(self, square):
+        """Piece letter on `square` ('e4' or index), or None if empty/invalid."""
+        index = square_index(square)
+        if index is None:
+            return None
+        piece = self.squares[index]
+        return chr(piece) if piece else None
+
+    def set_piece(self, square, piece):
+        index = square_index(square)
+        if index is None:
+            raise ValueError(f"Invalid square: {square}")
+        self.squares[index] = ord(piece) if piece else EMPTY
+        self._fen = None
+
+    def rank(self, number):
+        """The 8 squares of rank `number` (1-8) as a string, ' ' for empty."""
+        base = (number - 1) * 8
+        return self.squares[base:base + 8].replace(b"\0", b" ").decode()
+
+    def placement(self):
+        rows = [_RUNS.sub(lambda m: str(len(m.group())), self.rank(r)) for r in range(8, 0, -1)]
+        return "/".join(rows)
+
+    def fen(self):
+        if self._fen is None:
+            self._fen = (
+                f"{self.placement()} {self.turn} {self.castling} {self.ep_square} "
+                f"{self.halfmove} {self.fullmove}"
+            )
+        return self._fen
+
+    def changed_squares(self, other):
+        """Indices whose contents differ between this board and `other`."""
+        a, b = self.squares, other.squares
+        if a == b:
+            return []
+        return [i for i in range(64) if a[i] != b[i]]
+
+    def __eq__(self, other):
+        return isinstance(other, Board) and self.fen() == other.fen()
+
+    def __hash__(self):
+        return hash(self.fen())
+
+    def __repr__(self):
+        return f"Board('{self.fen()}')"
+
+
+@lru_cache(maxsize=64)
+def _parse_cached(fen):
+    # Never handed out: callers get copies, so nothing can change a cached parse.
+    return Board(fen)
+
+
+def as_board(fen_or_board):
+    """
+    Accept either a FEN or a Board. Recently parsed FENs are cached and each
+    caller gets its own copy, so the result may be modified freely.
+    """
+    if isinstance(fen_or_board, Board):
+        return fen_or_board
+    return _parse_cached(fen_or_board).copy()
+
+
+def get_piece_at_square(fen, square):
+    """Piece letter on `square`, or None if the square is empty or invalid."""
+    try:
+        return as_board(fen).piece_at(square)
+    except ValueError:
+        return None
+
+
+if __name__ == "__main__":
+    import timeit
+
+    fen = "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4"
+
+    def legacy_piece_at(fen, square):
+        # What each helper used to do on every call.
+        col, row = ord(square[0]) - ord("a"), 8 - int(square[1])
+        current_col = 0
+        for char in fen.split(" ")[0].split("/")[row]:
+            if char.isdigit():
+                current_col += int(char)
+            else:
+                if current_col == col:
+                    return char
+                current_col += 1
+        return None
+
+    def legacy_expand(fen):
+        flat = []
+        for row in fen.split()[0].split("/"):
+            for ch in row:
+                flat += [" "] * int(ch) if ch.isdigit() else [ch]
+        return flat
+
+    moved_fen = "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQ1RK1 b kq - 5 4"
+    board, moved = Board(fen), Board(moved_fen)
+    number = 100_000
+    cases = [
+        ("square query (FEN re-parse)", lambda: legacy_piece_at(fen, "c4")),
+        ("square query (Board)", lambda: board.piece_at("c4")),
+        ("full expansion (list)", lambda: legacy_expand(fen)),
+        ("full expansion (Board parse)", lambda: Board(fen)),
+        ("diff two positions (lists)", lambda: [i for i, (a, b) in enumerate(zip(legacy_expand(fen), legacy_expand(moved_fen))) if a != b]),
+        ("diff two positions (Boards)", lambda: board.changed_squares(moved)),
+    ]
+    for name, fn in cases:
+        seconds = timeit.timeit(fn, number=number)
+        print(f"{name:<32} {seconds / number * 1e9:8.0f} ns/call")
@@ -0,0 +1,264 @@
+"""
+Where capture_screenshot_in_memory gets its frames from.
+
+The default ScreenBackend grabs the screen (grim on Wayland, mss elsewhere).
+RecordingBackend tees another backend's frames into a .cpf recording, and
+ReplayBackend plays one back, either at the original timing (each capture
+returns the frame that was on screen at that moment of the session) or
+frame by frame as fast as the caller asks. The active backend can be set in
+code, from the command line, or with CHESSPILOT_CAPTURE:
+
+  CHESSPILOT_CAPTURE=record:session.cpf        record while playing
+  CHESSPILOT_CAPTURE=record-board:session.cpf  record board crops only
+  CHESSPILOT_CAPTURE=replay:session.cpf        replay at recorded timing
+  CHESSPILOT_CAPTURE=replay-fast:session.cpf   replay every frame, no waiting
+  CHESSPILOT_CAPTURE=files:corpus/             cycle through image files
+
+FileBackend needs no display at all, which makes the capture loop testable
+on a headless box.
+"""
+import io
+import os
+import json
+import time
+import logging
+import threading
+import subprocess
+
+from PIL import Image
+
+from .is_wayland import is_wayland
+from .frame_recording import FrameWriter, FrameReader
+from utils.get_binary_path import get_binary_path
+
+logger = logging.getLogger(__name__)
+
+ENV_VAR = "CHESSPILOT_CAPTURE"
+# Board crops keep this much context so the detector still sees the whole board.
+CROP_MARGIN = 0.05
+
+
+class ScreenBackend:
+    name = "screen"
+
+    def capture(self):
+        if is_wayland():
+            logger.debug("Capturing screenshot using grim (Wayland)...")
+            result = subprocess.run([get_binary_path("grim"), "-"], stdout=subprocess.PIPE, check=True)
+            return Image.open(io.BytesIO(result.stdout))
+        logger.debug("Capturing screenshot using mss (non-Wayland)...")
+        import mss
+        with mss.mss() as sct:
+            monitor = sct.monitors[1]
+            sct_img = sct.grab(monitor)
+            return Image.frombytes("RGB", sct_img.size, sct_img.rgb)
+
+    def close(self):
+        pass
+
+
+class RecordingBackend:
+    """Passes frames through from `source` and appends them to a recording."""
+
+    name = "record"
+
+    def __init__(self, path, source=None, board_only=False):
+        self.source = source or ScreenBackend()
+        self.writer = FrameWriter(path)
+        self.board_only = board_only
+        self._crop = None
+
+    def _find_board(self, image):
+        from board_detection import get_positions
+        boxes, _, _ = get_positions(image)
+        boards = [box for box in boxes or [] if box[5] == 12.0]
+        if not boards:
+            return None
+        x, y, w, h = boards[0][:4]
+        margin = int(max(w, h) * CROP_MARGIN)
+        return (max(0, int(x) - margin), max(0, int(y) - margin),
+                min(image.size[0], int(x + w) + margin), min(image.size[1], int(y + h) + margin))
+
+    def capture(self):
+        image = self.source.capture()
+        if image is None:
+            return None
+        stored, offset = image, (0, 0)
+        if self.board_only:
+            if self._crop is None:
+                # Full frames are kept until the board has been found once.
+                self._crop = self._find_board(image)
+            if self._crop:
+                stored, offset = image.crop(self._crop), self._crop[:2]
+        self.writer.write(stored, offset)
+        return image
+
+    def close(self):
+        self.writer.close()
+        self.source.close()
+        if self.writer.raw_bytes:
+            logger.info("Recorded %s: %.1f MB of frames stored in %.1f MB", self.writer.path,
+                        self.writer.raw_bytes / 1e6, self.writer.stored_bytes / 1e6)
+
+
+class ReplayBackend:
+    """Serves frames from a recording; returns None once it is exhausted (unless looping)."""
+
+    name = "replay"
+
+    def __init__(self, path, realtime=True, loop=False, speed=1.0, clock=time.monotonic):
+        self.reader = FrameReader(path)
+        self.realtime = realtime
+        self.loop = loop
+        self.speed = speed
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._frames = None
+        self._current = None
+        self._started = None
+        self.finished = False
+
+    def _restart(self):
+        self._frames = self.reader.frames()
+        self._current = None
+        self._started = self._clock()
+
+    def _advance(self):
+        frame = next(self._frames, None)
+        if frame is None and self.loop and len(self.reader):
+            self._restart()
+            frame = next(self._frames, None)
+        if frame is not None:
+            self._current = frame
+        return frame
+
+    def _frame_on_screen(self):
+        elapsed = (self._clock() - self._started) * self.speed
+        last = len(self.reader) - 1
+        if self.loop and self.reader.duration:
+            elapsed %= self.reader.duration
+        elif elapsed > self.reader.duration and self._current is not None and self._current.index == last:
+            return None
+        target = self.reader.frame_at(elapsed)
+        if self._current is not None and target < self._current.index:
+            # Wrapped around while looping.
+            self._restart()
+        frame = self._current
+        while frame is None or frame.index < target:
+            frame = self._advance()
+            if frame is None:
+                break
+        return frame
+
+    def capture(self):
+        with self._lock:
+            if self._frames is None:
+                self._restart()
+            if not self.realtime:
+                frame = self._advance()
+            else:
+                frame = self._frame_on_screen()
+            if frame is None:
+                if not self.finished:
+                    logger.info("Replay of %s finished", self.reader.path)
+                self.finished = True
+                return None
+            # Callers may draw on or keep the image; the decoded frame is reused.
+            return frame.image.copy()
+
+    def close(self):
+        self.reader.close()
+
+
+class FileBackend:
+    """Serves images from a directory (labels.jsonl order if present) round-robin, decoded up front."""
+
+    name = "files"
+    EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".webp")
+
+    def __init__(self, directory, loop=True, interval=0.0):
+        self.directory = directory
+        self.loop = loop
+        self.interval = interval
+        self.images = [self._load(os.path.join(directory, name)) for name in self._names()]
+        if not self.images:
+            raise ValueError(f"No images found in {directory}")
+        self._lock = threading.Lock()
+        self._next = 0
+        self.finished = False
+
+    def _names(self):
+        labels = os.path.join(self.directory, "labels.jsonl")
+        if os.path.exists(labels):
+            with open(labels, encoding="utf-8") as f:
+                return [json.loads(line)["image"] for line in f if line.strip()]
+        return sorted(name for name in os.listdir(self.directory) if name.lower().endswith(self.EXTENSIONS))
+
+    @staticmethod
+    def _load(path):
+        image = Image.open(path).convert("RGB")
+        image.load()
+        return image
+
+    def capture(self):
+        if self.interval:
+            time.sleep(self.interval)
+        with self._lock:
+            if self._next >= len(self.images):
+                if not self.loop:
+                    self.finished = True
+                    return None
+                self._next = 0
+            image = self.images[self._next]
+            self._next += 1
+        return image.copy()
+
+    def close(self):
+        self.images = []
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_capture_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = backend_from_spec(os.environ.get(ENV_VAR)) or ScreenBackend()
+    return _backend
+
+
+def set_capture_backend(backend):
+    """Install `backend` (closing the previous one) and return it."""
+    global _backend
+    with _backend_lock:
+        previous, _backend = _backend, backend
+    if previous is not None and previous is not backend:
+        previous.close()
+    return backend
+
+
+def backend_from_spec(spec):
+    """Build a backend from "screen", "record:PATH", "record-board:PATH", "replay:PATH", "replay-fast:PATH" or "files:DIR"."""
+    if not spec or spec == "screen":
+        return None
+    kind, _, path = spec.partition(":")
+    if not path:
+        raise ValueError(f"Capture backend '{spec}' needs a file path")
+    if kind == "record":
+        return RecordingBackend(path)
+    if kind == "record-board":
+        return RecordingBackend(path, board_only=True)
+    if kind == "replay":
+        return ReplayBackend(path)
+    if kind == "replay-fast":
+        return ReplayBackend(path, realtime=False)
+    if kind == "files":
+        return FileBackend(path)
+    raise ValueError(f"Unknown capture backend '{kind}'")
+
+
+def close_capture_backend():
+    set_capture_backend(None)
@@ -0,0 +1,269 @@
+import os
+import re
+import time
+import logging
+import subprocess
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Leave one core for the GUI, screen capture and ONNX inference.
+RESERVED_CORES = 1
+# Share of available RAM the transposition tables may use in total.
+HASH_MEMORY_FRACTION = 0.25
+MIN_HASH_MB = 16
+MAX_HASH_MB = 4096
+# An extra thread has to buy at least this much nps to be worth a core.
+MIN_THREAD_GAIN = 1.15
+# Hash sizes within this share of the best nps count as equally fast; the
+# smallest of them is kept, since more Hash only costs memory and allocation.
+MAX_HASH_NPS_LOSS = 0.05
+
+_NPS_RE = re.compile(r"Nodes/second\s*:\s*(\d+)")
+
+
+def get_cpu_count():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def get_available_memory_mb():
+    """Available physical memory in MB, or None if it cannot be determined."""
+    if os.name == "nt":
+        import ctypes
+
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [
+                ("dwLength", ctypes.c_ulong),
+                ("dwMemoryLoad", ctypes.c_ulong),
+                ("ullTotalPhys", ctypes.c_ulonglong),
+                ("ullAvailPhys", ctypes.c_ulonglong),
+                ("ullTotalPageFile", ctypes.c_ulonglong),
+                ("ullAvailPageFile", ctypes.c_ulonglong),
+                ("ullTotalVirtual", ctypes.c_ulonglong),
+                ("ullAvailVirtual", ctypes.c_ulonglong),
+                ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+            ]
+
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullAvailPhys // (1024 * 1024)
+        return None
+
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def _power_of_two_floor(value):
+    power = 1
+    while power * 2 <= value:
+        power *= 2
+    return power
+
+
+def hash_budget_mb(available_mb, engines=1):
+    """Largest power-of-two Hash per engine that fits the memory budget."""
+    if not available_mb:
+        return 256
+    budget = int(available_mb * HASH_MEMORY_FRACTION) // max(1, engines)
+    return max(MIN_HASH_MB, min(MAX_HASH_MB, _power_of_two_floor(max(1, budget))))
+
+
+def default_pool_size(cores=None):
+    cores = cores or get_cpu_count()
+    return max(1, cores - RESERVED_CORES)
+
+
+def recommended_settings(cores=None, available_mb=None, pool_size=None):
+    """
+    Hardware-based defaults used when no benchmark has been run:
+    the interactive engine gets every spare core, the batch pool one thread per engine.
+    """
+    cores = cores or get_cpu_count()
+    if available_mb is None:
+        available_mb = get_available_memory_mb()
+    pool_size = pool_size or default_pool_size(cores)
+    return {
+        "interactive": {
+            "Threads": max(1, cores - RESERVED_CORES),
+            "Hash": hash_budget_mb(available_mb),
+        },
+        "batch": {
+            "Threads": max(1, (cores - RESERVED_CORES) // pool_size),
+            "Hash": hash_budget_mb(available_mb, pool_size),
+            "pool_size": pool_size,
+        },
+    }
+
+
+def _thread_candidates(max_threads):
+    candidates, threads = [], 1
+    while threads < max_threads:
+        candidates.append(threads)
+        threads *= 2
+    candidates.append(max_threads)
+    return candidates
+
+
+def _hash_candidates(max_hash):
+    candidates, size = [], MIN_HASH_MB
+    while size < max_hash:
+        candidates.append(size)
+        size *= 4
+    candidates.append(max_hash)
+    return candidates
+
+
+def _start_bench(stockfish_path, threads, hash_mb, depth):
+    command = [stockfish_path, "bench", str(hash_mb), str(threads), str(depth), "default", "depth"]
+    return subprocess.Popen(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        creationflags=subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0,
+    )
+
+
+def _collect_nps(process):
+    output, _ = process.communicate()
+    match = _NPS_RE.search(output or "")
+    if process.returncode != 0 or not match:
+        logger.warning("Bench run failed (exit code %s)", process.returncode)
+        return 0
+    return int(match.group(1))
+
+
+def run_bench(stockfish_path, threads, hash_mb, depth=12, instances=1):
+    """
+    Run Stockfish's built-in bench and return the total nodes/second.
+    With instances > 1 the benches run side by side, as a pool of engines would.
+    """
+    start = time.perf_counter()
+    processes = [_start_bench(stockfish_path, threads, hash_mb, depth) for _ in range(instances)]
+    nps = sum(_collect_nps(p) for p in processes)
+    logger.info(
+        f"bench Threads={threads} Hash={hash_mb} x{instances}: "
+        f"{nps} nps in {time.perf_counter() - start:.1f}s"
+    )
+    return nps
+
+
+def _pick_threads(results):
+    """Smallest thread count after which extra threads stop paying off."""
+    best_threads, best_nps = None, 0
+    for threads, nps in sorted(results.items()):
+        if best_threads is None or nps >= best_nps * MIN_THREAD_GAIN:
+            best_threads, best_nps = threads, nps
+    return best_threads, best_nps
+
+
+def _pick_hash(results):
+    """Smallest hash whose nps stays close to the best measured."""
+    top_nps = max(results.values())
+    fitting = [h for h, nps in results.items() if nps >= top_nps * (1 - MAX_HASH_NPS_LOSS)]
+    return min(fitting)
+
+
+def _tune_profile(stockfish_path, max_threads, max_hash, depth, instances=1):
+    thread_results = {
+        t: run_bench(stockfish_path, t, MIN_HASH_MB, depth, instances)
+        for t in _thread_candidates(max_threads)
+    }
+    threads, nps = _pick_threads(thread_results)
+    if not nps:
+        return None
+
+    hash_results = {
+        h: run_bench(stockfish_path, threads, h, depth, instances)
+        for h in _hash_candidates(max_hash)
+    }
+    hash_mb = _pick_hash(hash_results)
+    return {"Threads": threads, "Hash": hash_mb, "nps": hash_results[hash_mb]}
+
+
+def autotune(stockfish_path, depth=12, pool_size=None):
+    """
+    Benchmark Threads/Hash on this machine and return per-profile settings.
+    The interactive profile is tuned for a single engine, the batch profile
+    for `pool_size` engines running concurrently.
+    """
+    cores = get_cpu_count()
+    available_mb = get_available_memory_mb()
+    pool_size = pool_size or default_pool_size(cores)
+    usable_cores = max(1, cores - RESERVED_CORES)
+    logger.info("Autotuning on %s cores, %s MB available, pool of %s", cores, available_mb, pool_size)
+
+    interactive = _tune_profile(stockfish_path, usable_cores, hash_budget_mb(available_mb), depth)
+    batch = _tune_profile(
+        stockfish_path,
+        max(1, usable_cores // pool_size),
+        hash_budget_mb(available_mb, pool_size),
+        depth,
+        instances=pool_size,
+    )
+    if not interactive or not batch:
+        raise RuntimeError("Stockfish bench produced no results")
+
+    batch["pool_size"] = pool_size
+    return {
+        "cores": cores,
+        "available_mb": available_mb,
+        "interactive": interactive,
+        "batch": batch,
+    }
+
+
+def write_engine_config(config_path, profiles, common_lines=()):
+    """
+    Write the profiles in the sectioned engine_config.txt format. Profiles
+    from autotune() carry the cores and memory they were tuned for; without
+    them the header says these are untested defaults.
+    """
+    generated = datetime.now().strftime("%Y-%m-%d %H:%M")
+    if "cores" in profiles:
+        origin = [
+            f"# Tuned on {generated} for {profiles['cores']} cores and "
+            f"{profiles.get('available_mb') or '?'} MB of available memory.",
+            "# Re-run `python src/autotune.py` after changing hardware.",
+        ]
+    else:
+        origin = [
+            f"# Defaults written on {generated}; nothing has been benchmarked yet.",
+            "# Run `python src/autotune.py` to tune Threads and Hash for this machine.",
+        ]
+    lines = [
+        "# ================================",
+        "# ChessPilot Engine Configuration",
+        "# ================================",
+        *origin,
+        "# Lines above the first [section] apply to every engine.",
+        "",
+        *common_lines,
+    ]
+    for name in ("interactive", "batch"):
+        settings = profiles[name]
+        lines += ["", f"[{name}]"]
+        if "nps" in settings:
+            lines.append(f"# bench: {settings['nps']} nodes/second")
+        if "pool_size" in settings:
+            lines.append(f"pool_size {settings['pool_size']}")
+        lines.append(f"setoption name Hash value {settings['Hash']}")
+        lines.append(f"setoption name Threads value {settings['Threads']}")
+
+    with open(config_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    logger.info("Wrote engine config to %s", config_path)
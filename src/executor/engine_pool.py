@@ -0,0 +1,104 @@
+import logging
+import threading
+from queue import Queue
+from concurrent.futures import ThreadPoolExecutor
+
+from executor.bitboard import repair_fen, fen_after_move
+from executor.engine_autotune import default_pool_size
+from executor.game_tracker import engine_position
+from executor.get_best_move import create_supervisor, read_engine_config
+
+logger = logging.getLogger(__name__)
+
+
+class EnginePool:
+    """
+    A fixed set of supervised engines (the `batch` profile by default) for
+    running many independent searches in parallel. Each job gets exclusive
+    use of one engine for its duration.
+    """
+
+    def __init__(self, size=None, profile="batch", name="pool", options=None):
+        _, settings = read_engine_config(profile)
+        if size is None:
+            size = int(settings.get("pool_size", 0)) or default_pool_size()
+        self.size = size
+        self.profile = profile
+        self._supervisors = [create_supervisor(profile, name=f"{name}-{i}", options=options) for i in range(size)]
+        self._idle = Queue()
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix=name)
+        self._closed = False
+
+    def start(self):
+        """Spawn every engine in parallel; engines that fail to start are left out."""
+        errors = {}
+
+        def start_one(supervisor):
+            try:
+                supervisor.start()
+            except Exception as e:
+                errors[supervisor.name] = e
+
+        threads = [threading.Thread(target=start_one, args=(s,), daemon=True) for s in self._supervisors]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        started = [s for s in self._supervisors if s.name not in errors]
+        for name, error in errors.items():
+            logger.error("Engine %s failed to start: %s", name, error)
+        if not started:
+            raise RuntimeError("No engine in the pool could be started")
+        for supervisor in started:
+            self._idle.put(supervisor)
+        logger.info("Engine pool ready with %s/%s %s engines", len(started), self.size, self.profile)
+        return self
+
+    def _run(self, job):
+        supervisor = self._idle.get()
+        try:
+            return job(supervisor)
+        finally:
+            self._idle.put(supervisor)
+
+    def submit(self, job):
+        """Run `job(supervisor)` on the next free engine; returns a Future."""
+        if self._closed:
+            raise RuntimeError("Engine pool is shut down")
+        return self._executor.submit(self._run, job)
+
+    def analyse(self, fen, depth=None, movetime=None, history=None):
+        """
+        Future resolving to the supervisor's search dict for `fen` (plus
+        updated_fen), or raising ValueError for an impossible position.
+        """
+        repaired = repair_fen(fen)
+        if repaired is None:
+            raise ValueError(f"Impossible position: {fen}")
+        if history:
+            root = repair_fen(history[0])
+            if root is None:
+                raise ValueError(f"Impossible position: {history[0]}")
+            if root != history[0]:
+                history = None
+        if repaired != fen:
+            history = None
+        go = f"movetime {int(movetime)}" if movetime else f"depth {int(depth or 15)}"
+        position = engine_position(*history) if history else f"fen {repaired}"
+
+        def job(supervisor):
+            result = supervisor.search(position, go)
+            result["fen"] = repaired
+            if result["best_move"]:
+                result["updated_fen"] = fen_after_move(repaired, result["best_move"])
+            return result
+
+        return self.submit(job)
+
+    def shutdown(self):
+        self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for supervisor in self._supervisors:
+            supervisor.stop()
+            supervisor.shutdown()
@@ -0,0 +1,185 @@
+import time
+import heapq
+import logging
+import itertools
+import threading
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+# Lower value = more urgent.
+INTERACTIVE = 0
+BACKGROUND = 1
+BATCH = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background", BATCH: "batch"}
+
+
+class EngineRequest:
+    __slots__ = ("job", "priority", "seq", "key", "is_current", "resume",
+                 "future", "submitted", "started", "preempted", "dropped")
+
+    def __init__(self, job, priority, seq, key, is_current, resume):
+        self.job = job
+        self.priority = priority
+        self.seq = seq
+        self.key = key
+        self.is_current = is_current
+        self.resume = resume
+        self.future = Future()
+        self.submitted = time.monotonic()
+        self.started = False
+        self.preempted = False
+        self.dropped = False
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class EngineScheduler:
+    """
+    Runs engine jobs one at a time in priority order. A more urgent request
+    preempts the running search with `stop`; the preempted job is re-queued
+    (and benefits from the warm hash) unless it asked not to be resumed.
+    Requests sharing a `key` coalesce: a newer one supersedes older pending
+    or running ones, and requests whose `is_current()` turns False are dropped.
+    """
+
+    def __init__(self, supervisor, name="scheduler"):
+        self.supervisor = supervisor
+        self._queue = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._running = None
+        self._closing = False
+        self._stats = {
+            p: {"submitted": 0, "completed": 0, "dropped": 0, "preempted": 0,
+                "wait_total": 0.0, "wait_max": 0.0, "waits": 0}
+            for p in PRIORITY_NAMES
+        }
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, job, priority=BACKGROUND, key=None, is_current=None, resume=True):
+        """
+        Queue `job(supervisor)` and return a Future with its result.
+        The future is cancelled if the request is coalesced or dropped.
+        """
+        with self._cond:
+            if self._closing:
+                raise RuntimeError("Engine scheduler is shut down")
+            request = EngineRequest(job, priority, next(self._seq), key, is_current, resume)
+            self._stats[priority]["submitted"] += 1
+
+            if key is not None:
+                for pending in self._queue:
+                    if pending.key == key and not pending.dropped:
+                        self._drop(pending, "superseded")
+                running = self._running
+                if running and running.key == key and not running.dropped:
+                    running.dropped = True
+                    self.supervisor.stop()
+
+            running = self._running
+            if running and priority < running.priority and not running.preempted:
+                logger.debug("Preempting %s search for %s request",
+                             PRIORITY_NAMES[running.priority], PRIORITY_NAMES[priority])
+                running.preempted = True
+                self._stats[running.priority]["preempted"] += 1
+                self.supervisor.stop()
+
+            heapq.heappush(self._queue, request)
+            self._cond.notify()
+        return request.future
+
+    def _drop(self, request, reason):
+        request.dropped = True
+        # A resumed request's future is already running and can only be resolved.
+        if not request.future.cancel() and not request.future.done():
+            request.future.set_result(None)
+        self._stats[request.priority]["dropped"] += 1
+        logger.debug("Dropped %s request (%s)", PRIORITY_NAMES[request.priority], reason)
+
+    def _next_request(self):
+        with self._cond:
+            while True:
+                while not self._queue and not self._closing:
+                    self._cond.wait()
+                if self._closing:
+                    return None
+                request = heapq.heappop(self._queue)
+                if request.dropped:
+                    continue
+                if request.is_current and not request.is_current():
+                    self._drop(request, "position no longer on screen")
+                    continue
+                if not request.started:
+                    if not request.future.set_running_or_notify_cancel():
+                        continue
+                    request.started = True
+                    wait = time.monotonic() - request.submitted
+                    stats = self._stats[request.priority]
+                    stats["waits"] += 1
+                    stats["wait_total"] += wait
+                    stats["wait_max"] = max(stats["wait_max"], wait)
+                request.preempted = False
+                self.supervisor.clear_stop()
+                self._running = request
+                return request
+
+    def _run(self):
+        while True:
+            request = self._next_request()
+            if request is None:
+                return
+            try:
+                result = request.job(self.supervisor)
+            except Exception as e:
+                with self._cond:
+                    self._running = None
+                request.future.set_exception(e)
+                continue
+
+            with self._cond:
+                self._running = None
+                if request.dropped:
+                    # Superseded while running; the stale answer is discarded.
+                    self._stats[request.priority]["dropped"] += 1
+                    request.future.set_result(None)
+                    continue
+                if request.preempted and request.resume and not self._closing:
+                    # Keep the original sequence number so it runs right after the preemptor.
+                    heapq.heappush(self._queue, request)
+                    continue
+                self._stats[request.priority]["completed"] += 1
+                if request.preempted and isinstance(result, dict):
+                    result["preempted"] = True
+            request.future.set_result(result)
+
+    def get_stats(self):
+        """Per-priority-class request counters and queue wait times in milliseconds."""
+        with self._cond:
+            report = {}
+            for priority, stats in self._stats.items():
+                waits = stats["waits"]
+                report[PRIORITY_NAMES[priority]] = {
+                    "submitted": stats["submitted"],
+                    "completed": stats["completed"],
+                    "dropped": stats["dropped"],
+                    "preempted": stats["preempted"],
+                    "pending": sum(1 for r in self._queue if r.priority == priority and not r.dropped),
+                    "wait_avg_ms": round(stats["wait_total"] / waits * 1000, 2) if waits else 0.0,
+                    "wait_max_ms": round(stats["wait_max"] * 1000, 2),
+                }
+            return report
+
+    def shutdown(self):
+        with self._cond:
+            self._closing = True
+            for request in self._queue:
+                if not request.future.cancel() and not request.future.done():
+                    request.future.set_result(None)
+            self._queue.clear()
+            self._cond.notify_all()
+        self.supervisor.stop()
+        self._worker.join(timeout=5)
+
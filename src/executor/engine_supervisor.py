@@ -0,0 +1,346 @@
+import os
+import time
+import logging
+import threading
+import subprocess
+from queue import Queue, Empty
+
+logger = logging.getLogger(__name__)
+
+READY_TIMEOUT = 15.0
+# Stockfish prints at least one info line per second once a search runs
+# longer than a few seconds, so this much silence means the engine is stuck.
+STALL_TIMEOUT = 15.0
+STOP_GRACE = 2.0
+WATCHDOG_INTERVAL = 1.0
+
+
+class EngineError(Exception):
+    pass
+
+
+class EngineTimeout(EngineError):
+    pass
+
+
+class EngineCrashed(EngineError):
+    pass
+
+
+class EngineGarbled(EngineError):
+    pass
+
+
+def is_garbled(line):
+    """True for output no engine prints mid-search: control bytes, decode errors or unknown commands."""
+    if not line.isprintable() or "\ufffd" in line:
+        return True
+    return line.split(maxsplit=1)[0] not in ("info", "bestmove")
+
+
+def parse_info(line):
+    """Pull depth, score, nodes, nps, time and pv out of a UCI 'info' line."""
+    tokens = line.split()
+    info = {}
+    i = 1
+    while i < len(tokens):
+        token = tokens[i]
+        if token in ("depth", "seldepth", "multipv", "nodes", "nps", "time", "tbhits", "hashfull"):
+            if i + 1 < len(tokens) and tokens[i + 1].lstrip("-").isdigit():
+                info[token] = int(tokens[i + 1])
+            i += 2
+        elif token == "score" and i + 2 < len(tokens):
+            kind, value = tokens[i + 1], tokens[i + 2]
+            if kind in ("cp", "mate") and value.lstrip("-").isdigit():
+                info[f"score_{kind}"] = int(value)
+            i += 3
+        elif token == "pv":
+            info["pv"] = tokens[i + 1:]
+            break
+        elif token == "string":
+            break
+        else:
+            i += 1
+    return info
+
+
+class UciEngine:
+    """A single engine process whose stdout is drained by a dedicated reader thread."""
+
+    def __init__(self, command, name="engine"):
+        self.name = name
+        self.process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1,
+            creationflags=subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0,
+        )
+        self.lines = Queue()
+        self.last_output = time.monotonic()
+        self._write_lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read_loop, name=f"{name}-reader", daemon=True)
+        self._reader.start()
+
+    def _read_loop(self):
+        try:
+            for line in self.process.stdout:
+                self.last_output = time.monotonic()
+                self.lines.put(line.strip())
+        except (OSError, ValueError):
+            pass
+        # EOF: the process exited or closed its output.
+        self.lines.put(None)
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def send(self, *commands):
+        try:
+            with self._write_lock:
+                for command in commands:
+                    self.process.stdin.write(f"{command}\n")
+                self.process.stdin.flush()
+        except (OSError, ValueError) as e:
+            raise EngineCrashed(f"{self.name}: cannot write to engine: {e}") from e
+
+    def read_line(self, timeout):
+        """Next output line; raises EngineTimeout after `timeout` seconds of silence."""
+        try:
+            line = self.lines.get(timeout=timeout)
+        except Empty:
+            raise EngineTimeout(f"{self.name}: no output for {timeout:.1f}s") from None
+        if line is None:
+            self.lines.put(None)
+            raise EngineCrashed(f"{self.name}: engine exited (code {self.process.poll()})")
+        return line
+
+    def read_until(self, predicate, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise EngineTimeout(f"{self.name}: timed out after {timeout:.1f}s")
+            line = self.read_line(remaining)
+            if predicate(line):
+                return line
+
+    def sync(self, timeout=READY_TIMEOUT):
+        """Round-trip an isready so stale output from earlier commands is discarded."""
+        self.send("isready")
+        self.read_until(lambda line: line == "readyok", timeout)
+
+    def kill(self):
+        try:
+            self.send("quit")
+        except EngineCrashed:
+            pass
+        try:
+            self.process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+class EngineSupervisor:
+    """
+    Owns the active engine plus a pre-initialized hot spare. Searches read
+    through deadlines; a crashed or stalled engine is replaced by the spare,
+    so recovery costs a pointer swap instead of a spawn, Hash allocation and
+    isready handshake. A watchdog thread does the same for engines that die
+    while idle.
+    """
+
+    def __init__(self, command, configure, name="stockfish", hot_spare=True):
+        self.command = command
+        self.configure = configure
+        self.name = name
+        self.hot_spare = hot_spare
+        self.restarts = 0
+        self._active = None
+        self._spare = None
+        self._spawn_count = 0
+        self._lock = threading.RLock()
+        self._search_lock = threading.Lock()
+        self._spare_lock = threading.Lock()
+        self._closing = threading.Event()
+        self._stop_requested = threading.Event()
+        self._watchdog = None
+
+    def _spawn(self):
+        self._spawn_count += 1
+        engine = UciEngine(self.command, name=f"{self.name}-{self._spawn_count}")
+        try:
+            self.configure(engine)
+        except Exception:
+            engine.kill()
+            raise
+        return engine
+
+    def _prepare_spare(self):
+        with self._spare_lock:
+            if self._closing.is_set() or (self._spare and self._spare.is_alive()):
+                return
+            try:
+                spare = self._spawn()
+            except Exception as e:
+                logger.warning("Could not prepare hot-spare engine: %s", e)
+                return
+            if self._closing.is_set():
+                spare.kill()
+                return
+            self._spare = spare
+            logger.debug("Hot-spare engine %s ready", spare.name)
+
+    def _prepare_spare_async(self):
+        if self.hot_spare:
+            threading.Thread(target=self._prepare_spare, name=f"{self.name}-spare", daemon=True).start()
+
+    def start(self):
+        with self._lock:
+            if self._active and self._active.is_alive():
+                return self
+            self._closing.clear()
+            self._active = self._spawn()
+            logger.info("Engine %s initialized", self._active.name)
+        self._prepare_spare_async()
+        if self._watchdog is None or not self._watchdog.is_alive():
+            self._watchdog = threading.Thread(target=self._watch, name=f"{self.name}-watchdog", daemon=True)
+            self._watchdog.start()
+        return self
+
+    def restart(self, reason):
+        """Replace the active engine, preferring the hot spare."""
+        with self._lock:
+            old = self._active
+            with self._spare_lock:
+                spare, self._spare = self._spare, None
+            if spare and spare.is_alive():
+                self._active = spare
+                logger.warning("Swapped in hot-spare engine %s (%s)", spare.name, reason)
+            else:
+                logger.warning("Cold-restarting engine (%s)", reason)
+                self._active = None
+                self._active = self._spawn()
+            self.restarts += 1
+        if old:
+            threading.Thread(target=old.kill, daemon=True).start()
+        self._prepare_spare_async()
+
+    def _watch(self):
+        while not self._closing.wait(WATCHDOG_INTERVAL):
+            active = self._active
+            if active and not active.is_alive() and not self._search_lock.locked():
+                try:
+                    self.restart("engine exited while idle")
+                except Exception as e:
+                    logger.error("Engine restart failed: %s", e)
+            spare = self._spare
+            if self.hot_spare and (spare is None or not spare.is_alive()) and not self._spare_lock.locked():
+                self._prepare_spare_async()
+
+    def _engine(self):
+        with self._lock:
+            if self._active is None or not self._active.is_alive():
+                if self._active is None:
+                    self.start()
+                else:
+                    self.restart("engine not running")
+            return self._active
+
+    def stop(self):
+        """
+        Ask the running (or about to start) search to finish now; it still
+        returns its bestmove. Stays in effect until clear_stop().
+        """
+        self._stop_requested.set()
+        active = self._active
+        if active and self._search_lock.locked():
+            try:
+                active.send("stop")
+            except EngineCrashed:
+                pass
+
+    def clear_stop(self):
+        self._stop_requested.clear()
+
+    def search(self, position, go="depth 15", stall_timeout=STALL_TIMEOUT, timeout=None, on_info=None):
+        """
+        Run `position <position>` + `go <go>` and return a result dict with
+        best_move, ponder, mate_flag and the last reported depth/score/nodes/nps/time.
+        `on_info(info, elapsed)` is called for every scored info line.
+        """
+        with self._search_lock:
+            engine = self._engine()
+            try:
+                return self._search(engine, position, go, stall_timeout, timeout, on_info)
+            except EngineError as e:
+                # A crashed, hung or garbled engine costs one retry on the hot
+                # spare instead of a failed request.
+                self.restart(str(e))
+                engine = self._engine()
+            try:
+                return self._search(engine, position, go, stall_timeout, timeout, on_info)
+            except EngineError as e:
+                self.restart(str(e))
+                raise
+
+    def _search(self, engine, position, go, stall_timeout, timeout, on_info=None):
+        engine.sync()
+        engine.send(f"position {position}", f"go {go}")
+        if self._stop_requested.is_set():
+            engine.send("stop")
+        started = time.monotonic()
+        deadline = started + timeout if timeout else None
+        result = {"best_move": None, "ponder": None, "mate_flag": False}
+        stopping = False
+
+        while True:
+            wait = STOP_GRACE if stopping else stall_timeout
+            if deadline and not stopping:
+                wait = min(wait, max(0.0, deadline - time.monotonic()))
+            try:
+                line = engine.read_line(wait)
+            except EngineTimeout:
+                if stopping:
+                    raise EngineTimeout(f"{engine.name}: no bestmove after stop")
+                if deadline and time.monotonic() >= deadline:
+                    logger.debug("%s: %.1fs deadline reached, sending stop", engine.name, timeout)
+                else:
+                    logger.warning("%s: search stalled, sending stop", engine.name)
+                engine.send("stop")
+                stopping = True
+                continue
+
+            if not line:
+                continue
+            if is_garbled(line):
+                raise EngineGarbled(f"{engine.name}: garbled output {line[:40]!r}")
+            if line.startswith("info") and " score " in line:
+                info = parse_info(line)
+                result.pop("score_cp", None)
+                result.pop("score_mate", None)
+                result.update(info)
+                if info.get("score_mate") in (1, -1):
+                    result["mate_flag"] = True
+                if on_info:
+                    on_info(info, time.monotonic() - started)
+            elif line.startswith("bestmove"):
+                parts = line.split()
+                if len(parts) > 1 and parts[1] != "(none)":
+                    result["best_move"] = parts[1]
+                if len(parts) > 3 and parts[2] == "ponder":
+                    result["ponder"] = parts[3]
+                result["elapsed"] = time.monotonic() - started
+                return result
+
+    def shutdown(self):
+        self._closing.set()
+        with self._lock:
+            with self._spare_lock:
+                engines = [e for e in (self._active, self._spare) if e]
+                self._active = self._spare = None
+        for engine in engines:
+            engine.kill()
@@ -1,8 +1,7 @@
+_DIGITS = [(str(n), " " * n) for n in range(1, 9)]
+
 def expend_fen_row(row):
-    expanded = ""
-    for char in row:
-        if char.isdigit():
-            expanded += " " * int(char)
-        else:
-            expanded += char
-    return expanded
\ No newline at end of file
+    # str.replace per digit beats both a char loop and str.translate here.
+    for digit, spaces in _DIGITS:
+        row = row.replace(digit, spaces)
+    return row
\ No newline at end of file
@@ -0,0 +1,215 @@
+"""
+Chunked frame recording format (.cpf).
+
+A file is a header followed by one chunk per frame:
+
+  header  b"CPFRAME1"
+  chunk   struct FRAME_HEADER: tag b"FRAM", frame index, timestamp (seconds
+          since the first frame), width, height, x/y offset of the stored
+          region on screen, mode, flags, payload length; then the payload
+
+The payload is the zlib-compressed raw RGB bytes for key frames, and for
+delta frames the zlib-compressed XOR against the previous frame of the same
+size, which is mostly zeros for a static board and compresses very well. A
+key frame is forced every `keyframe_interval` frames. Closing the writer
+appends an index chunk (key frame offsets and all timestamps) and a trailer
+pointing at it; a recording cut short by a crash has no index and is read
+by scanning.
+"""
+import os
+import time
+import zlib
+import struct
+import bisect
+import threading
+
+from PIL import Image
+
+MAGIC = b"CPFRAME1"
+FRAME_TAG = b"FRAM"
+INDEX_TAG = b"INDX"
+FRAME_HEADER = struct.Struct("<4sIdIIiiBBI")
+TRAILER = struct.Struct("<4sQ")
+FLAG_DELTA = 1
+MODES = {1: "RGB", 2: "L"}
+MODE_CODES = {mode: code for code, mode in MODES.items()}
+KEYFRAME_INTERVAL = 30
+COMPRESSION_LEVEL = 1
+
+
+def _xor(a, b):
+    # One big-int XOR runs at memory speed and needs no numpy.
+    return (int.from_bytes(a, "little") ^ int.from_bytes(b, "little")).to_bytes(len(a), "little")
+
+
+class FrameWriter:
+    """Append frames to a .cpf file; thread-safe, usable as a context manager."""
+
+    def __init__(self, path, keyframe_interval=KEYFRAME_INTERVAL, level=COMPRESSION_LEVEL, clock=None):
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self.level = level
+        self._clock = clock or time.monotonic
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+        self._lock = threading.Lock()
+        self._start = None
+        self._previous = None
+        self._count = 0
+        self._keyframes = []
+        self._timestamps = []
+        self.raw_bytes = 0
+        self.stored_bytes = len(MAGIC)
+
+    def write(self, image, offset=(0, 0), timestamp=None):
+        """Store `image` (PIL); `offset` is where the region sits on screen when only a crop is kept."""
+        if image.mode not in MODE_CODES:
+            image = image.convert("RGB")
+        raw = image.tobytes()
+        with self._lock:
+            now = self._clock() if timestamp is None else timestamp
+            if self._start is None:
+                self._start = now
+            key = (image.size, image.mode)
+            delta = (self._previous is not None and self._previous[0] == key
+                     and self._count % self.keyframe_interval != 0)
+            payload = zlib.compress(_xor(raw, self._previous[1]) if delta else raw, self.level)
+            position = self._file.tell()
+            self._file.write(FRAME_HEADER.pack(FRAME_TAG, self._count, now - self._start, image.size[0],
+                                               image.size[1], offset[0], offset[1], MODE_CODES[image.mode],
+                                               FLAG_DELTA if delta else 0, len(payload)))
+            self._file.write(payload)
+            if not delta:
+                self._keyframes.append((self._count, position))
+            self._timestamps.append(now - self._start)
+            self._previous = (key, raw)
+            self._count += 1
+            self.raw_bytes += len(raw)
+            self.stored_bytes += FRAME_HEADER.size + len(payload)
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            index_offset = self._file.tell()
+            body = struct.pack(f"<I{len(self._keyframes) * 2}Q", len(self._keyframes),
+                               *[v for pair in self._keyframes for v in pair])
+            body += struct.pack(f"<I{len(self._timestamps)}d", len(self._timestamps), *self._timestamps)
+            self._file.write(INDEX_TAG + struct.pack("<I", len(body)) + body)
+            self._file.write(TRAILER.pack(INDEX_TAG, index_offset))
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Frame:
+    __slots__ = ("index", "timestamp", "image", "offset")
+
+    def __init__(self, index, timestamp, image, offset):
+        self.index = index
+        self.timestamp = timestamp
+        self.image = image
+        self.offset = offset
+
+
+class FrameReader:
+    """Random and sequential access to a .cpf file through a memory map."""
+
+    def __init__(self, path):
+        import mmap
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a ChessPilot frame recording")
+        self.keyframes, self.timestamps = self._load_index()
+
+    def _load_index(self):
+        data = self._map
+        if len(data) >= len(MAGIC) + TRAILER.size:
+            tag, index_offset = TRAILER.unpack_from(data, len(data) - TRAILER.size)
+            if tag == INDEX_TAG and data[index_offset:index_offset + 4] == INDEX_TAG:
+                pos = index_offset + 8
+                (count,) = struct.unpack_from("<I", data, pos)
+                pairs = struct.unpack_from(f"<{count * 2}Q", data, pos + 4)
+                pos += 4 + count * 16
+                (n,) = struct.unpack_from("<I", data, pos)
+                timestamps = list(struct.unpack_from(f"<{n}d", data, pos + 4))
+                keyframes = [(pairs[i], pairs[i + 1]) for i in range(0, len(pairs), 2)]
+                return keyframes, timestamps
+        # No index (interrupted recording): scan the chunks, ignoring a torn tail.
+        keyframes, timestamps = [], []
+        pos = len(MAGIC)
+        while pos + FRAME_HEADER.size <= len(data):
+            tag, index, ts, _, _, _, _, _, flags, length = FRAME_HEADER.unpack_from(data, pos)
+            if tag != FRAME_TAG or pos + FRAME_HEADER.size + length > len(data):
+                break
+            if not flags & FLAG_DELTA:
+                keyframes.append((index, pos))
+            timestamps.append(ts)
+            pos += FRAME_HEADER.size + length
+        return keyframes, timestamps
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def duration(self):
+        return self.timestamps[-1] if self.timestamps else 0.0
+
+    def _decode_from(self, position):
+        """Yield (header fields, raw bytes) from the chunk at `position` onwards."""
+        data = self._map
+        previous = None
+        while position + FRAME_HEADER.size <= len(data):
+            header = FRAME_HEADER.unpack_from(data, position)
+            tag, length, flags = header[0], header[9], header[8]
+            if tag != FRAME_TAG:
+                return
+            start = position + FRAME_HEADER.size
+            if start + length > len(data):
+                return
+            raw = zlib.decompress(data[start:start + length])
+            if flags & FLAG_DELTA:
+                raw = _xor(raw, previous)
+            previous = raw
+            yield header, raw
+            position = start + length
+
+    @staticmethod
+    def _frame(header, raw):
+        _, index, ts, width, height, x, y, mode, _, _ = header
+        return Frame(index, ts, Image.frombytes(MODES[mode], (width, height), raw), (x, y))
+
+    def frames(self, start=0):
+        """Decode frames in order from index `start`."""
+        if not self.keyframes:
+            return
+        k = bisect.bisect_right([i for i, _ in self.keyframes], start) - 1
+        for header, raw in self._decode_from(self.keyframes[max(k, 0)][1]):
+            if header[1] >= start:
+                yield self._frame(header, raw)
+
+    def __iter__(self):
+        return self.frames()
+
+    def frame_at(self, seconds):
+        """Index of the frame on screen `seconds` after the recording started."""
+        return max(0, bisect.bisect_right(self.timestamps, seconds) - 1)
+
+    def close(self):
+        if hasattr(self._map, "close"):
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,170 @@
+import logging
+import threading
+
+from executor.bitboard import (
+    Position,
+    STARTING_FEN,
+    WHITE,
+    BLACK,
+    KING,
+    ROOK,
+    CASTLING_MOVES,
+    WHITE_OO,
+    WHITE_OOO,
+    move_to_uci,
+    repair_fen,
+)
+
+logger = logging.getLogger(__name__)
+
+STARTING_PLACEMENT = STARTING_FEN.split()[0]
+# Unmatched placements must be seen this many times in a row before the
+# tracker gives up on its history; a single misread frame is ignored.
+RESYNC_FRAMES = 2
+
+
+def infer_castling(position):
+    """Grant every castling right whose king and rook still stand on their home squares."""
+    rights = 0
+    for right, (king_from, _, rook_from, _, _, _) in CASTLING_MOVES.items():
+        color = WHITE if right in (WHITE_OO, WHITE_OOO) else BLACK
+        if (position.bb[color * 6 + KING] >> king_from) & 1 and (position.bb[color * 6 + ROOK] >> rook_from) & 1:
+            rights |= right
+    return rights
+
+
+class GameTracker:
+    """
+    Follows a game from successive recognized placements. Each new placement
+    is matched against the legal moves of the tracked position (one ply, or
+    two when a frame was missed), so castling, en passant, promotions and the
+    clocks come out right and the engine can be sent the root plus the full
+    move list instead of a bare FEN.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self, fen=None):
+        with self._lock:
+            self.root_fen = None
+            self.moves = []
+            self.position = None
+            self._unmatched = None
+            self._unmatched_count = 0
+            if fen:
+                self._resync(fen)
+
+    def _resync(self, fen):
+        """Restart the history from a recognized FEN; returns False if it is impossible."""
+        fields = fen.split()
+        if fields[0] == STARTING_PLACEMENT and (len(fields) < 2 or fields[1] == "w"):
+            root = STARTING_FEN
+        else:
+            try:
+                position = Position(fen)
+            except ValueError:
+                return False
+            position.set_castling(infer_castling(position))
+            root = repair_fen(position.fen())
+            if root is None:
+                return False
+        self.root_fen = root
+        self.position = Position(root)
+        self.moves = []
+        self._unmatched, self._unmatched_count = None, 0
+        logger.info("Game tracker synced to %s", root)
+        return True
+
+    def _match(self, position, target, plies):
+        """UCI moves leading from `position` to the placement bitboards `target`, or None."""
+        for move in position.legal_moves():
+            child = position.copy().push(move)
+            if child.bb == target:
+                return [move_to_uci(move)]
+            if plies > 1:
+                rest = self._match(child, target, plies - 1)
+                if rest:
+                    return [move_to_uci(move)] + rest
+        return None
+
+    def update(self, fen):
+        """
+        Feed a recognized FEN (its side-to-move is only used as a hint when
+        resyncing). Returns the list of newly inferred UCI moves, [] if the
+        board is unchanged, or None if the placement could not be explained.
+        """
+        with self._lock:
+            if self.position is None:
+                return [] if self._resync(fen) else None
+
+            try:
+                target = Position(fen.split()[0]).bb
+            except ValueError:
+                return None
+            if target == self.position.bb:
+                self._unmatched, self._unmatched_count = None, 0
+                return []
+
+            found = self._match(self.position, target, 1) or self._match(self.position, target, 2)
+            if found:
+                for uci in found:
+                    self.position.push_uci(uci)
+                self.moves.extend(found)
+                self._unmatched, self._unmatched_count = None, 0
+                logger.debug("Inferred moves %s", found)
+                return found
+
+            # The side to move may have been guessed wrong when syncing.
+            flipped = self.position.copy().pass_turn()
+            found = self._match(flipped, target, 1)
+            if found and not self.moves:
+                self.position = flipped
+                self.root_fen = flipped.fen()
+                self.position.push_uci(found[0])
+                self.moves = found
+                logger.info("Game tracker corrected side to move; inferred %s", found)
+                return found
+
+            placement = fen.split()[0]
+            if placement == self._unmatched:
+                self._unmatched_count += 1
+            else:
+                self._unmatched, self._unmatched_count = placement, 1
+            if self._unmatched_count >= RESYNC_FRAMES:
+                logger.warning("Lost track of the game; resyncing from %s", fen)
+                return [] if self._resync(fen) else None
+            return None
+
+    @property
+    def turn(self):
+        with self._lock:
+            if self.position is None:
+                return None
+            return "wb"[self.position.turn]
+
+    def fen(self):
+        with self._lock:
+            return self.position.fen() if self.position else None
+
+    def history(self):
+        """(root_fen, moves) describing the current position."""
+        with self._lock:
+            return self.root_fen, tuple(self.moves)
+
+    def search_args(self, color):
+        """
+        (fen, history) for get_best_move when it is `color`'s move, or None
+        while the tracker says the other side is to move.
+        """
+        with self._lock:
+            if self.position is None or "wb"[self.position.turn] != color:
+                return None
+            return self.position.fen(), (self.root_fen, tuple(self.moves))
+
+
+def engine_position(root_fen, moves):
+    """UCI `position` argument for a game started from `root_fen`."""
+    root = "startpos" if root_fen == STARTING_FEN else f"fen {root_fen}"
+    return f"{root} moves {' '.join(moves)}" if moves else root
@@ -1,12 +1,37 @@
 import os
-import subprocess
 import shutil
 import logging
 import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import CancelledError
 from utils.resource_path import resource_path
+from executor.tablebase import (
+    TABLEBASE_SEARCH_DEPTH,
+    get_syzygy_path,
+    in_tablebase_range,
+    probe_best_move,
+    record_engine_shortcut,
+    get_tablebase_stats,
+    close_tablebase,
+)
+from executor.opening_index import probe_book_move, get_opening_stats, close_opening_index
+from executor.engine_autotune import recommended_settings, write_engine_config
+from executor.engine_supervisor import EngineSupervisor, EngineError
+from executor.engine_scheduler import EngineScheduler, INTERACTIVE
+from executor.bitboard import Position, repair_fen, fen_after_move
+from executor.game_tracker import engine_position
+from utils.metrics import metrics, timed
 
 logger = logging.getLogger(__name__)
-_stockfish_process = None
+_supervisor = None
+_scheduler = None
+_supervisor_lock = threading.Lock()
+# Finished searches keyed by (Zobrist key, depth, history); the GUI re-polls
+# an unchanged board every couple of seconds.
+RESULT_CACHE_SIZE = 256
+_result_cache = OrderedDict()
+_result_cache_lock = threading.Lock()
 
 def get_root_dir():
     if getattr(sys, 'frozen', False):
@@ -15,79 +40,144 @@ def get_root_dir():
         return os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 
 CONFIG_FILE = os.path.join(get_root_dir(), "engine_config.txt")
+# ChessPilot settings stored in the config file that are not UCI commands.
+CONFIG_KEYS = ("pool_size", "hot_spare")
+# A spare per pool engine would double the pool's processes and Hash memory;
+# pool engines are cold-restarted instead.
+HOT_SPARE_DEFAULTS = {"batch": "0"}
 
 def create_default_config(config_path):
-    with open(config_path, "w") as f:
-        f.write("# ChessPilot Engine Configuration\n")
-        f.write("setoption name Hash value 1024\n")
-        f.write("setoption name Threads value 4\n")
-    logger.info(f"Created default config file at {config_path}")
+    write_engine_config(config_path, recommended_settings())
+    logger.info("Created default config file at %s", config_path)
 
-def load_engine_config(stockfish_proc):
-    if not os.path.exists(CONFIG_FILE):
-        create_default_config(CONFIG_FILE)
+def read_engine_config(profile="interactive", config_path=CONFIG_FILE):
+    """
+    Return (uci_commands, settings) for an engine profile.
+    Lines before the first [section] apply to every profile; ChessPilot's own
+    keys (e.g. pool_size) are returned in settings instead of being sent to the engine.
+    """
+    if not os.path.exists(config_path):
+        create_default_config(config_path)
 
-    with open(CONFIG_FILE, "r") as f:
+    commands, settings = [], {}
+    section = None
+    with open(config_path, "r") as f:
         for line in f:
             line = line.strip()
             if not line or line.startswith("#"):
                 continue
-            try:
-                stockfish_proc.stdin.write(f"{line}\n")
-            except Exception as e:
-                logger.warning(f"Failed to apply config line '{line}': {e}")
-
-    stockfish_proc.stdin.write("isready\n")
-    stockfish_proc.stdin.flush()
-    while True:
-        line = stockfish_proc.stdout.readline().strip()
-        if line == "readyok":
-            break
+            if line.startswith("[") and line.endswith("]"):
+                section = line[1:-1].strip().lower()
+                continue
+            if section not in (None, profile):
+                continue
+            key, _, value = line.partition(" ")
+            if key in CONFIG_KEYS:
+                settings[key] = value.strip()
+                continue
+            commands.append(line)
+    return commands, settings
+
+def load_engine_config(engine, profile="interactive"):
+    commands, _ = read_engine_config(profile)
+
+    syzygy_configured = False
+    for line in commands:
+        if "name SyzygyPath " in line:
+            syzygy_configured = True
+        try:
+            engine.send(line)
+        except Exception as e:
+            logger.warning("Failed to apply config line '%s': %s", line, e)
+
+    syzygy_path = get_syzygy_path()
+    if syzygy_path and not syzygy_configured:
+        engine.send(f"setoption name SyzygyPath value {syzygy_path}")
+        logger.info("Using Syzygy tablebases from %s", syzygy_path)
+
+    engine.sync()
+
+def get_stockfish_path():
+    override = os.environ.get("CHESSPILOT_ENGINE")
+    if override:
+        # Any UCI engine, e.g. src/mock_engine.py for load tests without Stockfish.
+        if not os.path.exists(override):
+            raise FileNotFoundError(f"CHESSPILOT_ENGINE points to a missing file: {override}")
+        return override
+    stockfish_path = resource_path("stockfish.exe" if os.name == "nt" else "stockfish")
+    if not os.path.exists(stockfish_path):
+        sys_stock = shutil.which("stockfish")
+        if not sys_stock:
+            raise FileNotFoundError("Stockfish not found.")
+        stockfish_path = sys_stock
+    return stockfish_path
+
+def get_engine_command(stockfish_path=None):
+    stockfish_path = stockfish_path or get_stockfish_path()
+    if stockfish_path.endswith(".py"):
+        return [sys.executable, stockfish_path]
+    return stockfish_path if os.name == "nt" else [stockfish_path]
+
+def create_supervisor(profile="interactive", name="stockfish", options=None):
+    """`options` ({"Threads": 2, ...}) override the profile's setoption lines."""
+    _, settings = read_engine_config(profile)
+
+    def configure(engine):
+        load_engine_config(engine, profile)
+        if options:
+            for option, value in options.items():
+                engine.send(f"setoption name {option} value {value}")
+            engine.sync()
+
+    return EngineSupervisor(
+        get_engine_command(),
+        configure=configure,
+        name=name,
+        hot_spare=settings.get("hot_spare", HOT_SPARE_DEFAULTS.get(profile, "1")) != "0",
+    )
 
 def _initialize_stockfish():
-    global _stockfish_process
-    if _stockfish_process:
-        return _stockfish_process
-    
-    try:
-        stockfish_path = resource_path("stockfish.exe" if os.name == "nt" else "stockfish")
-        if not os.path.exists(stockfish_path):
-             sys_stock = shutil.which("stockfish")
-             if sys_stock:
-                 stockfish_path = sys_stock
-             else:
-                raise FileNotFoundError("Stockfish not found.")
-
-        command = stockfish_path if os.name == "nt" else [stockfish_path]
-        _stockfish_process = subprocess.Popen(
-            command,
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            creationflags=subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0
-        )
-        load_engine_config(_stockfish_process)
-        logger.info("Stockfish process initialized")
-        return _stockfish_process
-    except Exception as e:
-        logger.error(f"Failed to initialize Stockfish: {e}", exc_info=True)
-        _stockfish_process = None
-        raise
+    global _supervisor, _scheduler
+    with _supervisor_lock:
+        if _scheduler:
+            return _scheduler
 
-def cleanup_stockfish():
-    global _stockfish_process
-    if _stockfish_process:
         try:
-            _stockfish_process.stdin.write("quit\n")
-            _stockfish_process.stdin.flush()
-        except Exception:
-            pass
-        finally:
-            _stockfish_process.terminate()
-            _stockfish_process.wait()
-            _stockfish_process = None
+            _supervisor = create_supervisor().start()
+            _scheduler = EngineScheduler(_supervisor)
+            logger.info("Stockfish supervisor initialized")
+            return _scheduler
+        except Exception as e:
+            logger.error("Failed to initialize Stockfish: %s", e, exc_info=True)
+            _supervisor = None
+            raise
+
+def cleanup_stockfish():
+    global _supervisor, _scheduler
+    with _supervisor_lock:
+        if _scheduler:
+            logger.info("Engine queue stats: %s", _scheduler.get_stats())
+            _scheduler.shutdown()
+            _scheduler = None
+        if _supervisor:
+            _supervisor.shutdown()
+            _supervisor = None
             logger.info("Stockfish process cleaned up")
+    stats = get_tablebase_stats()
+    if stats["in_range"]:
+        logger.info("Tablebase stats: %s", stats)
+    close_tablebase()
+    stats = get_opening_stats()
+    if stats["probes"]:
+        logger.info("Opening index stats: %s", stats)
+    close_opening_index()
+    with _result_cache_lock:
+        _result_cache.clear()
+
+def get_engine_queue_stats():
+    """Queue wait times and preemption counters per priority class."""
+    scheduler = _scheduler
+    return scheduler.get_stats() if scheduler else {}
 
 def initialize_stockfish_at_startup():
     try:
@@ -96,47 +186,85 @@ def initialize_stockfish_at_startup():
     except Exception:
         return False
 
-def get_best_move(depth, fen):
+def _search_and_fen(supervisor, fen, depth, history=None):
+    position = engine_position(*history) if history else f"fen {fen}"
+    with metrics.timer("engine_search"):
+        result = supervisor.search(position, f"depth {depth}")
+    if result["best_move"]:
+        result["updated_fen"] = fen_after_move(fen, result["best_move"])
+    return result
+
+@timed("best_move")
+def get_best_move(depth, fen, priority=INTERACTIVE, key=None, is_current=None, history=None):
+    """
+    Search `fen` to `depth` and return (best_move, updated_fen, mate_flag).
+    Requests run in priority order (INTERACTIVE, BACKGROUND, BATCH); a newer
+    request with the same `key` supersedes an older one, and `is_current`
+    lets the scheduler drop requests for positions no longer on screen.
+    Impossible positions (e.g. a misread second king) are rejected before
+    reaching the engine; inferable errors are repaired first. With an
+    opening index configured, its most played move answers without a search.
+    `history` is an optional (root_fen, moves) pair from a GameTracker that
+    leads to `fen`; the engine then sees the whole game, keeping castling,
+    en passant and repetitions right and its hash warm between moves.
+    """
+    repaired = repair_fen(fen)
+    if repaired is None:
+        return None, None, False
+    if repaired != fen:
+        # The tracked moves no longer lead to this position.
+        history = None
+    fen = repaired
+    cache_key = (Position(fen).zobrist_key(), depth, history)
+    with _result_cache_lock:
+        cached = _result_cache.get(cache_key)
+        if cached:
+            _result_cache.move_to_end(cache_key)
+            metrics.increment("result_cache_hits")
+            return cached
+    metrics.increment("result_cache_misses")
+
+    # Well-trodden opening positions are answered from the user's games.
+    book = probe_book_move(fen)
+    if book:
+        return book
+
+    if in_tablebase_range(fen):
+        probed = probe_best_move(fen)
+        if probed:
+            return probed
+        # Without in-process probing the engine still resolves the root from
+        # SyzygyPath, so a deep search buys nothing.
+        if depth > TABLEBASE_SEARCH_DEPTH:
+            depth = TABLEBASE_SEARCH_DEPTH
+            record_engine_shortcut()
+
     try:
-        stockfish = _initialize_stockfish()
-        if not stockfish:
-            raise Exception("Stockfish not initialized.")
-        
-        stockfish.stdin.write(f"position fen {fen}\n")
-        stockfish.stdin.write(f"go depth {depth}\n")
-        stockfish.stdin.flush()
-        
-        best_move = None
-        mate_flag = False
-        while True:
-            line = stockfish.stdout.readline().strip()
-            if not line:
-                break
-            if "bestmove" in line:
-                best_move = line.split()[1]
-                break
-            if "score mate 1" in line or "score mate -1" in line:
-                mate_flag = True
-        
-        if not best_move:
+        scheduler = _initialize_stockfish()
+        future = scheduler.submit(
+            lambda supervisor: _search_and_fen(supervisor, fen, depth, history),
+            priority=priority,
+            key=key,
+            is_current=is_current,
+        )
+        result = future.result()
+        if not result or not result["best_move"]:
             return None, None, False
+        answer = result["best_move"], result.get("updated_fen"), result["mate_flag"]
+        if not result.get("preempted"):
+            with _result_cache_lock:
+                _result_cache[cache_key] = answer
+                if len(_result_cache) > RESULT_CACHE_SIZE:
+                    _result_cache.popitem(last=False)
+        return answer
 
-        stockfish.stdin.write(f"position fen {fen} moves {best_move}\n")
-        stockfish.stdin.write("d\n")
-        stockfish.stdin.flush()
-        
-        updated_fen = None
-        while True:
-            line = stockfish.stdout.readline().strip()
-            if not line:
-                break
-            if "Fen:" in line:
-                updated_fen = line.split("Fen:")[1].strip()
-                break
-        
-        return best_move, updated_fen, mate_flag
-
+    except CancelledError:
+        logger.debug("Engine request for %s was superseded", fen)
+        return None, None, False
+    except EngineError as e:
+        # The supervisor already swapped in a fresh engine.
+        logger.error("Stockfish error: %s", e)
+        return None, None, False
     except Exception as e:
-        logger.error(f"Stockfish error: {e}", exc_info=True)
-        cleanup_stockfish()
-        return None, None, False
\ No newline at end of file
+        logger.error("Stockfish error: %s", e, exc_info=True)
+        return None, None, False
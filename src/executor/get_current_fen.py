@@ -1,17 +1,22 @@
 from board_detection import get_positions, get_fen_from_position
+from board_detection.vision_worker import get_vision_service
 from executor.capture_screenshot_in_memory import capture_screenshot_in_memory
 import logging
 
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 
 def get_current_fen(color_indicator):
     try:
         screenshot = capture_screenshot_in_memory()
+        service = get_vision_service()
+        if service is not None and screenshot is not None:
+            # Detection and FEN extraction in one round trip to the worker.
+            _, _, _, extracted = service.recognize(screenshot, color_indicator)
+            return extracted[3] if extracted else None
         boxes, _, _ = get_positions(screenshot)
         if boxes:
             _, _, _, fen = get_fen_from_position(color_indicator, boxes)
             return fen
     except Exception:
-        logging.error("Failed to get current FEN", exc_info=True)
+        logger.error("Failed to get current FEN", exc_info=True)
         return None
\ No newline at end of file
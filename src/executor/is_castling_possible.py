@@ -1,16 +1,20 @@
-from executor.expend_fen_row import expend_fen_row
+from executor.board import as_board
 import logging
 
 # Logger setup
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 
 def is_castling_possible(fen, color, side):
-    board = fen.split()[0]
-    rows = board.split('/')
+    """`fen` may be a FEN string or an already parsed Board."""
+    try:
+        board = as_board(fen)
+    except ValueError:
+        logger.debug(f"Invalid FEN for castling check: {fen}")
+        return False
+
     if color == "w":
-        last_row = expend_fen_row(rows[-1])
-        if len(last_row) != 8 or last_row[4] != 'K':
+        last_row = board.rank(1)
+        if last_row[4] != 'K':
             logger.debug(f"Invalid last row for white castling: {last_row}")
             return False
         if side == 'kingside':
@@ -20,8 +24,8 @@ def is_castling_possible(fen, color, side):
             logger.debug(f"Checking queenside castling for white: {last_row[0]}")
             return last_row[0] == 'R'
     else:
-        first_row = expend_fen_row(rows[0])
-        if len(first_row) != 8 or first_row[4] != 'k':
+        first_row = board.rank(8)
+        if first_row[4] != 'k':
             logger.debug(f"Invalid first row for black castling: {first_row}")
             return False
         if side == 'kingside':
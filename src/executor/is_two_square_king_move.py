@@ -1,14 +1,14 @@
 import logging
 from typing import Tuple
+from executor.board import as_board
 
 # Logger setup
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 
 def is_two_square_king_move(move_str: str, current_fen: str, color: str) -> Tuple[(bool, str)]:
     """
     Return (True, side) if `move_str` is a legal castling-style king move
-    from current_fen for this color.  side is either 'kingside' or 'queenside'.
+    from current_fen (FEN string or Board) for this color.  side is either 'kingside' or 'queenside'.
     Otherwise returns (False, "").
     """
     # move_str is always four characters, e.g. 'e8c8'.
@@ -18,24 +18,14 @@ def is_two_square_king_move(move_str: str, current_fen: str, color: str) -> Tupl
     col_diff = abs(ord(f_file) - ord(t_file))
     if col_diff != 2:
         return False, ""
-    placement = current_fen.split()[0]
-    rows = placement.split("/")
     try:
-        rank_idx = 8 - int(f_rank)  # rank '8' → index 0, rank '1' → index 7.
+        piece_at_source = as_board(current_fen).piece_at(move_str[:2])
     except ValueError:
-        logger.debug(f"Invalid rank in move: {move_str}")
+        logger.debug(f"Invalid FEN: {current_fen}")
         return False, ""
-    row_str = rows[rank_idx]
-    expanded = []
-    for ch in row_str:
-        if ch.isdigit():
-            expanded += [""] * int(ch)
-        else:
-            expanded.append(ch)
-    file_idx = ord(f_file) - ord("a")
-    if file_idx < 0 or file_idx > 7:
+    if piece_at_source is None:
+        logger.debug(f"No piece on source square of move: {move_str}")
         return False, ""
-    piece_at_source = expanded[file_idx]
     if color == "w" and piece_at_source != "K":
         return False, ""
     if color == "b" and piece_at_source != "k":
@@ -1,4 +1,3 @@
-import pyautogui
 from wayland_capture.wayland import WaylandInput
 from tkinter import messagebox
 import logging
@@ -9,7 +8,6 @@ if os.name == 'nt':
     import win32api
 
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 
 def move_cursor_to_button(root, auto_mode_var, btn_play):
     try:
@@ -25,6 +23,7 @@ def move_cursor_to_button(root, auto_mode_var, btn_play):
             client = WaylandInput()
             client.click(int(center_x), int(center_y))
         else:
+            import pyautogui  # slow to import and unused on Windows/Wayland, so loaded on first use
             pyautogui.moveTo(center_x, center_y, duration=0.1)
     except Exception as e:
         logger.error(f"Failed to relocate mouse cursor: {e}", exc_info=True)
@@ -1,4 +1,3 @@
-import pyautogui
 import logging
 from tkinter import messagebox
 import os
@@ -7,6 +6,7 @@ from .is_wayland import is_wayland
 from wayland_capture.wayland import WaylandInput
 from executor.chess_notation_to_index import chess_notation_to_index
 from executor.move_cursor_to_button import move_cursor_to_button
+from executor.board import get_piece_at_square
 import random
 
 if os.name == 'nt':
@@ -16,7 +16,6 @@ if os.name == 'nt':
 
 # Logger setup
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 
 def _get_piece_start_and_end_pos(color_indicator, move, board_positions, root, auto_mode_var):
     """A helper function to get the start and end positions for a move."""
@@ -66,6 +65,7 @@ def drag_piece(color_indicator, move, board_positions, auto_mode_var, root, btn_
             client.swipe(int(start_x), int(start_y), int(end_x), int(end_y), time.uniform(0.1, 0.3))
         else:
             logger.debug("Using PyAutoGUI for input")
+            import pyautogui  # slow to import and unused on Windows/Wayland, so loaded on first use
             pyautogui.moveTo(start_x, start_y, duration=random.uniform(0.1, 0.3))
             pyautogui.mouseDown()
             pyautogui.moveTo(end_x, end_y, duration=random.uniform(0.1, 0.4))
@@ -81,32 +81,6 @@ def drag_piece(color_indicator, move, board_positions, auto_mode_var, root, btn_
         logger.debug("Auto mode off after move; restoring cursor to Play button")
         root.after(0, lambda: move_cursor_to_button(root, auto_mode_var, btn_play))
 
-def get_piece_at_square(fen, square):
-    file_map = {chr(ord('a') + i): i for i in range(8)}
-    rank_map = {str(i + 1): 7 - i for i in range(8)}
-
-    file = square[0]
-    rank = square[1]
-
-    col = file_map.get(file)
-    row = rank_map.get(rank)
-
-    if col is None or row is None:
-        return None
-
-    rows = fen.split(' ')[0].split('/')
-    fen_row = rows[row]
-
-    current_col = 0
-    for char in fen_row:
-        if char.isdigit():
-            current_col += int(char)
-        else:
-            if current_col == col:
-                return char
-            current_col += 1
-    return None
-
 def is_promotion(fen, move):
     start_square = move[:2]
     end_square = move[2:]
@@ -159,6 +133,7 @@ def click_piece(color_indicator, move, board_positions, auto_mode_var, root, btn
             client.click(int(end_x), int(end_y))
         else:
             logger.debug("Using PyAutoGUI for input")
+            import pyautogui
             pyautogui.click(start_x, start_y)
             time.sleep(delay)
             pyautogui.click(end_x, end_y)
@@ -0,0 +1,238 @@
+import os
+import mmap
+import heapq
+import struct
+import logging
+import threading
+
+from executor.bitboard import Position, SQUARE_INDEX, PROMOTION_TYPES, make_move, move_to_uci, fen_after_move
+
+logger = logging.getLogger(__name__)
+
+# An index file is a header followed by fixed-size records sorted by
+# (position key, move): the Polyglot key of the position, the move in the
+# bitboard encoding (from | to << 6 | promotion << 12) and the number of
+# games won by White, drawn and won by Black after it. Lookups binary-search
+# the memory-mapped file, so only the pages touched are read.
+MAGIC = b"CPOI"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQ")
+RECORD = struct.Struct("<QHIII")
+_KEY = struct.Struct("<Q")
+COUNT_MAX = 0xFFFFFFFF
+
+# Fewer games than this behind the most played move and the book is not trusted.
+OPENING_MIN_GAMES = 20
+
+_lock = threading.Lock()
+_index = None
+_index_path = None
+
+_stats = {
+    "probes": 0,
+    "hits": 0,
+    "book_moves": 0,
+}
+
+
+def encode_move(uci):
+    """Record encoding of a UCI move (legality is not checked)."""
+    return make_move(SQUARE_INDEX[uci[:2]], SQUARE_INDEX[uci[2:4]], PROMOTION_TYPES.get(uci[4:5], 0))
+
+
+class OpeningIndex:
+    """Read-only view of an index file; safe to share between threads."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path} is empty")
+        magic, version, record_size, count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            self.close()
+            raise ValueError(f"{path} is not an opening index (version {VERSION})")
+        if HEADER.size + count * RECORD.size > len(self._map):
+            self.close()
+            raise ValueError(f"{path} is truncated")
+        self.count = count
+
+    def _key_at(self, i):
+        return _KEY.unpack_from(self._map, HEADER.size + i * RECORD.size)[0]
+
+    def lookup(self, key):
+        """[(move, white, draws, black)] stored for a position key, most played first."""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        moves = []
+        offset = HEADER.size + lo * RECORD.size
+        end = HEADER.size + self.count * RECORD.size
+        while offset < end:
+            record_key, move, white, draws, black = RECORD.unpack_from(self._map, offset)
+            if record_key != key:
+                break
+            moves.append((move, white, draws, black))
+            offset += RECORD.size
+        moves.sort(key=lambda m: m[1] + m[2] + m[3], reverse=True)
+        return moves
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def write_run(path, counts):
+    """Write a {(key, move): [white, draws, black]} dict as a sorted, headerless run."""
+    with open(path, "wb") as f:
+        f.writelines(RECORD.pack(key, move, *wdl) for (key, move), wdl in sorted(counts.items()))
+
+
+def iter_run(path, block=RECORD.size * 4096):
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(block)
+            if not data:
+                return
+            yield from RECORD.iter_unpack(data)
+
+
+def merge_runs(run_paths, path, min_games=1):
+    """
+    K-way merge of sorted runs into the index at `path`, adding up the
+    counts of records shared between runs. Returns the number of records.
+    """
+    count = 0
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as out:
+        out.write(HEADER.pack(MAGIC, VERSION, RECORD.size, 0))
+        current, totals = None, None
+
+        def flush():
+            nonlocal count
+            if current is not None and sum(totals) >= min_games:
+                out.write(RECORD.pack(*current, *(min(n, COUNT_MAX) for n in totals)))
+                count += 1
+
+        for key, move, white, draws, black in heapq.merge(*(iter_run(p) for p in run_paths)):
+            if (key, move) != current:
+                flush()
+                current, totals = (key, move), [0, 0, 0]
+            totals[0] += white
+            totals[1] += draws
+            totals[2] += black
+        flush()
+        out.seek(0)
+        out.write(HEADER.pack(MAGIC, VERSION, RECORD.size, count))
+    os.replace(tmp, path)
+    return count
+
+
+def get_opening_index_path():
+    """Return the configured index file or None."""
+    path = os.environ.get("CHESSPILOT_OPENING_INDEX")
+    return path if path and os.path.isfile(path) else None
+
+
+def get_opening_index():
+    """The configured index, opened on first use; None when there is none."""
+    global _index, _index_path
+    path = get_opening_index_path()
+    with _lock:
+        if path is None:
+            return None
+        if _index is not None and _index_path == path:
+            return _index
+        try:
+            index = OpeningIndex(path)
+        except (OSError, ValueError) as e:
+            logger.error("Cannot open opening index: %s", e)
+            return None
+        if _index is not None:
+            _index.close()
+        _index, _index_path = index, path
+        logger.info("Opening index %s: %s moves", path, index.count)
+        return _index
+
+
+def probe_openings(fen):
+    """
+    Games played from `fen`: one dict per move with the White/draw/Black
+    counts and the score for the side to move, most played first.
+    """
+    index = get_opening_index()
+    if index is None:
+        return []
+    try:
+        position = Position(fen)
+    except ValueError:
+        return []
+    moves = index.lookup(position.zobrist_key())
+    with _lock:
+        _stats["probes"] += 1
+        if moves:
+            _stats["hits"] += 1
+    entries = []
+    for move, white, draws, black in moves:
+        games = white + draws + black
+        won = white if position.turn == 0 else black
+        entries.append({"move": move_to_uci(move), "white": white, "draws": draws, "black": black,
+                        "games": games, "score": (won + draws / 2) / games})
+    return entries
+
+
+def probe_book_move(fen, min_games=OPENING_MIN_GAMES):
+    """
+    Return (best_move, updated_fen, mate_flag) for the most played move when
+    the index has at least `min_games` games behind it, else None.
+    """
+    entries = probe_openings(fen)
+    if not entries or entries[0]["games"] < min_games:
+        return None
+    move = entries[0]["move"]
+    try:
+        updated = fen_after_move(fen, move)
+    except ValueError:
+        # A hash collision or a corrupt index; let the engine decide.
+        return None
+    with _lock:
+        _stats["book_moves"] += 1
+    logger.info("Book move %s for %s (%s games)", move, fen, entries[0]['games'])
+    return move, updated, False
+
+
+def format_openings(fen, limit=3):
+    """One line for the GUI, e.g. 'Book: e4 54% (1203) · d4 55% (980)'; empty when out of book."""
+    entries = probe_openings(fen)[:limit]
+    if not entries:
+        return ""
+    position = Position(fen)
+    moves = []
+    for entry in entries:
+        try:
+            san = position.san(position.parse_uci(entry["move"]))
+        except ValueError:
+            continue
+        moves.append(f"{san} {entry['score']:.0%} ({entry['games']})")
+    return "Book: " + " · ".join(moves) if moves else ""
+
+
+def get_opening_stats():
+    """How often positions were found in the index and answered from it."""
+    with _lock:
+        return dict(_stats)
+
+
+def close_opening_index():
+    global _index, _index_path
+    with _lock:
+        if _index is not None:
+            _index.close()
+        _index, _index_path = None, None
@@ -0,0 +1,136 @@
+import re
+import logging
+
+from executor.bitboard import Position, STARTING_FEN, move_to_uci
+
+logger = logging.getLogger(__name__)
+
+# The seven tag roster, in the order PGN export format requires.
+ROSTER = ("Event", "Site", "Date", "Round", "White", "Black", "Result")
+LINE_WIDTH = 80
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+TAG_RE = re.compile(r'^\[(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+TOKEN_RE = re.compile(r"\{[^}]*\}|;[^\n]*|\$\d+|[()]|\d+\.+|1-0|0-1|1/2-1/2|\*|[^\s(){};$]+")
+
+
+class PgnGame:
+    __slots__ = ("headers", "root_fen", "moves", "result")
+
+    def __init__(self, headers, root_fen, moves, result):
+        self.headers = headers
+        self.root_fen = root_fen
+        self.moves = moves
+        self.result = result
+
+
+def _parse_game(tag_lines, movetext, max_plies=None):
+    headers = {}
+    for line in tag_lines:
+        match = TAG_RE.match(line)
+        if match:
+            headers[match.group(1)] = re.sub(r"\\(.)", r"\1", match.group(2))
+    root_fen = headers["FEN"] if headers.get("SetUp") == "1" and headers.get("FEN") else STARTING_FEN
+    position = Position(root_fen)
+    moves, result, depth = [], headers.get("Result", "*"), 0
+    for token in TOKEN_RE.findall(movetext):
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth = max(0, depth - 1)
+        elif depth or token[0] in "{;$" or token[0].isdigit() and token.rstrip(".").isdigit():
+            continue
+        elif token in RESULTS:
+            result = token
+        elif max_plies is None or len(moves) < max_plies:
+            move = position.parse_san(token.rstrip("!?"))
+            moves.append(move_to_uci(move))
+            position.push(move)
+    return PgnGame(headers, root_fen, moves, result)
+
+
+def read_games(lines, max_plies=None):
+    """
+    Yield a PgnGame per game in an iterable of PGN lines (e.g. an open file),
+    one game in memory at a time. Comments, NAGs and variations are dropped;
+    games with illegal moves are skipped with a warning. With `max_plies`
+    only that many moves of each game are parsed.
+    """
+    tag_lines, movetext = [], []
+
+    def finish():
+        if not tag_lines and not movetext:
+            return None
+        try:
+            return _parse_game(tag_lines, " ".join(movetext), max_plies)
+        except ValueError as e:
+            logger.warning("Skipping game %s: %s", ' '.join(tag_lines[:3]), e)
+            return None
+
+    for line in lines:
+        line = line.strip()
+        if line.startswith("[") and not line.startswith("[%"):
+            if movetext:
+                game = finish()
+                if game:
+                    yield game
+                tag_lines, movetext = [], []
+            tag_lines.append(line)
+        elif line and not line.startswith("%"):
+            movetext.append(line)
+    game = finish()
+    if game:
+        yield game
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def format_pgn(moves, root_fen=STARTING_FEN, headers=None, comments=None, result="*", nags=None):
+    """
+    One PGN game from UCI `moves` played from `root_fen`. `comments` maps a
+    move index to the text placed after that move and `nags` to a NAG number
+    ($2 for "?"). Moves are written in SAN, with SetUp/FEN tags when the game
+    does not start from the initial position.
+    """
+    headers = dict(headers or {})
+    headers["Result"] = result
+    tags = {name: headers.pop(name, "?") for name in ROSTER}
+    headers.pop("SetUp", None)
+    headers.pop("FEN", None)
+    if root_fen != STARTING_FEN:
+        tags["SetUp"] = "1"
+        tags["FEN"] = root_fen
+    tags.update(headers)
+    lines = [f'[{name} "{_escape(value)}"]' for name, value in tags.items()]
+
+    comments = comments or {}
+    nags = nags or {}
+    position = Position(root_fen)
+    tokens = []
+    resume_number = True
+    for i, uci in enumerate(moves):
+        move = position.parse_uci(uci)
+        if position.turn == 0:
+            tokens.append(f"{position.fullmove}.")
+        elif resume_number:
+            tokens.append(f"{position.fullmove}...")
+        tokens.append(position.san(move))
+        if nags.get(i):
+            tokens.append(f"${nags[i]}")
+        position.push(move)
+        resume_number = False
+        if comments.get(i):
+            tokens.append("{" + comments[i].replace("}", ")") + "}")
+            resume_number = True
+    tokens.append(result)
+
+    movetext, line = [], ""
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > LINE_WIDTH:
+            movetext.append(line)
+            line = token
+        else:
+            line = f"{line} {token}" if line else token
+    movetext.append(line)
+    return "\n".join(lines) + "\n\n" + "\n".join(movetext) + "\n"
@@ -0,0 +1,180 @@
+import os
+import glob
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Below this many pieces Stockfish already resolves the root from the tables,
+# so a shallow search is enough to rank the moves.
+TABLEBASE_SEARCH_DEPTH = 10
+
+_lock = threading.Lock()
+_tablebase = None
+_tablebase_path = None
+_probe_unavailable = False
+_tables_cache = {}
+# Piece order within a Syzygy table name.
+TABLE_PIECE_ORDER = "KQRBNP"
+
+_stats = {
+    "positions": 0,
+    "in_range": 0,
+    "probe_hits": 0,
+    "engine_shortcuts": 0,
+}
+
+
+def get_syzygy_path():
+    """Return the configured Syzygy directory list (os.pathsep separated) or None."""
+    path = os.environ.get("SYZYGY_PATH")
+    if not path:
+        return None
+    dirs = [d for d in path.split(os.pathsep) if os.path.isdir(d)]
+    return os.pathsep.join(dirs) if dirs else None
+
+
+def available_tables(path):
+    """Material names of the WDL tables under `path`, e.g. {'KQvK', 'KRPvKR'}."""
+    if not path:
+        return frozenset()
+    if path in _tables_cache:
+        return _tables_cache[path]
+
+    tables = frozenset(
+        os.path.splitext(os.path.basename(table))[0]
+        for directory in path.split(os.pathsep)
+        for table in glob.glob(os.path.join(directory, "*.rtbw"))
+    )
+    _tables_cache[path] = tables
+    logger.info("Syzygy tables at %s: %d tables, up to %d pieces", path, len(tables), syzygy_max_pieces(path))
+    return tables
+
+
+def syzygy_max_pieces(path):
+    """
+    Largest piece count covered by the WDL tables under `path`.
+    Table names encode their material, e.g. 'KRPvKR.rtbw' is a 5-piece table.
+    """
+    tables = _tables_cache.get(path) if path else None
+    if tables is None:
+        tables = available_tables(path)
+    return max((len(name.replace("v", "")) for name in tables), default=0)
+
+
+def count_pieces(fen):
+    return sum(1 for ch in fen.split()[0] if ch.isalpha())
+
+
+def table_names(fen):
+    """The two possible table names for the material in `fen` (either side may be written first)."""
+    placement = fen.split()[0]
+    white = "".join(sorted((ch for ch in placement if ch.isupper()), key=TABLE_PIECE_ORDER.index))
+    black = "".join(sorted((ch.upper() for ch in placement if ch.islower()), key=TABLE_PIECE_ORDER.index))
+    return f"{white}v{black}", f"{black}v{white}"
+
+
+def in_tablebase_range(fen):
+    """True if a table for this position's material is installed locally."""
+    tables = available_tables(get_syzygy_path())
+    in_range = bool(tables) and any(name in tables for name in table_names(fen))
+    with _lock:
+        _stats["positions"] += 1
+        if in_range:
+            _stats["in_range"] += 1
+    return in_range
+
+
+def _open_tablebase(path):
+    """
+    Open the tables in-process. python-chess is optional: it memory-maps the
+    table files so probes cost microseconds, but without it we still let the
+    engine use the tables through SyzygyPath.
+    """
+    global _tablebase, _tablebase_path, _probe_unavailable
+    if _probe_unavailable:
+        return None
+    if _tablebase is not None and _tablebase_path == path:
+        return _tablebase
+
+    try:
+        import chess.syzygy
+    except ImportError:
+        logger.info("python-chess not installed; tablebase probing left to the engine")
+        _probe_unavailable = True
+        return None
+
+    tablebase = chess.syzygy.Tablebase()
+    for directory in path.split(os.pathsep):
+        tablebase.add_directory(directory)
+    if _tablebase is not None:
+        _tablebase.close()
+    _tablebase, _tablebase_path = tablebase, path
+    return _tablebase
+
+
+def _rank_move(board, move, tablebase):
+    """Sort key for a root move: mates first, then WDL, then the fastest (or slowest losing) DTZ."""
+    board.push(move)
+    try:
+        if board.is_checkmate():
+            return (3, 0)
+        wdl = -tablebase.probe_wdl(board)
+        dtz = tablebase.probe_dtz(board)
+    finally:
+        board.pop()
+    if wdl == 0:
+        return (0, 0)
+    # dtz is from the opponent's point of view: closer to zero is better when
+    # we win, further from zero when we lose.
+    return (wdl, dtz)
+
+
+def probe_best_move(fen):
+    """
+    Return (best_move, updated_fen, mate_flag) straight from the tables,
+    or None if the position cannot be resolved in-process.
+    """
+    path = get_syzygy_path()
+    if not path:
+        return None
+
+    with _lock:
+        tablebase = _open_tablebase(path)
+        if tablebase is None:
+            return None
+
+        import chess
+        try:
+            board = chess.Board(fen)
+            if board.castling_rights or not any(board.legal_moves):
+                return None
+            best_move = max(board.legal_moves, key=lambda m: _rank_move(board, m, tablebase))
+        except (KeyError, ValueError, OSError) as e:
+            logger.debug("Tablebase probe failed for %s: %s", fen, e)
+            return None
+
+        board.push(best_move)
+        _stats["probe_hits"] += 1
+
+    logger.info("Tablebase move %s for %s", best_move.uci(), fen)
+    return best_move.uci(), board.fen(), board.is_checkmate()
+
+
+def record_engine_shortcut():
+    with _lock:
+        _stats["engine_shortcuts"] += 1
+
+
+def get_tablebase_stats():
+    """Counters showing how often the tables avoided a full search."""
+    with _lock:
+        return dict(_stats)
+
+
+def close_tablebase():
+    global _tablebase, _tablebase_path
+    with _lock:
+        if _tablebase is not None:
+            _tablebase.close()
+        _tablebase, _tablebase_path = None, None
@@ -1,9 +1,9 @@
 import logging
 from executor.is_castling_possible import is_castling_possible
+from executor.board import as_board
 
 # Logger setup
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 
 def update_fen_castling_rights(color_indicator, kingside_var, queenside_var, fen):
     """
@@ -16,7 +16,8 @@ def update_fen_castling_rights(color_indicator, kingside_var, queenside_var, fen
     if not fen_fields:
         return fen
     
-    new_castling = _build_castling_rights(color_indicator, kingside_var, queenside_var, fen)
+    # Parse the placement once for all four castling checks.
+    new_castling = _build_castling_rights(color_indicator, kingside_var, queenside_var, as_board(fen))
     
     return _reconstruct_fen_with_castling(fen_fields, new_castling)
 
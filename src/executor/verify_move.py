@@ -5,7 +5,6 @@ from executor import capture_screenshot_in_memory
 
 # Logger setup
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 
 def verify_move(color_indicator, _, expected_fen, attempts_limit=3):
     expected_pieces = expected_fen.split()[0]
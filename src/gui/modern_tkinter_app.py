@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import ttk
 from .toggle_switch import create_toggle
+from utils.metrics import format_stats
 
 class ModernTkinterApp(tk.Frame):
     def __init__(self, master=None, app_logic=None):
@@ -19,6 +20,10 @@ class ModernTkinterApp(tk.Frame):
 
         self.master.configure(bg=self.bg_color)
 
+        self.stats_frame = None
+        self.stats_var = tk.StringVar()
+        self._stats_after = None
+
         self.create_styles()
         self.create_widgets()
 
@@ -38,6 +43,8 @@ class ModernTkinterApp(tk.Frame):
         status_label.pack(pady=5)
         best_move_label = tk.Label(main_frame, textvariable=self.app.best_move_var, font=('Segoe UI', 12, 'bold'), bg=self.bg_color, fg=self.accent_color)
         best_move_label.pack(pady=10)
+        opening_label = tk.Label(main_frame, textvariable=self.app.opening_var, font=('Segoe UI', 9), bg=self.bg_color, fg="#AAAAAA", wraplength=350)
+        opening_label.pack()
 
         capture_play_frame = tk.Frame(main_frame, bg=self.bg_color)
         capture_play_frame.pack(fill=tk.X, pady=10)
@@ -63,9 +70,35 @@ class ModernTkinterApp(tk.Frame):
         self.volume_slider.set(10)
         self.transparency_slider.set(75)
 
+        self.main_frame = main_frame
+
         footer = tk.Label(main_frame, text="Made by Niladri | Powered by NiluAI", font=('Segoe UI', 8), bg=self.bg_color, fg="#AAAAAA")
         footer.pack(side=tk.BOTTOM, pady=(10, 0))
 
+    def toggle_stats_panel(self):
+        """Show or hide the per-stage latency table below the controls."""
+        if self.stats_frame is not None:
+            # Cancelled so a quick hide/show does not leave two refresh loops running.
+            if self._stats_after is not None:
+                self.master.after_cancel(self._stats_after)
+                self._stats_after = None
+            self.stats_frame.destroy()
+            self.stats_frame = None
+            self.master.geometry("400x600")
+            return
+        self.stats_frame = tk.Frame(self.main_frame, bg=self.frame_color, padx=10, pady=5)
+        self.stats_frame.pack(fill=tk.X, pady=(0, 10))
+        stats_label = tk.Label(self.stats_frame, textvariable=self.stats_var, font=('Consolas', 8), justify=tk.LEFT, anchor="w", bg=self.frame_color, fg=self.text_color)
+        stats_label.pack(fill=tk.X)
+        self.master.geometry("400x780")
+        self.refresh_stats()
+
+    def refresh_stats(self):
+        if self.stats_frame is None:
+            return
+        self.stats_var.set(format_stats())
+        self._stats_after = self.master.after(1000, self.refresh_stats)
+
     def create_toggle_row(self, parent, label_text, command, state_var):
         row = tk.Frame(parent, bg=self.frame_color)
         row.pack(fill=tk.X, padx=10, pady=5)
@@ -0,0 +1,210 @@
+"""
+Load tests for the engine layer and the capture loop, no Stockfish or display needed.
+
+  engine   concurrent searches through get_best_move (scheduler, result cache)
+           or through an EnginePool, against src/mock_engine.py unless
+           --engine names a real binary; --fail injects engine failures
+  capture  get_current_fen in a loop over images served by FileBackend
+
+  python src/load_test.py engine --clients 8 --requests 400 --fail crash%0.02,garbage%0.1
+  python src/load_test.py engine --target pool --pool-size 4 --fail hang@5 --stall-timeout 1
+  python src/load_test.py capture corpus/ --seconds 30 --threads 2
+
+Latency percentiles, errors and engine restarts are printed at the end,
+followed by the per-stage histograms from utils.metrics.
+"""
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+import threading
+from collections import Counter
+
+from utils.logging_setup import setup_console_logging
+from utils.metrics import metrics, format_stats
+
+logger = logging.getLogger(__name__)
+
+MOCK_ENGINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock_engine.py")
+PERCENTILES = (50, 90, 99)
+
+
+class Results:
+    def __init__(self):
+        self.latencies = []
+        self.outcomes = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, seconds, outcome):
+        with self._lock:
+            self.latencies.append(seconds)
+            self.outcomes[outcome] += 1
+
+    def report(self, elapsed):
+        ordered = sorted(self.latencies)
+        count = len(ordered)
+        print(f"{count} requests in {elapsed:.2f}s ({count / elapsed if elapsed else 0:.1f}/s)")
+        if ordered:
+            print("latency " + "  ".join(
+                f"p{p} {ordered[min(count - 1, count * p // 100)] * 1000:.1f}ms" for p in PERCENTILES)
+                + f"  max {ordered[-1] * 1000:.1f}ms")
+        print("outcomes " + ", ".join(f"{name} {n}" for name, n in self.outcomes.most_common()))
+
+
+def _positions(count, seed):
+    from board_generator import random_position
+    rng = random.Random(seed)
+    return [random_position(rng) for _ in range(count)]
+
+
+def _run_clients(clients, requests, work):
+    """Call work(i) for i in range(requests) from `clients` threads; returns elapsed seconds."""
+    counter = iter(range(requests))
+    lock = threading.Lock()
+
+    def client():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            work(i)
+
+    threads = [threading.Thread(target=client, name=f"client-{n}", daemon=True) for n in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def engine_load(args):
+    if args.engine:
+        os.environ["CHESSPILOT_ENGINE"] = args.engine
+    else:
+        os.environ["CHESSPILOT_ENGINE"] = MOCK_ENGINE
+        os.environ["MOCK_ENGINE_DEPTH_DELAY"] = str(args.depth_delay)
+        os.environ["MOCK_ENGINE_FAIL"] = args.fail or ""
+    from executor.get_best_move import get_best_move, cleanup_stockfish, _initialize_stockfish
+    from executor.engine_pool import EnginePool
+
+    fens = _positions(args.positions, args.seed)
+    results = Results()
+
+    if args.target == "pool":
+        pool = EnginePool(size=args.pool_size).start()
+        supervisors = pool._supervisors
+        go = f"depth {args.depth}"
+
+        def work(i):
+            fen = fens[i % len(fens)]
+            started = time.perf_counter()
+            try:
+                result = pool.submit(lambda s: s.search(f"fen {fen}", go, stall_timeout=args.stall_timeout)).result()
+                outcome = "ok" if result["best_move"] else "no move"
+            except Exception as e:
+                outcome = type(e).__name__
+            results.add(time.perf_counter() - started, outcome)
+    else:
+        supervisors = [_initialize_stockfish().supervisor]
+
+        def work(i):
+            fen = fens[i % len(fens)]
+            started = time.perf_counter()
+            try:
+                move, _, _ = get_best_move(args.depth, fen)
+                outcome = "ok" if move else "no move"
+            except Exception as e:
+                outcome = type(e).__name__
+            results.add(time.perf_counter() - started, outcome)
+
+    try:
+        elapsed = _run_clients(args.clients, args.requests, work)
+    finally:
+        restarts = sum(s.restarts for s in supervisors)
+        if args.target == "pool":
+            pool.shutdown()
+        else:
+            cleanup_stockfish()
+    results.report(elapsed)
+    print(f"engine restarts {restarts}")
+
+
+def capture_load(args):
+    from board_detection import load_model, warm_up
+    from executor.capture_backends import FileBackend, set_capture_backend, close_capture_backend
+    from executor.get_current_fen import get_current_fen
+
+    set_capture_backend(FileBackend(args.directory))
+    load_model()
+    warm_up()
+    metrics.reset()
+    results = Results()
+    deadline = time.monotonic() + args.seconds
+    done = threading.Event()
+
+    def loop():
+        while not done.is_set() and time.monotonic() < deadline:
+            started = time.perf_counter()
+            fen = get_current_fen(args.color)
+            results.add(time.perf_counter() - started, "fen" if fen else "no board")
+
+    threads = [threading.Thread(target=loop, name=f"capture-{n}", daemon=True) for n in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        done.set()
+    elapsed = time.perf_counter() - started
+    close_capture_backend()
+    results.report(elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the engine layer or the capture loop.")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    engine = sub.add_parser("engine", help="concurrent engine searches")
+    engine.add_argument("--target", choices=("best-move", "pool"), default="best-move",
+                        help="get_best_move and its scheduler, or an EnginePool (default: best-move)")
+    engine.add_argument("--engine", help="UCI engine to use instead of the mock engine")
+    engine.add_argument("--fail", help="mock engine failures, e.g. crash%%0.02,hang@10 (see mock_engine.py)")
+    engine.add_argument("--depth-delay", type=float, default=0.002, help="mock engine seconds per depth (default: 0.002)")
+    engine.add_argument("--clients", type=int, default=4, help="concurrent callers (default: 4)")
+    engine.add_argument("--requests", type=int, default=200, help="total searches (default: 200)")
+    engine.add_argument("--positions", type=int, default=100,
+                        help="distinct random positions; fewer than requests exercises the result cache (default: 100)")
+    engine.add_argument("--depth", type=int, default=10, help="search depth (default: 10)")
+    engine.add_argument("--pool-size", type=int, default=None, help="engines in the pool (default: from config)")
+    engine.add_argument("--stall-timeout", type=float, default=2.0,
+                        help="seconds of engine silence before giving up, pool target only (default: 2)")
+    engine.add_argument("--seed", type=int, default=0)
+
+    capture = sub.add_parser("capture", help="get_current_fen over images from a directory")
+    capture.add_argument("directory", help="images, in labels.jsonl order if the directory has one")
+    capture.add_argument("--color", choices=("w", "b"), default="w")
+    capture.add_argument("--seconds", type=float, default=10.0, help="test duration (default: 10)")
+    capture.add_argument("--threads", type=int, default=1, help="concurrent capture loops (default: 1)")
+
+    args = parser.parse_args()
+    setup_console_logging(logging.WARNING)
+    try:
+        if args.mode == "engine":
+            engine_load(args)
+        else:
+            capture_load(args)
+    except Exception as e:
+        logger.error(str(e))
+        sys.exit(1)
+    print()
+    print(format_stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,21 @@
 import sys
+import argparse
 import threading
 import time
 import logging
 import os
+
+# Enabled before the remaining imports so their cost shows up in the report.
+from utils.startup_profiler import startup_profiler
+startup_profiler.enable_if_requested()
+
 import tkinter as tk
 from queue import Queue, Empty
 import random
 
 from gui.modern_tkinter_app import ModernTkinterApp
 from utils.logging_setup import setup_console_logging
-from utils.chess_resources_manager import setup_resources
+from utils.chess_resources_manager import setup_resources, select_pending_stockfish_build
 from auto_mode import auto_move_loop
 from executor import (
     capture_screenshot_in_memory,
@@ -18,14 +24,25 @@ from executor import (
     initialize_stockfish_at_startup,
     get_current_fen,
     process_move,
+    get_piece_at_square,
+    GameTracker,
+    BACKGROUND,
 )
-from board_detection import get_positions, get_fen_from_position
+from board_detection import get_positions, get_fen_from_position, load_model, warm_up
 from board_detection.side_detector import detect_side_from_fen
-from utils.speech import speak, get_piece_name
+from board_detection.vision_worker import start_vision_service, stop_vision_service
+from utils.speech import announce_move, start_speech_worker, stop_speech_worker
+from utils.metrics import stage_timer, start_metrics_export
+from utils.profiling import profiler, add_profile_argument
+from executor.opening_index import format_openings
+from executor.capture_backends import ScreenBackend, backend_from_spec, set_capture_backend, close_capture_backend
+
+logger = logging.getLogger(__name__)
 
 class ChessPilot:
-    def __init__(self, root):
+    def __init__(self, root, vision_workers=None):
         self.root = root
+        self.vision_workers = vision_workers
 
         # State Variables
         self.is_closing = False
@@ -39,10 +56,14 @@ class ChessPilot:
         self.volume = 0.1
         self.move_count = 0
         self.best_move_cache = None
+        self.openings_cache = ""
+        self.latest_fen = None
+        self.game_tracker = GameTracker()
 
         # GUI Variables
         self.status_var = tk.StringVar(value="Initializing...")
         self.best_move_var = tk.StringVar(value="Best Move: ...")
+        self.opening_var = tk.StringVar(value="")
         self.side_state_var = tk.StringVar(value="White")
         self.drag_click_state_var = tk.StringVar(value="Drag")
         self.autoplay_state_var = tk.StringVar(value="OFF")
@@ -50,45 +71,96 @@ class ChessPilot:
 
         self.gui = ModernTkinterApp(master=root, app_logic=self)
         self.queue = Queue()
+        self.pending_init = set()
+        self.failed_init = set()
 
-        if not initialize_stockfish_at_startup():
-            self.update_status("Stockfish initialization failed.")
-
+        self.start_background_init()
         self.root.after(100, self.process_queue)
         self.setup_key_bindings()
         self.toggle_capture()
 
+    def start_background_init(self):
+        """Spawn the engine and load the detection model concurrently while the window is already up."""
+        self.pending_init = {"engine", "model"}
+        self.update_status("Loading engine and detection model...")
+        threading.Thread(target=self._init_engine, name="init-engine", daemon=True).start()
+        threading.Thread(target=self._init_model, name="init-model", daemon=True).start()
+        # Pre-renders the announcement phrases while idle.
+        start_speech_worker()
+
+    def _init_engine(self):
+        with startup_profiler.step("stockfish build probe"):
+            select_pending_stockfish_build()
+        with startup_profiler.step("engine spawn"):
+            ok = initialize_stockfish_at_startup()
+        self.queue.put({"type": "init_done", "payload": ("engine", ok)})
+
+    def _init_model(self):
+        ok = True
+        try:
+            with startup_profiler.step("vision workers"):
+                service = start_vision_service(self.vision_workers)
+            if service is None:
+                with startup_profiler.step("model load"):
+                    load_model()
+                with startup_profiler.step("model warm-up"):
+                    warm_up()
+        except Exception as e:
+            logger.error(f"Detection model failed to load: {e}")
+            ok = False
+        self.queue.put({"type": "init_done", "payload": ("model", ok)})
+
+    def on_init_done(self, part, ok):
+        self.pending_init.discard(part)
+        if not ok:
+            self.failed_init.add(part)
+            self.update_status("Stockfish initialization failed." if part == "engine" else "Detection model missing or broken.")
+            return
+        if not self.pending_init and not self.failed_init:
+            self.update_status("Engine and model ready.")
+            startup_profiler.mark("engine and model ready")
+            startup_profiler.log_report()
+
     def setup_key_bindings(self):
         self.root.bind('<space>', lambda e: self.play_best_move())
         self.root.bind('<Key-m>', lambda e: self.gui.mute_toggle.invoke())
         self.root.bind('<Key-a>', lambda e: self.gui.autoplay_toggle.invoke())
         self.root.bind('<Control_L>', lambda e: self.gui.drag_click_toggle.invoke())
         self.root.bind('<Control_R>', lambda e: self.gui.drag_click_toggle.invoke())
+        self.root.bind('<Key-s>', lambda e: self.gui.toggle_stats_panel())
 
     def process_queue(self):
         try:
             message = self.queue.get_nowait()
-            msg_type = message.get("type")
-            payload = message.get("payload")
-
-            if msg_type == "status_update":
-                self.update_status(payload)
-            elif msg_type == "side_detected":
-                self.color_indicator = payload
-                self.gui.side_toggle.on = (payload == 'b')
-                self.gui.side_toggle._redraw()
-                self.update_status(f"Side detected: {'White' if payload == 'w' else 'Black'}. Ready.")
-                self.start_best_move_thread()
-            elif msg_type == "best_move_update":
-                self.best_move_cache = payload
-                self.gui.best_move_var.set(f"Best Move: {payload}")
-
+            with stage_timer("gui_update"):
+                self.handle_message(message)
         except Empty:
             pass
         finally:
             if not self.is_closing:
                 self.root.after(100, self.process_queue)
 
+    def handle_message(self, message):
+        msg_type = message.get("type")
+        payload = message.get("payload")
+
+        if msg_type == "status_update":
+            self.update_status(payload)
+        elif msg_type == "side_detected":
+            self.color_indicator = payload
+            self.game_tracker.reset()
+            self.gui.side_toggle.on = (payload == 'b')
+            self.gui.side_toggle._redraw()
+            self.update_status(f"Side detected: {'White' if payload == 'w' else 'Black'}. Ready.")
+            self.start_best_move_thread()
+        elif msg_type == "init_done":
+            self.on_init_done(*payload)
+        elif msg_type == "best_move_update":
+            self.best_move_cache = payload
+            self.gui.best_move_var.set(f"Best Move: {payload}")
+        elif msg_type == "openings_update":
+            self.opening_var.set(payload)
+
     def update_status(self, text):
         self.status_var.set(text)
 
@@ -98,13 +170,15 @@ class ChessPilot:
         if self.is_capturing:
             self.update_status("Capture ON. Detecting board...")
             if self.color_indicator is None:
-                threading.Thread(target=self.auto_detection_thread, daemon=True).start()
+                threading.Thread(target=self.auto_detection_thread, name="side-detect", daemon=True).start()
             else:
                 self.start_best_move_thread()
         else:
             self.update_status("Capture OFF.")
             self.best_move_cache = None
             self.gui.best_move_var.set("Best Move: ...")
+            self.openings_cache = ""
+            self.opening_var.set("")
 
     def auto_detection_thread(self):
         fen = None
@@ -122,13 +196,14 @@ class ChessPilot:
             side = detect_side_from_fen(fen)
             self.queue.put({"type": "side_detected", "payload": side})
         else:
-            self.queue.put({"type": "status_update", "payload": "Board not found. Pausing capture."})
+            reason = "Detection model missing or broken." if "model" in self.failed_init else "Board not found."
+            self.queue.put({"type": "status_update", "payload": f"{reason} Pausing capture."})
             self.is_capturing = False
             self.gui.capture_button.config(text="▶", fg="#00FF00")
 
     def start_best_move_thread(self):
         if not hasattr(self, "best_move_thread_instance") or not self.best_move_thread_instance.is_alive():
-            self.best_move_thread_instance = threading.Thread(target=self.best_move_thread, daemon=True)
+            self.best_move_thread_instance = threading.Thread(target=self.best_move_thread, name="best-move", daemon=True)
             self.best_move_thread_instance.start()
 
     def best_move_thread(self):
@@ -136,9 +211,28 @@ class ChessPilot:
             if self.color_indicator and not self.auto_mode:
                 fen = get_current_fen(self.color_indicator)
                 if fen:
-                    move, _, _ = get_best_move(22, fen)
+                    self.latest_fen = fen
+                    search_fen, history = fen, None
+                    if self.game_tracker.update(fen) is not None:
+                        tracked = self.game_tracker.search_args(self.color_indicator)
+                        if tracked is None:
+                            # Opponent to move; nothing to suggest yet.
+                            time.sleep(2)
+                            continue
+                        search_fen, history = tracked
+                    move, _, _ = get_best_move(
+                        22, search_fen,
+                        priority=BACKGROUND,
+                        history=history,
+                        key="best_move_poll",
+                        is_current=lambda f=fen: self.is_capturing and not self.auto_mode and self.latest_fen == f,
+                    )
                     if move and move != self.best_move_cache:
                         self.queue.put({"type": "best_move_update", "payload": move})
+                    openings = format_openings(search_fen)
+                    if openings != self.openings_cache:
+                        self.openings_cache = openings
+                        self.queue.put({"type": "openings_update", "payload": openings})
             time.sleep(2)
 
     def play_best_move(self):
@@ -152,7 +246,7 @@ class ChessPilot:
     def process_move_thread(self, move):
         if self.is_capturing:
             self.move_count += 1
-            threading.Thread(target=process_move, args=(self, move), daemon=True).start()
+            threading.Thread(target=process_move, args=(self, move), name="process-move", daemon=True).start()
         else:
             self.update_status("Enable screen capture first.")
 
@@ -161,10 +255,11 @@ class ChessPilot:
         self.gui.play_button.config(state=tk.DISABLED if self.auto_mode else tk.NORMAL)
         self.autoplay_state_var.set("ON" if self.auto_mode else "OFF")
         if self.auto_mode and self.is_capturing:
-            threading.Thread(target=auto_move_loop, args=(self,), daemon=True).start()
+            threading.Thread(target=auto_move_loop, args=(self,), name="auto-mode", daemon=True).start()
 
     def flip_board(self, state):
         self.color_indicator = 'b' if state else 'w'
+        self.game_tracker.reset()
         self.side_state_var.set("Black" if self.color_indicator == 'b' else 'White')
         self.update_status(f"Side set to {self.side_state_var.get()}")
 
@@ -183,39 +278,55 @@ class ChessPilot:
         self.root.attributes("-alpha", float(value) / 100)
 
     def speak_move(self, move):
-        fen = get_current_fen(self.color_indicator)
-        if fen:
-            piece = get_piece_at_square(fen, move[:2])
-            speak(f"Move {get_piece_name(piece)} from {move[:2]} to {move[2:]}", self.volume)
+        # The position the move was computed for is already known; no new capture needed.
+        fen = self.game_tracker.fen() or self.latest_fen
+        piece = get_piece_at_square(fen, move[:2]) if fen else None
+        announce_move(move, piece, self.volume)
 
     def on_closing(self):
         self.is_closing = True
+        stop_speech_worker()
         cleanup_stockfish()
+        stop_vision_service()
+        # Finishes the recording index when recording.
+        close_capture_backend()
         self.root.destroy()
 
-def get_piece_at_square(fen, square):
-    file_map = {chr(ord('a') + i): i for i in range(8)}
-    rank_map = {str(i + 1): 7 - i for i in range(8)}
-    file, rank = square[0], square[1]
-    col, row = file_map.get(file), rank_map.get(rank)
-    if col is None or row is None: return ''
-    fen_row = fen.split(' ')[0].split('/')[row]
-    current_col = 0
-    for char in fen_row:
-        if char.isdigit():
-            current_col += int(char)
-        else:
-            if current_col == col: return char
-            current_col += 1
-    return ''
-
 def main():
-    setup_console_logging()
-    if not setup_resources(os.path.dirname(__file__), os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))):
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="ChessPilot")
+    parser.add_argument("--profile-startup", action="store_true", help="log the time taken by each import and init step")
+    parser.add_argument("--stats", action="store_true", help="show the per-stage latency panel (toggle with S)")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on 127.0.0.1:PORT/metrics")
+    parser.add_argument("--metrics-file", help="periodically write Prometheus metrics to this file")
+    parser.add_argument("--vision-workers", type=int, default=None,
+                        help="run board recognition in N worker processes (default: CHESSPILOT_VISION_WORKERS or 0, in-process)")
+    add_profile_argument(parser)
+    parser.add_argument("--capture", metavar="SPEC",
+                        help="frame source: screen, record:FILE, record-board:FILE, replay:FILE or replay-fast:FILE")
+    args = parser.parse_args()
 
-    root = tk.Tk()
-    app = ChessPilot(root)
+    setup_console_logging()
+    start_metrics_export(port=args.metrics_port, path=args.metrics_file)
+    profiler.start_if_requested(args.profile)
+    if args.capture:
+        try:
+            set_capture_backend(backend_from_spec(args.capture) or ScreenBackend())
+        except (OSError, ValueError) as e:
+            logger.error(f"Invalid --capture: {e}")
+            sys.exit(1)
+    with startup_profiler.step("setup_resources"):
+        # A first-run Stockfish build probe runs with the engine init, after the window is up,
+        # and a missing model is reported in the status bar by the model init.
+        if not setup_resources(os.path.dirname(__file__), os.path.abspath(os.path.join(os.path.dirname(__file__), '..')),
+                               probe_builds=False, require_model=False):
+            sys.exit(1)
+
+    with startup_profiler.step("create window"):
+        root = tk.Tk()
+        app = ChessPilot(root, vision_workers=args.vision_workers)
+        if args.stats:
+            app.gui.toggle_stats_panel()
+    root.after_idle(lambda: startup_profiler.mark("window shown"))
 
     screen_width = root.winfo_screenwidth()
     screen_height = root.winfo_screenheight()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Scriptable stand-in for Stockfish.
+
+Speaks enough UCI for EngineSupervisor (uci, isready, setoption, ucinewgame,
+position, go depth/movetime/nodes/infinite, stop, d, quit) and answers with
+a legal move of the given position, after configurable delays. Failures can
+be injected to exercise the supervisor's restart paths:
+
+  hang       stop answering (no info, no bestmove, no readyok)
+  crash      exit with status 3
+  garbage    mix random junk lines into the info stream
+  illegal    answer with a move that is not legal
+  deaf       ignore "stop" and finish the search normally
+  slowready  take 5x --ready-delay to answer isready
+
+Each is scheduled as MODE@N (on the Nth "go", once) or MODE%P (on each
+"go" with probability P), comma-separated:
+
+  python src/mock_engine.py --depth-delay 0.01 --fail crash@3,garbage%0.2
+
+Every option can also come from the environment (MOCK_ENGINE_FAIL,
+MOCK_ENGINE_DEPTH_DELAY, ...), which is how it is set for engines spawned
+by the pool. Point ChessPilot at it with CHESSPILOT_ENGINE=src/mock_engine.py.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from executor.bitboard import Position, STARTING_FEN, move_to_uci  # noqa: E402
+
+FAILURE_MODES = ("hang", "crash", "garbage", "illegal", "deaf", "slowready")
+GARBAGE = ["info string \x00\x07 corrupted", "bestmov", "info depth x score cp NaN", "", "���",
+           "info depth 3 score cp", "readyok readyok", "id name"]
+
+
+def parse_failures(spec):
+    """'crash@3,garbage%0.2' -> [("crash", 3, None), ("garbage", None, 0.2)]"""
+    failures = []
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        if "@" in item:
+            mode, _, n = item.partition("@")
+            failure = (mode, int(n), None)
+        elif "%" in item:
+            mode, _, p = item.partition("%")
+            failure = (mode, None, float(p))
+        else:
+            mode, failure = item, (item, 1, None)
+        if mode not in FAILURE_MODES:
+            raise ValueError(f"unknown failure mode '{mode}' (choose from {', '.join(FAILURE_MODES)})")
+        failures.append(failure)
+    return failures
+
+
+class MockEngine:
+    def __init__(self, args):
+        self.args = args
+        # Without an explicit seed every spawned engine gets its own sequence,
+        # so probabilistic failures do not strike all restarts alike.
+        self.rng = random.Random(args.seed if args.seed is not None else os.getpid())
+        self.failures = parse_failures(args.fail)
+        self.position = Position(STARTING_FEN)
+        self.go_count = 0
+        self.active = set()
+        self.hung = False
+        self._out = threading.Lock()
+        self._stop = threading.Event()
+        self._search = None
+
+    def send(self, line):
+        if self.hung:
+            return
+        with self._out:
+            sys.stdout.write(line + "\n")
+            sys.stdout.flush()
+
+    def _schedule_failures(self):
+        self.active = {mode for mode, n, p in self.failures
+                       if (n is not None and n == self.go_count) or (p is not None and self.rng.random() < p)}
+
+    def set_position(self, tokens):
+        try:
+            if tokens[1] == "startpos":
+                position, rest = Position(STARTING_FEN), tokens[2:]
+            else:
+                end = tokens.index("moves") if "moves" in tokens else len(tokens)
+                position, rest = Position(" ".join(tokens[2:end])), tokens[end:]
+            for move in rest[1:] if rest and rest[0] == "moves" else []:
+                position.push_uci(move)
+        except (ValueError, IndexError):
+            self.send("info string invalid position")
+            return
+        self.position = position
+
+    def best_move(self):
+        moves = self.position.legal_moves()
+        if "illegal" in self.active or not moves:
+            return "a1a1" if moves else "(none)"
+        return move_to_uci(moves[0] if self.args.move_choice == "first" else self.rng.choice(moves))
+
+    def go(self, tokens):
+        self.go_count += 1
+        self._schedule_failures()
+        if "crash" in self.active:
+            os._exit(3)
+        if "hang" in self.active:
+            self.hung = True
+            return
+        limits = dict(zip(tokens[1::2], tokens[2::2]))
+        movetime = int(limits["movetime"]) / 1000 if "movetime" in limits else None
+        if "depth" in limits:
+            depth = int(limits["depth"])
+        elif movetime is not None or "infinite" in tokens:
+            depth = 10 ** 6
+        else:
+            depth = self.args.max_depth
+        self._stop.clear()
+        self._search = threading.Thread(target=self._run_search, args=(depth, movetime), daemon=True)
+        self._search.start()
+
+    def _run_search(self, depth, movetime):
+        started = time.monotonic()
+        best = self.best_move()
+        ignores_stop = "deaf" in self.active
+        for d in range(1, depth + 1):
+            if ignores_stop:
+                time.sleep(self.args.depth_delay)
+            elif self._stop.wait(self.args.depth_delay):
+                break
+            if movetime is not None and time.monotonic() - started >= movetime:
+                break
+            elapsed_ms = max(1, int((time.monotonic() - started) * 1000))
+            nodes = self.args.nps * elapsed_ms // 1000
+            self.send(f"info depth {d} seldepth {d + 2} multipv 1 score cp {self.args.score} nodes {nodes} "
+                      f"nps {self.args.nps} time {elapsed_ms} pv {best}")
+            if "garbage" in self.active and self.rng.random() < 0.5:
+                self.send(self.rng.choice(GARBAGE))
+        self.send(f"bestmove {best}")
+
+    def stop(self):
+        self._stop.set()
+        if self._search:
+            self._search.join()
+            self._search = None
+
+    def handle(self, line):
+        tokens = line.split()
+        if not tokens:
+            return True
+        command = tokens[0]
+        if command == "uci":
+            time.sleep(self.args.startup_delay)
+            self.send("id name ChessPilot mock engine")
+            self.send("option name Hash type spin default 16 min 1 max 33554432")
+            self.send("option name Threads type spin default 1 min 1 max 1024")
+            self.send("uciok")
+        elif command == "isready":
+            time.sleep(self.args.ready_delay * (5 if "slowready" in self.active else 1))
+            self.send("readyok")
+        elif command == "ucinewgame":
+            self.position = Position(STARTING_FEN)
+        elif command == "position":
+            self.set_position(tokens)
+        elif command == "go":
+            self.stop()
+            self.go(tokens)
+        elif command == "stop":
+            self.stop()
+        elif command == "d":
+            self.send(f"Fen: {self.position.fen()}")
+        elif command == "quit":
+            return False
+        return True
+
+    def run(self):
+        for line in sys.stdin:
+            if not self.handle(line.strip()):
+                break
+        self.stop()
+
+
+def _env(name, default, cast=str):
+    value = os.environ.get(f"MOCK_ENGINE_{name}")
+    return cast(value) if value is not None else default
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mock UCI engine for ChessPilot load and failure tests.")
+    parser.add_argument("--depth-delay", type=float, default=_env("DEPTH_DELAY", 0.005, float),
+                        help="seconds per reported depth (default: 0.005)")
+    parser.add_argument("--max-depth", type=int, default=_env("MAX_DEPTH", 20, int),
+                        help="depth searched when go gives no depth (default: 20)")
+    parser.add_argument("--startup-delay", type=float, default=_env("STARTUP_DELAY", 0.0, float),
+                        help="seconds before answering uci")
+    parser.add_argument("--ready-delay", type=float, default=_env("READY_DELAY", 0.0, float),
+                        help="seconds before answering isready")
+    parser.add_argument("--nps", type=int, default=_env("NPS", 1_000_000, int), help="reported nodes per second")
+    parser.add_argument("--score", type=int, default=_env("SCORE", 20, int), help="reported score in centipawns")
+    parser.add_argument("--move-choice", choices=("first", "random"), default=_env("MOVE_CHOICE", "random"),
+                        help="which legal move to answer with (default: random, seeded)")
+    parser.add_argument("--seed", type=int, default=_env("SEED", None, int),
+                        help="random seed (default: the process id, so every spawned engine differs)")
+    parser.add_argument("--fail", default=_env("FAIL", ""), help="failures to inject, e.g. crash@3,garbage%%0.2")
+    args = parser.parse_args(argv)
+    try:
+        parse_failures(args.fail)
+    except ValueError as e:
+        parser.error(str(e))
+    MockEngine(args).run()
+
+
+if __name__ == "__main__":
+    main()
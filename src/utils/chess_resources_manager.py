@@ -5,27 +5,63 @@ import shutil
 import logging
 from shutil import which
 import sys
+from utils.stockfish_builds import select_stockfish_build, cached_stockfish_build
 
 logger = logging.getLogger(__name__)
 
-def find_stockfish_executable(script_dir: Path) -> str:
-    """Finds the stockfish executable."""
+# Release whose build probe was left to select_pending_stockfish_build().
+_pending_probe = None
+
+def find_stockfish_source(project_dir: Path):
+    """Finds a Stockfish release archive or extracted release folder in the project root."""
+    for name in ("stockfish.zip", "stockfish.tar"):
+        path = project_dir / name
+        if path.exists():
+            return path
+    release_dir = project_dir / "stockfish"
+    if release_dir.is_dir():
+        return release_dir
+    return None
+
+def find_stockfish_executable(script_dir: Path, probe=True) -> str:
+    """
+    Finds the stockfish executable. With probe=False a release that has no
+    cached build choice is skipped instead of benchmarked (which can take
+    half a minute per build); see select_pending_stockfish_build().
+    """
+    env_path = os.environ.get("CHESSPILOT_ENGINE")
+    if env_path:
+        logger.info(f"Using CHESSPILOT_ENGINE from environment: {env_path}")
+        return env_path
+
     stockfish_name = "stockfish.exe" if os.name == "nt" else "stockfish"
+    project_dir = script_dir.parent
+
+    # 1. Pick the fastest build this CPU supports from a multi-variant release (cached after the first run)
+    source = find_stockfish_source(project_dir)
+    if source:
+        selected = (select_stockfish_build(source, script_dir, stockfish_name) if probe
+                    else cached_stockfish_build(source, script_dir))
+        if selected:
+            return selected
 
-    # 1. Check in the script directory (src)
+    # 2. Check in the script directory (src)
     local_path = script_dir / stockfish_name
     if local_path.exists():
         logger.info(f"Found Stockfish at {local_path}")
         return str(local_path)
 
-    # 2. Check in system PATH
+    # 3. Check in system PATH
     system_path = which(stockfish_name)
     if system_path:
         logger.info(f"Found system-installed Stockfish at {system_path}")
         return system_path
 
-    # 3. Check for a zip file in the project root (one level up from src)
-    project_dir = script_dir.parent
+    if source and not probe:
+        logger.info("No build chosen from %s yet; probing it in the background", source)
+        return None
+
+    # 4. Fall back to the first stockfish member of a zip without recognizable build names
     zip_path = project_dir / "stockfish.zip"
     if zip_path.exists():
         logger.info(f"Found stockfish.zip at {zip_path}, attempting to extract.")
@@ -49,6 +85,11 @@ def find_stockfish_executable(script_dir: Path) -> str:
 
 def find_onnx_model(script_dir: Path) -> str:
     """Finds the ONNX model."""
+    env_path = os.environ.get("ONNX_PATH")
+    if env_path:
+        logger.info(f"Using ONNX_PATH from environment: {env_path}")
+        return env_path
+
     onnx_name = "chess_detection.onnx"
     local_path = script_dir / onnx_name
     if local_path.exists():
@@ -65,22 +106,70 @@ def find_onnx_model(script_dir: Path) -> str:
     logger.error(f"ONNX model '{onnx_name}' not found in src/ or project root.")
     return None
 
-def setup_resources(script_dir_str: str, project_dir_str: str) -> bool:
+def find_syzygy_tables(script_dir: Path) -> str:
+    """Finds a local Syzygy tablebase directory (optional)."""
+    env_path = os.environ.get("SYZYGY_PATH")
+    if env_path:
+        logger.info(f"Using SYZYGY_PATH from environment: {env_path}")
+        return env_path
+
+    for candidate in (script_dir / "syzygy", script_dir.parent / "syzygy"):
+        if candidate.is_dir() and any(candidate.glob("*.rtbw")):
+            logger.info(f"Found Syzygy tablebases at {candidate}")
+            return str(candidate)
+
+    logger.debug("No Syzygy tablebases found; endgames will be searched normally.")
+    return None
+
+def select_pending_stockfish_build():
+    """
+    Run the build probe that setup_resources(probe_builds=False) skipped and
+    point STOCKFISH_PATH at the result. Meant for a background thread, before
+    the engine is spawned; returns the path in use or None.
+    """
+    global _pending_probe
+    script_dir, _pending_probe = _pending_probe, None
+    if script_dir is None:
+        return os.environ.get("STOCKFISH_PATH")
+    stockfish_path = find_stockfish_executable(script_dir)
+    if stockfish_path:
+        os.environ["STOCKFISH_PATH"] = stockfish_path
+    return stockfish_path
+
+def setup_resources(script_dir_str: str, project_dir_str: str, probe_builds=True, require_model=True) -> bool:
     """
     Ensures that Stockfish and ONNX model are available.
     Looks for stockfish.exe in src/, system PATH, or extracts from stockfish.zip in project root.
     Looks for chess_detection.onnx in src/ or project root.
+    Optionally picks up Syzygy tablebases from a syzygy/ folder in src/ or project root.
+    With probe_builds=False a Stockfish release seen for the first time is not
+    benchmarked here: a cached or plain binary is used for now and the probe
+    is left to select_pending_stockfish_build().
+    With require_model=False a missing ONNX model is left for the caller to
+    report (the daemon still serves analyse requests, the GUI shows it in its
+    status bar).
     """
+    global _pending_probe
     script_dir = Path(script_dir_str)
 
-    stockfish_path = find_stockfish_executable(script_dir)
+    stockfish_path = find_stockfish_executable(script_dir, probe=probe_builds)
+    source = find_stockfish_source(script_dir.parent)
+    if (not probe_builds and source and not os.environ.get("CHESSPILOT_ENGINE")
+            and not cached_stockfish_build(source, script_dir)):
+        _pending_probe = script_dir
     onnx_path = find_onnx_model(script_dir)
 
-    if stockfish_path and onnx_path:
+    syzygy_path = find_syzygy_tables(script_dir)
+    if syzygy_path:
+        os.environ["SYZYGY_PATH"] = syzygy_path
+
+    if (stockfish_path or _pending_probe) and (onnx_path or not require_model):
         # This is a bit of a hack to make the resource_path function work later
         # We store the paths so they can be retrieved by other parts of the app
-        os.environ["STOCKFISH_PATH"] = stockfish_path
-        os.environ["ONNX_PATH"] = onnx_path
+        if stockfish_path:
+            os.environ["STOCKFISH_PATH"] = stockfish_path
+        if onnx_path:
+            os.environ["ONNX_PATH"] = onnx_path
         return True
 
     return False
@@ -6,10 +6,9 @@ from tkinter import messagebox
 
 # Logger setup
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 
 def get_binary_path(binary):
-    logger.debug(f"Resolving binary path for: {binary}")
+    logger.debug("Resolving binary path for: %s", binary)
     # For Windows, ensure the binary name ends with '.exe'
     if os.name == "nt" and not binary.endswith(".exe"):
         binary += ".exe"
@@ -24,8 +23,8 @@ def get_binary_path(binary):
             path = binary
 
     if not (path and os.path.exists(path)):
-        logger.error(f"Missing binary: {binary}")
+        logger.error("Missing binary: %s", binary)
         messagebox.showerror("Error", f"{binary} is missing! Make sure it's bundled properly.")
         sys.exit(1)
-    logger.debug(f"Binary path resolved: {path}")
+    logger.debug("Binary path resolved: %s", path)
     return path
\ No newline at end of file
@@ -1,6 +1,23 @@
+import os
+import sys
+import time
+import queue
+import struct
+import atexit
 import logging
+import logging.handlers
+
+RING_SIZE = 2048
+# Dumps are written at most this often so an error storm does not flood the disk.
+DUMP_INTERVAL = 10.0
+
+_listener = None
+_ring_handler = None
+
 
 class RepeatFilter(logging.Filter):
+    """Counts consecutive identical records; the count is shown by the formatters without touching record.msg."""
+
     def __init__(self):
         super().__init__()
         self.last_log = None
@@ -10,13 +27,21 @@ class RepeatFilter(logging.Filter):
         current_log = (record.module, record.levelno, record.msg)
         if current_log == self.last_log:
             self.count += 1
-            record.msg = f"{record.msg} (x{self.count})"
         else:
             self.last_log = current_log
             self.count = 1
+        record.repeat = self.count
         return True
 
-class ColorFormatter(logging.Formatter):
+
+class PlainFormatter(logging.Formatter):
+    def format(self, record):
+        message = super().format(record)
+        repeat = getattr(record, "repeat", 1)
+        return f"{message} (x{repeat})" if repeat > 1 else message
+
+
+class ColorFormatter(PlainFormatter):
     LEVEL_COLORS = {
         logging.DEBUG: "\x1b[36m",
         logging.INFO: "\x1b[32m",
@@ -28,14 +53,154 @@ class ColorFormatter(logging.Formatter):
 
     def format(self, record):
         color = self.LEVEL_COLORS.get(record.levelno, "")
-        record.levelname = f"{color}{record.levelname:<8}{self.COLOR_RESET}"
-        record.msg = f"{color}{record.msg}{self.COLOR_RESET}"
-        return super().format(record)
+        return f"{color}{super().format(record)}{self.COLOR_RESET}"
+
+
+class RingBufferHandler(logging.Handler):
+    """
+    Keeps the last `capacity` records in a preallocated binary ring
+    (timestamp, level, thread id, interned logger and template ids), so
+    recording costs no timestamp or level formatting. Args are rendered
+    into the message bytes kept per slot, never held as live objects.
+    Interned strings are reference-counted by the slots that use them and
+    dropped with the last one, so the table is bounded by twice the ring
+    however many distinct messages are logged. The ring is rendered to a
+    file when a record at `dump_level` arrives.
+    """
+
+    SLOT = struct.Struct("<dBxxxQII")
+
+    def __init__(self, capacity=RING_SIZE, dump_level=logging.ERROR, dump_dir=None):
+        super().__init__(logging.NOTSET)
+        self.capacity = capacity
+        self.dump_level = dump_level
+        self.dump_dir = dump_dir or _log_dir()
+        self._buffer = bytearray(self.SLOT.size * capacity)
+        self._rendered = [None] * capacity
+        # Interned text -> id, and per id its text and the number of slots using it.
+        self._strings = {}
+        self._string_list = []
+        self._refs = []
+        self._free_ids = []
+        self._next = 0
+        self._count = 0
+        self._last_dump = 0.0
+
+    def _intern(self, text):
+        index = self._strings.get(text)
+        if index is None:
+            if self._free_ids:
+                index = self._free_ids.pop()
+                self._string_list[index] = text
+                self._refs[index] = 0
+            else:
+                index = len(self._string_list)
+                self._string_list.append(text)
+                self._refs.append(0)
+            self._strings[text] = index
+        self._refs[index] += 1
+        return index
+
+    def _release(self, index):
+        self._refs[index] -= 1
+        if not self._refs[index]:
+            del self._strings[self._string_list[index]]
+            self._string_list[index] = None
+            self._free_ids.append(index)
+
+    def emit(self, record):
+        msg = record.msg if isinstance(record.msg, str) else str(record.msg)
+        rendered = None
+        if record.args:
+            try:
+                rendered = (msg % record.args).encode("utf-8", "replace")
+            except (TypeError, ValueError):
+                rendered = f"{msg} {record.args!r}".encode("utf-8", "replace")
+        with self.lock:
+            slot = self._next
+            offset = slot * self.SLOT.size
+            if self._count == self.capacity:
+                _, _, _, name_id, msg_id = self.SLOT.unpack_from(self._buffer, offset)
+                self._release(name_id)
+                self._release(msg_id)
+            self.SLOT.pack_into(self._buffer, offset, record.created, record.levelno,
+                                record.thread or 0, self._intern(record.name), self._intern(msg))
+            self._rendered[slot] = rendered
+            self._next = (slot + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+        if record.levelno >= self.dump_level:
+            self.dump()
+
+    def events(self):
+        """Buffered events, oldest first, as (created, levelno, thread, logger, message)."""
+        events = []
+        with self.lock:
+            start = (self._next - self._count) % self.capacity
+            for i in range(self._count):
+                slot = (start + i) % self.capacity
+                created, levelno, thread, name_id, msg_id = self.SLOT.unpack_from(self._buffer, slot * self.SLOT.size)
+                rendered = self._rendered[slot]
+                message = rendered.decode("utf-8", "replace") if rendered is not None else self._string_list[msg_id]
+                events.append((created, levelno, thread, self._string_list[name_id], message))
+        return events
+
+    def dump(self, path=None):
+        now = time.time()
+        if path is None:
+            if now - self._last_dump < DUMP_INTERVAL:
+                return None
+            self._last_dump = now
+            path = os.path.join(self.dump_dir, time.strftime("chesspilot-%Y%m%d-%H%M%S.log", time.localtime(now)))
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                for created, levelno, thread, name, message in self.events():
+                    stamp = time.strftime("%H:%M:%S", time.localtime(created))
+                    f.write(f"[{stamp}.{int(created % 1 * 1000):03d}] [{logging.getLevelName(levelno)}] "
+                            f"[{thread}] [{name}] {message}\n")
+        except OSError:
+            return None
+        sys.stderr.write(f"Recent log events written to {path}\n")
+        return path
+
+
+class _LocalQueueHandler(logging.handlers.QueueHandler):
+    """Queues records as they are; the listener in this process does all the formatting."""
+
+    def prepare(self, record):
+        return record
+
+
+def _log_dir():
+    base = os.environ.get("LOCALAPPDATA") if os.name == "nt" else os.environ.get("XDG_CACHE_HOME")
+    base = base or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "chesspilot", "logs")
+
+
+def _stop_listener():
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
+
+
+def setup_console_logging(level=logging.INFO, production=None):
+    """
+    Configure the root logger. In production mode (the default unless
+    CHESSPILOT_DEBUG=1) records are handed to a queue and formatted on a
+    listener thread, and a ring buffer of recent events is dumped on errors.
+    Debug mode logs synchronously at DEBUG level.
+    """
+    global _listener, _ring_handler
+    if production is None:
+        production = os.environ.get("CHESSPILOT_DEBUG") != "1"
+    if not production:
+        level = logging.DEBUG
 
-def setup_console_logging(level=logging.INFO):
     logging.getLogger('comtypes').setLevel(logging.WARNING)
 
     root_logger = logging.getLogger()
+    _stop_listener()
     if root_logger.hasHandlers():
         root_logger.handlers.clear()
 
@@ -44,14 +209,94 @@ def setup_console_logging(level=logging.INFO):
     console_handler = logging.StreamHandler()
     console_handler.setLevel(level)
 
-    fmt = "[%(asctime)s.%(msecs)03d] [%(levelname)s] [%(module)s] %(message)s"
+    fmt = "[%(asctime)s.%(msecs)03d] [%(levelname)-8s] [%(module)s] %(message)s"
     datefmt = "%H:%M:%S"
 
     if hasattr(console_handler.stream, 'isatty') and console_handler.stream.isatty():
         formatter = ColorFormatter(fmt, datefmt=datefmt)
     else:
-        formatter = logging.Formatter(fmt, datefmt=datefmt)
+        formatter = PlainFormatter(fmt, datefmt=datefmt)
 
     console_handler.setFormatter(formatter)
     console_handler.addFilter(RepeatFilter())
-    root_logger.addHandler(console_handler)
\ No newline at end of file
+
+    if not production:
+        root_logger.addHandler(console_handler)
+        return
+
+    # The filter must run on the producing thread, before records are queued.
+    queue_handler = _LocalQueueHandler(queue.SimpleQueue())
+    queue_handler.filters = console_handler.filters
+    console_handler.filters = []
+    _listener = logging.handlers.QueueListener(queue_handler.queue, console_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_stop_listener)
+
+    _ring_handler = RingBufferHandler()
+    root_logger.addHandler(_ring_handler)
+    root_logger.addHandler(queue_handler)
+
+
+def dump_recent_logs(path=None):
+    """Write the ring buffer to `path` (or the log folder) and return the file written."""
+    return _ring_handler.dump(path) if _ring_handler else None
+
+
+if __name__ == "__main__":
+    import io
+    import timeit
+
+    # Per-frame logging of the capture loop before and after: module loggers
+    # forced to DEBUG with eager f-strings and record-rewriting filters versus
+    # level-gated %-style debug calls behind the queue handler.
+    class LegacyRepeatFilter(logging.Filter):
+        def __init__(self):
+            super().__init__()
+            self.last_log, self.count = None, 0
+
+        def filter(self, record):
+            current_log = (record.module, record.levelno, record.msg)
+            if current_log == self.last_log:
+                self.count += 1
+                record.msg = f"{record.msg} (x{self.count})"
+            else:
+                self.last_log, self.count = current_log, 1
+            return True
+
+    frame_logger = logging.getLogger("bench.frame")
+    fen = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+    sink = io.StringIO()
+
+    def legacy_frame():
+        frame_logger.info("Capturing screenshot using mss (non-Wayland)...")
+        frame_logger.debug("Screenshot captured successfully")
+        frame_logger.debug(f"Resolved resource path for 'chess_detection.onnx': {fen}")
+
+    def lazy_frame():
+        frame_logger.debug("Capturing screenshot using mss (non-Wayland)...")
+        frame_logger.debug("Screenshot captured successfully")
+        frame_logger.debug("Resolved resource path for '%s': %s", "chess_detection.onnx", fen)
+
+    root = logging.getLogger()
+    number = 20_000
+
+    root.handlers.clear()
+    handler = logging.StreamHandler(sink)
+    handler.setFormatter(logging.Formatter("[%(asctime)s] [%(levelname)s] [%(module)s] %(message)s"))
+    handler.addFilter(LegacyRepeatFilter())
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+    frame_logger.setLevel(logging.DEBUG)
+    legacy = timeit.timeit(legacy_frame, number=number) / number
+
+    frame_logger.setLevel(logging.NOTSET)
+    setup_console_logging(production=True)
+    _listener.handlers = (logging.StreamHandler(sink),)
+    lazy = timeit.timeit(lazy_frame, number=number) / number
+    _ring_handler.dump_level = logging.CRITICAL + 1
+    ringed = timeit.timeit(lambda: frame_logger.info("frame %d", 1), number=number) / number
+    _stop_listener()
+
+    print(f"legacy per-frame logging      {legacy * 1e6:8.2f} us")
+    print(f"production per-frame logging  {lazy * 1e6:8.2f} us")
+    print(f"one INFO record (queue+ring)  {ringed * 1e6:8.2f} us")
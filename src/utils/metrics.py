@@ -0,0 +1,290 @@
+"""
+Per-stage latency metrics.
+
+Each pipeline stage (capture, preprocess, inference, decode, fen, engine
+search, GUI update) records its duration into a log-linear histogram in the
+style of HdrHistogram: values are kept in microseconds with 5 significant
+bits, so any percentile is accurate to ~3% while recording is a couple of
+integer operations and a list increment. The histograms are exported in
+Prometheus text format through a file that is rewritten periodically
+(for the node_exporter textfile collector) or a localhost HTTP endpoint.
+
+    with stage_timer("capture"):
+        ...
+
+    @timed("predict")
+    def predict(image): ...
+
+Exporting is opt-in: `--metrics-port` / `--metrics-file` on the command line
+or CHESSPILOT_METRICS_PORT / CHESSPILOT_METRICS_FILE in the environment.
+"""
+import os
+import time
+import logging
+import threading
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+# Covers up to 2**36 us (~19 hours); longer values land in the last bucket.
+BUCKET_COUNT = (36 - SUB_BUCKET_BITS) * SUB_BUCKETS + 2 * SUB_BUCKETS
+QUANTILES = (0.5, 0.95, 0.99)
+EXPORT_INTERVAL = 5.0
+PORT_ENV = "CHESSPILOT_METRICS_PORT"
+FILE_ENV = "CHESSPILOT_METRICS_FILE"
+
+
+def _bucket_index(value):
+    if value < 2 * SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return min(shift * SUB_BUCKETS + (value >> shift), BUCKET_COUNT - 1)
+
+
+def _bucket_value(index):
+    """Highest value that falls into bucket `index`."""
+    if index < 2 * SUB_BUCKETS:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    return ((index - shift * SUB_BUCKETS + 1) << shift) - 1
+
+
+class Histogram:
+    """Log-linear latency histogram; `record` takes seconds, storage is in microseconds."""
+
+    def __init__(self):
+        self._counts = [0] * BUCKET_COUNT
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        index = _bucket_index(int(seconds * 1_000_000))
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentiles(self, quantiles=QUANTILES):
+        """Return {q: seconds} for each quantile (0 when empty)."""
+        with self._lock:
+            counts = list(self._counts)
+            count = self.count
+        result = {q: 0.0 for q in quantiles}
+        if not count:
+            return result
+        pending = sorted(quantiles)
+        seen = 0
+        for index, n in enumerate(counts):
+            if not n:
+                continue
+            seen += n
+            while pending and seen >= pending[0] * count:
+                result[pending.pop(0)] = _bucket_value(index) / 1_000_000
+            if not pending:
+                break
+        return result
+
+    def snapshot(self):
+        with self._lock:
+            count, total, maximum = self.count, self.total, self.max
+        return {"count": count, "sum": total, "max": maximum, "percentiles": self.percentiles()}
+
+    def reset(self):
+        with self._lock:
+            self._counts = [0] * BUCKET_COUNT
+            self.count = 0
+            self.total = 0.0
+            self.max = 0.0
+
+
+class _StageTimer:
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.record(time.perf_counter() - self.started)
+        return False
+
+
+class MetricsRegistry:
+    """Stage histograms and plain counters, rendered together as Prometheus text."""
+
+    def __init__(self, prefix="chesspilot"):
+        self.prefix = prefix
+        self._stages = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        histogram = self._stages.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._stages.setdefault(name, Histogram())
+        return histogram
+
+    def timer(self, name):
+        return _StageTimer(self.stage(name))
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def snapshot(self):
+        """{"stages": {name: histogram snapshot}, "counters": {name: value}}"""
+        with self._lock:
+            stages = dict(self._stages)
+            counters = dict(self._counters)
+        return {"stages": {name: h.snapshot() for name, h in sorted(stages.items())}, "counters": counters}
+
+    def render_prometheus(self):
+        snapshot = self.snapshot()
+        metric = f"{self.prefix}_stage_seconds"
+        lines = [f"# HELP {metric} Time spent in each pipeline stage.", f"# TYPE {metric} summary"]
+        for stage, data in snapshot["stages"].items():
+            for q, value in data["percentiles"].items():
+                lines.append(f'{metric}{{stage="{stage}",quantile="{q}"}} {value:.6f}')
+            lines.append(f'{metric}_sum{{stage="{stage}"}} {data["sum"]:.6f}')
+            lines.append(f'{metric}_count{{stage="{stage}"}} {data["count"]}')
+        lines += [f"# HELP {metric}_max Slowest observation of each stage.", f"# TYPE {metric}_max gauge"]
+        for stage, data in snapshot["stages"].items():
+            lines.append(f'{metric}_max{{stage="{stage}"}} {data["max"]:.6f}')
+        for name, value in sorted(snapshot["counters"].items()):
+            counter = f"{self.prefix}_{name}_total"
+            lines += [f"# TYPE {counter} counter", f"{counter} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """Atomically replace `path` with the current metrics."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def reset(self):
+        # Histograms are kept (decorators hold on to them) and emptied.
+        with self._lock:
+            stages = list(self._stages.values())
+            self._counters.clear()
+        for histogram in stages:
+            histogram.reset()
+
+
+metrics = MetricsRegistry()
+
+
+def stage_timer(name):
+    """Context manager recording the enclosed block into stage `name`."""
+    return metrics.timer(name)
+
+
+def timed(name):
+    """Decorator recording every call of the function into stage `name`."""
+    def decorator(func):
+        histogram = metrics.stage(name)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.record(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def start_http_server(port, host="127.0.0.1", registry=metrics):
+    """Serve GET /metrics on a daemon thread and return the server."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug("metrics: " + format, *args)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info("Serving metrics on http://%s:%d/metrics", host, server.server_address[1])
+    return server
+
+
+def start_textfile_writer(path, interval=EXPORT_INTERVAL, registry=metrics):
+    """Rewrite `path` every `interval` seconds on a daemon thread."""
+    def run():
+        while True:
+            try:
+                registry.write_textfile(path)
+            except OSError as e:
+                logger.warning("Could not write metrics to %s: %s", path, e)
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name="metrics-file", daemon=True)
+    thread.start()
+    logger.info("Writing metrics to %s every %.0fs", path, interval)
+    return thread
+
+
+def start_metrics_export(port=None, path=None):
+    """Start whichever exporters are requested by the arguments or the environment."""
+    port = port or os.environ.get(PORT_ENV)
+    path = path or os.environ.get(FILE_ENV)
+    if port:
+        try:
+            start_http_server(int(port))
+        except (OSError, ValueError) as e:
+            logger.error("Metrics endpoint not started: %s", e)
+    if path:
+        start_textfile_writer(path)
+
+
+def format_stats(registry=metrics):
+    """Short fixed-width table of stage latencies for on-screen display."""
+    lines = [f"{'stage':<14}{'n':>6}{'p50':>9}{'p95':>9}{'p99':>9}"]
+    for stage, data in registry.snapshot()["stages"].items():
+        p = data["percentiles"]
+        lines.append(f"{stage:<14}{data['count']:>6}" + "".join(f"{p[q] * 1000:>7.1f}ms" for q in QUANTILES))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import random
+    import timeit
+
+    histogram = Histogram()
+    samples = [random.lognormvariate(-4, 0.8) for _ in range(200_000)]
+    for s in samples:
+        histogram.record(s)
+    samples.sort()
+    for q, value in histogram.percentiles().items():
+        exact = samples[int(q * len(samples)) - 1]
+        print(f"p{int(q * 100):<3} {value * 1000:8.3f} ms  (exact {exact * 1000:8.3f} ms)")
+
+    number = 200_000
+    cost = timeit.timeit(lambda: histogram.record(0.0123), number=number) / number
+    print(f"record() {cost * 1e9:.0f} ns")
+    with stage_timer("demo"):
+        time.sleep(0.01)
+    print(metrics.render_prometheus())
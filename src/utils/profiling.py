@@ -0,0 +1,247 @@
+"""
+Opt-in in-process profiling.
+
+Started with `--profile [SECONDS]` or CHESSPILOT_PROFILE=SECONDS, it runs for
+a fixed window and then writes to CHESSPILOT_PROFILE_DIR (default: the cache
+folder, chesspilot/profiles/<timestamp>/):
+
+  <thread>.folded           collapsed stacks per thread, one "a;b;c count"
+                            line per unique stack, for flamegraph.pl,
+                            speedscope or inferno
+  all.folded                every thread, with the thread name as root frame
+  allocations-<stage>.txt   tracemalloc growth across the capture and
+                            inference calls made during the window
+
+While disabled, `allocation_snapshot()` returns a shared null context and no
+sampler thread or tracemalloc hook exists.
+"""
+import os
+import sys
+import time
+import atexit
+import logging
+import threading
+from collections import Counter, defaultdict
+from contextlib import nullcontext
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+FLAG = "--profile"
+ENV_VAR = "CHESSPILOT_PROFILE"
+DIR_ENV_VAR = "CHESSPILOT_PROFILE_DIR"
+DEFAULT_DURATION = 30.0
+SAMPLE_INTERVAL = 0.005
+# Snapshots are expensive; only the first few calls of a stage are compared.
+SNAPSHOTS_PER_STAGE = 10
+TRACEMALLOC_FRAMES = 10
+TOP_ALLOCATIONS = 25
+
+_NULL_CONTEXT = nullcontext()
+
+
+def _profile_dir():
+    base = os.environ.get("LOCALAPPDATA") if os.name == "nt" else os.environ.get("XDG_CACHE_HOME")
+    base = base or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "chesspilot", "profiles")
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _AllocationSnapshot:
+    """Compares tracemalloc snapshots taken before and after one stage call."""
+
+    __slots__ = ("profiler", "stage", "before")
+
+    def __init__(self, profiler, stage):
+        self.profiler = profiler
+        self.stage = stage
+
+    def __enter__(self):
+        import tracemalloc
+        try:
+            self.before = tracemalloc.take_snapshot()
+        except RuntimeError:
+            # The window closed in the meantime.
+            self.before = None
+        return self
+
+    def __exit__(self, *exc):
+        import tracemalloc
+        if self.before is None:
+            return False
+        try:
+            after = tracemalloc.take_snapshot()
+        except RuntimeError:
+            return False
+        # Leave out the snapshots' own bookkeeping.
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        differences = after.filter_traces(ignore).compare_to(self.before.filter_traces(ignore), "traceback")
+        self.profiler._add_allocations(self.stage, differences)
+        return False
+
+
+class Profiler:
+    """Sampling profiler plus per-stage tracemalloc diffs, active for one window."""
+
+    def __init__(self):
+        self.active = False
+        self.duration = DEFAULT_DURATION
+        self.interval = SAMPLE_INTERVAL
+        self.output_dir = None
+        self._samples = defaultdict(Counter)
+        self._allocations = defaultdict(Counter)
+        self._snapshot_counts = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start_if_requested(self, duration=None):
+        """Start when `duration` (from the CLI) or CHESSPILOT_PROFILE is set."""
+        if duration is None:
+            value = os.environ.get(ENV_VAR)
+            if not value:
+                return False
+            try:
+                duration = float(value)
+            except ValueError:
+                duration = DEFAULT_DURATION
+        self.start(duration)
+        return True
+
+    def start(self, duration=DEFAULT_DURATION, interval=SAMPLE_INTERVAL, output_dir=None):
+        if self.active:
+            return
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        self.duration = duration
+        self.interval = interval
+        self.output_dir = output_dir or os.path.join(
+            os.environ.get(DIR_ENV_VAR) or _profile_dir(), time.strftime("%Y%m%d-%H%M%S"))
+        self._stop.clear()
+        self.active = True
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        logger.info("Profiling for %.0fs; results go to %s", duration, self.output_dir)
+
+    def stop(self):
+        """End the window early (e.g. on exit) and write what was collected."""
+        if self.active:
+            self._stop.set()
+            self._thread.join()
+
+    def _run(self):
+        me = threading.get_ident()
+        deadline = time.monotonic() + self.duration
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.reverse()
+                self._samples[names.get(ident, f"thread-{ident}")][";".join(stack)] += 1
+        self.active = False
+        import tracemalloc
+        tracemalloc.stop()
+        try:
+            self.write_report()
+        except OSError as e:
+            logger.error("Could not write profile: %s", e)
+
+    def allocation_snapshot(self, stage):
+        if not self.active:
+            return _NULL_CONTEXT
+        with self._lock:
+            if self._snapshot_counts[stage] >= SNAPSHOTS_PER_STAGE:
+                return _NULL_CONTEXT
+            self._snapshot_counts[stage] += 1
+        return _AllocationSnapshot(self, stage)
+
+    def _add_allocations(self, stage, differences):
+        with self._lock:
+            totals = self._allocations[stage]
+            for stat in differences:
+                if stat.size_diff > 0:
+                    # Innermost frame first.
+                    totals[tuple(str(frame) for frame in reversed(stat.traceback))] += stat.size_diff
+
+    def write_report(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        combined = Counter()
+        for thread_name, stacks in self._samples.items():
+            safe_name = "".join(c if c.isalnum() or c in "-_" else "_" for c in thread_name)
+            with open(os.path.join(self.output_dir, f"{safe_name}.folded"), "w", encoding="utf-8") as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+                    combined[f"{thread_name};{stack}"] += count
+        with open(os.path.join(self.output_dir, "all.folded"), "w", encoding="utf-8") as f:
+            for stack, count in combined.most_common():
+                f.write(f"{stack} {count}\n")
+
+        for stage, totals in self._allocations.items():
+            calls = self._snapshot_counts[stage]
+            with open(os.path.join(self.output_dir, f"allocations-{stage}.txt"), "w", encoding="utf-8") as f:
+                f.write(f"Memory still allocated after {stage}, summed over {calls} calls (largest first)\n\n")
+                for traceback, size in totals.most_common(TOP_ALLOCATIONS):
+                    f.write(f"{size / 1024:10.1f} KiB  {traceback[0]}\n")
+                    for line in traceback[1:]:
+                        f.write(f"{'':16}{line}\n")
+        logger.info("Profile written to %s (%d samples)", self.output_dir,
+                    sum(combined.values()))
+
+
+profiler = Profiler()
+
+
+def allocation_snapshot(stage):
+    """Context manager recording what the enclosed block allocates while profiling is active."""
+    return profiler.allocation_snapshot(stage)
+
+
+def profiled_allocations(stage):
+    """Decorator form of allocation_snapshot."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with profiler.allocation_snapshot(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def add_profile_argument(parser):
+    parser.add_argument(FLAG, nargs="?", type=float, const=DEFAULT_DURATION, metavar="SECONDS",
+                        help=f"sample stacks and allocations for SECONDS (default {DEFAULT_DURATION:.0f}) "
+                             f"and write flame-graph data; also {ENV_VAR}=SECONDS")
+
+
+if __name__ == "__main__":
+    import tempfile
+    import timeit
+
+    logging.basicConfig(level=logging.INFO)
+
+    def stage():
+        with allocation_snapshot("demo"):
+            return [bytes(1024) for _ in range(100)]
+
+    number = 100_000
+    disabled = timeit.timeit(stage, number=number) / number
+    baseline = timeit.timeit(lambda: [bytes(1024) for _ in range(100)], number=number) / number
+    print(f"disabled hook overhead: {(disabled - baseline) * 1e9:.0f} ns per call")
+
+    profiler.start(duration=1.0, output_dir=tempfile.mkdtemp(prefix="chesspilot-profile-"))
+    deadline = time.monotonic() + 1.0
+    while time.monotonic() < deadline:
+        stage()
+    profiler.stop()
+    print(sorted(os.listdir(profiler.output_dir)))
@@ -14,13 +14,13 @@ def resource_path(relative_path: str) -> str:
     if "stockfish" in relative_path.lower():
         env_path = os.environ.get("STOCKFISH_PATH")
         if env_path:
-            logger.debug(f"Using STOCKFISH_PATH from environment: {env_path}")
+            logger.debug("Using STOCKFISH_PATH from environment: %s", env_path)
             return env_path
 
     if "chess_detection.onnx" in relative_path:
         env_path = os.environ.get("ONNX_PATH")
         if env_path:
-            logger.debug(f"Using ONNX_PATH from environment: {env_path}")
+            logger.debug("Using ONNX_PATH from environment: %s", env_path)
             return env_path
 
     # PyInstaller creates a temp folder and stores path in _MEIPASS
@@ -31,5 +31,5 @@ def resource_path(relative_path: str) -> str:
         base_path = Path(__file__).parent.parent
 
     resolved_path = base_path / relative_path
-    logger.debug(f"Resolved resource path for '{relative_path}': {resolved_path}")
+    logger.debug("Resolved resource path for '%s': %s", relative_path, resolved_path)
     return str(resolved_path)
@@ -1,38 +1,254 @@
-import pyttsx3
+import io
+import os
+import sys
+import wave
+import shutil
+import hashlib
 import logging
+import tempfile
+import threading
+import subprocess
+from array import array
+from queue import Queue, Full, Empty
 
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 
-engine = None
+PIECE_NAMES = {'p': 'Pawn', 'r': 'Rook', 'n': 'Knight', 'b': 'Bishop', 'q': 'Queen', 'k': 'King'}
+SQUARE_NAMES = [f"{f}{r}" for f in "abcdefgh" for r in range(1, 9)]
+# Everything a move announcement is built from; rendered to WAV once and reused.
+PHRASES = ["Move", "from", "to", "promoting to"] + list(PIECE_NAMES.values()) + SQUARE_NAMES
+FRAGMENT_GAP = 0.06  # seconds of silence between fragments
 
-def init_engine():
-    global engine
-    try:
-        engine = pyttsx3.init()
-    except Exception as e:
-        logger.error(f"Failed to initialize pyttsx3 engine: {e}")
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_piece_name(char):
+    return PIECE_NAMES.get(char.lower(), '') if char else ''
+
+
+def _cache_dir():
+    base = os.environ.get("LOCALAPPDATA") if os.name == "nt" else os.environ.get("XDG_CACHE_HOME")
+    base = base or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "chesspilot", "speech")
+
+
+def _find_player():
+    """Command that plays a WAV from stdin, or None (winsound or pyttsx3 is used instead)."""
+    if os.name == "nt":
+        return None
+    for command in (["aplay", "-q", "-"], ["paplay"], ["pw-play", "-"]):
+        if shutil.which(command[0]):
+            return command
+    return None
+
+
+def _read_wav(path):
+    with wave.open(path, "rb") as f:
+        return f.getparams(), f.readframes(f.getnframes())
 
-def speak(text, volume=0.5, mute=False):
-    global engine
-    if engine is None:
-        init_engine()
 
-    if engine and not mute:
+def _scale_volume(frames, sampwidth, volume):
+    if sampwidth != 2 or volume >= 1.0:
+        return frames
+    samples = array("h", frames)
+    if sys.byteorder == "big":
+        samples.byteswap()
+    samples = array("h", (int(s * volume) for s in samples))
+    if sys.byteorder == "big":
+        samples.byteswap()
+    return samples.tobytes()
+
+
+class SpeechWorker(threading.Thread):
+    """
+    Owns the pyttsx3 engine and all audio output on one background thread.
+    Only the newest announcement waits in the queue: a new one replaces any
+    that has not started yet. Idle time is used to render PHRASES to WAV
+    files, after which announcements are stitched together from memory and
+    start without synthesis latency.
+    """
+
+    def __init__(self, queue_size=1):
+        super().__init__(name="speech", daemon=True)
+        self._queue = Queue(maxsize=queue_size)
+        self._put_lock = threading.Lock()
+        self._engine = None
+        self._phrases = {}
+        self._params = None
+        self._player = _find_player()
+        self._cache_dir = None
+
+    def submit(self, fragments, volume):
+        item = (tuple(fragments), volume)
+        with self._put_lock:
+            while True:
+                try:
+                    self._queue.put_nowait(item)
+                    return
+                except Full:
+                    try:
+                        stale = self._queue.get_nowait()
+                        logger.debug("Dropped stale announcement: %s", " ".join(stale[0]))
+                    except Empty:
+                        pass
+
+    def stop(self):
+        with self._put_lock:
+            try:
+                self._queue.get_nowait()
+            except Empty:
+                pass
+            self._queue.put_nowait(None)
+
+    def _init_engine(self):
         try:
-            engine.setProperty('volume', volume)
-            engine.say(text)
-            engine.runAndWait()
+            import pyttsx3  # loads platform speech drivers; deferred until the worker starts
+            self._engine = pyttsx3.init()
         except Exception as e:
-            logger.error(f"Failed to speak: {e}")
+            logger.error("Failed to initialize pyttsx3 engine: %s", e)
+            return
+        try:
+            voice = self._engine.getProperty("voice")
+            rate = self._engine.getProperty("rate")
+        except Exception:
+            voice, rate = None, None
+        # Rendered audio depends on the voice, so each voice gets its own folder.
+        tag = hashlib.sha1(f"{voice}|{rate}".encode()).hexdigest()[:12]
+        self._cache_dir = os.path.join(_cache_dir(), tag)
+
+    def _phrase_path(self, phrase):
+        return os.path.join(self._cache_dir, f"{phrase.replace(' ', '_')}.wav")
+
+    def _load_phrase(self, phrase):
+        path = self._phrase_path(phrase)
+        if not os.path.exists(path):
+            return False
+        try:
+            params, frames = _read_wav(path)
+        except (OSError, EOFError, wave.Error):
+            return False
+        key = (params.nchannels, params.sampwidth, params.framerate)
+        if self._params is None:
+            self._params = key
+        if key != self._params:
+            return False
+        self._phrases[phrase] = frames
+        return True
+
+    def _render_phrase(self, phrase):
+        path = self._phrase_path(phrase)
+        os.makedirs(self._cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix=".wav", dir=self._cache_dir)
+        os.close(fd)
+        try:
+            self._engine.save_to_file(phrase, tmp_path)
+            self._engine.runAndWait()
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.debug("Could not pre-render '%s': %s", phrase, e)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        if not self._load_phrase(phrase):
+            # e.g. the driver writes AIFF; live synthesis is used instead.
+            logger.debug("Pre-rendered '%s' is not a usable WAV", phrase)
+
+    def run(self):
+        self._init_engine()
+        if self._engine is None:
+            # Drain requests so callers never block.
+            while self._queue.get() is not None:
+                pass
+            return
+
+        pending = [p for p in PHRASES if not self._load_phrase(p)]
+        if pending:
+            logger.info("Pre-rendering %d speech phrases in the background", len(pending))
+
+        while True:
+            try:
+                item = self._queue.get(block=not pending)
+            except Empty:
+                self._render_phrase(pending.pop(0))
+                continue
+            if item is None:
+                return
+            fragments, volume = item
+            try:
+                self._speak(fragments, volume)
+            except Exception as e:
+                logger.error("Failed to speak: %s", e)
+
+    def _speak(self, fragments, volume):
+        if all(f in self._phrases for f in fragments) and (self._player or os.name == "nt"):
+            self._play(self._stitch(fragments, volume))
+            return
+        self._engine.setProperty("volume", volume)
+        self._engine.say(" ".join(fragments))
+        self._engine.runAndWait()
+
+    def _stitch(self, fragments, volume):
+        nchannels, sampwidth, framerate = self._params
+        gap = b"\0" * int(FRAGMENT_GAP * framerate) * nchannels * sampwidth
+        frames = gap.join(self._phrases[f] for f in fragments)
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as f:
+            f.setnchannels(nchannels)
+            f.setsampwidth(sampwidth)
+            f.setframerate(framerate)
+            f.writeframes(_scale_volume(frames, sampwidth, volume))
+        return buffer.getvalue()
+
+    def _play(self, wav_bytes):
+        if os.name == "nt":
+            import winsound
+            winsound.PlaySound(wav_bytes, winsound.SND_MEMORY)
+            return
+        subprocess.run(self._player, input=wav_bytes, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, check=False)
+
+
+def start_speech_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = SpeechWorker()
+            _worker.start()
+        return _worker
+
+
+def stop_speech_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is not None:
+            _worker.stop()
+            _worker = None
+
+
+def speak(text, volume=0.5, mute=False):
+    """Queue `text` for speaking and return immediately."""
+    if not mute:
+        start_speech_worker().submit([text], volume)
+
+
+def announce_move(move, piece=None, volume=0.5, mute=False):
+    """Queue "Move <piece> from <sq> to <sq>" using the pre-rendered fragments when available."""
+    if mute:
+        return
+    fragments = ["Move"]
+    if get_piece_name(piece):
+        fragments.append(get_piece_name(piece))
+    fragments += ["from", move[:2], "to", move[2:4]]
+    if len(move) > 4 and get_piece_name(move[4]):
+        fragments += ["promoting to", get_piece_name(move[4])]
+    start_speech_worker().submit(fragments, volume)
 
-def get_piece_name(char):
-    pieces = {
-        'p': 'Pawn', 'r': 'Rook', 'n': 'Knight', 'b': 'Bishop', 'q': 'Queen', 'k': 'King',
-        'P': 'Pawn', 'R': 'Rook', 'N': 'Knight', 'B': 'Bishop', 'Q': 'Queen', 'K': 'King'
-    }
-    return pieces.get(char, '')
 
 if __name__ == '__main__':
+    import time
+    logging.basicConfig(level=logging.DEBUG)
     speak("Hello, this is a test of the speech support.", volume=0.8)
-    speak("Move Knight from G1 to F3", volume=0.5)
+    announce_move("g1f3", "N", volume=0.5)
+    time.sleep(8)
+    stop_speech_worker()
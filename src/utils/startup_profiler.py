@@ -0,0 +1,103 @@
+import os
+import sys
+import time
+import builtins
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+FLAG = "--profile-startup"
+ENV_VAR = "CHESSPILOT_PROFILE_STARTUP"
+
+
+class StartupProfiler:
+    """
+    Records how long each first-time import and each named init step takes
+    (steps may run on background threads). Disabled, it costs one attribute
+    check per step and leaves the import machinery alone.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.origin = time.perf_counter()
+        self.imports = {}
+        self.steps = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._original_import = None
+
+    def enable_if_requested(self, argv=None):
+        argv = sys.argv if argv is None else argv
+        if FLAG in argv or os.environ.get(ENV_VAR) == "1":
+            self.enable()
+        return self.enabled
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            total = time.perf_counter() - started
+            children = stack.pop()
+            if stack:
+                stack[-1] += total
+            with self._lock:
+                if name not in self.imports:
+                    # (self time, cumulative time) as in `python -X importtime`.
+                    self.imports[name] = (total - children, total)
+
+    @contextmanager
+    def step(self, name):
+        """Time the enclosed block as an init step."""
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, started)
+
+    def mark(self, name):
+        """Record a point in time (e.g. the window appearing)."""
+        if self.enabled:
+            self._record(name, time.perf_counter())
+
+    def _record(self, name, started):
+        finished = time.perf_counter()
+        with self._lock:
+            self.steps.append((name, threading.current_thread().name,
+                               started - self.origin, finished - started))
+
+    def report(self, top=25):
+        lines = ["Startup profile", "", "Init steps (start offset, duration, thread):"]
+        for name, thread, offset, duration in sorted(self.steps, key=lambda s: s[2]):
+            lines.append(f"  {offset * 1000:8.1f} ms  {duration * 1000:8.1f} ms  {thread:<14} {name}")
+        lines += ["", f"Slowest imports (self / cumulative), top {top}:"]
+        slowest = sorted(self.imports.items(), key=lambda item: item[1][1], reverse=True)[:top]
+        for name, (own, total) in slowest:
+            lines.append(f"  {own * 1000:8.1f} ms  {total * 1000:8.1f} ms  {name}")
+        return "\n".join(lines)
+
+    def log_report(self):
+        if self.enabled:
+            logger.info("\n" + self.report())
+
+
+startup_profiler = StartupProfiler()
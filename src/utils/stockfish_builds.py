@@ -0,0 +1,255 @@
+import os
+import re
+import json
+import stat
+import tarfile
+import zipfile
+import hashlib
+import logging
+import platform
+import subprocess
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+CACHE_FILE = "stockfish_build.json"
+
+# Official Stockfish build suffixes, fastest first, with the CPU flags
+# (as named in /proc/cpuinfo) each one needs.
+X86_VARIANTS = [
+    ("x86-64-avx512icl", {"avx512f", "avx512bw", "avx512vl", "avx512_vnni", "avx512_vbmi",
+                          "avx512_vbmi2", "avx512_bitalg", "avx512_vpopcntdq", "gfni",
+                          "vaes", "vpclmulqdq"}),
+    ("x86-64-vnni512", {"avx512f", "avx512bw", "avx512dq", "avx512vl", "avx512_vnni", "bmi2"}),
+    ("x86-64-avx512", {"avx512f", "avx512bw"}),
+    # VNNI on 256-bit vectors only: needs the VL encodings, not full-width AVX-512.
+    ("x86-64-vnni256", {"avx512vl", "avx512_vnni", "avx2", "bmi2"}),
+    ("x86-64-avxvnni", {"avx_vnni", "avx2", "bmi2"}),
+    ("x86-64-bmi2", {"avx2", "bmi2"}),
+    ("x86-64-avx2", {"avx2", "popcnt"}),
+    ("x86-64-sse41-popcnt", {"sse4_1", "popcnt"}),
+    ("x86-64-modern", {"sse4_1", "popcnt"}),
+    ("x86-64", set()),
+]
+ARM_VARIANTS = [
+    ("armv8-dotprod", {"asimddp"}),
+    ("armv8", set()),
+]
+
+# IsProcessorFeaturePresent() constants. Windows exposes no BMI2/VNNI/AVX-512
+# subfeature bits; builds needing those are not filtered out but left to the
+# bench check.
+_WINDOWS_FEATURES = {
+    "sse4_1": 37,
+    "avx2": 40,
+    "avx512f": 41,
+}
+
+_VARIANT_RE = re.compile(r"(x86-64(?:-[a-z0-9]+(?:-popcnt)?)?|armv8(?:-dotprod)?)(?:\.exe)?$")
+
+
+def _variants_for_machine():
+    machine = platform.machine().lower()
+    if machine in ("aarch64", "arm64"):
+        return ARM_VARIANTS
+    return X86_VARIANTS
+
+
+def get_cpu_flags():
+    """
+    Return the set of CPU feature flags, or None if they cannot be read
+    (every build is then tried fastest-first and verified by bench).
+    """
+    if os.name == "nt":
+        try:
+            import ctypes
+            present = ctypes.windll.kernel32.IsProcessorFeaturePresent
+            flags = {name for name, feature in _WINDOWS_FEATURES.items() if present(feature)}
+        except (AttributeError, OSError):
+            return None
+        # Every AVX2-capable CPU also has POPCNT.
+        if "avx2" in flags or "sse4_1" in flags:
+            flags.add("popcnt")
+        return flags
+
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key.strip() in ("flags", "Features"):
+                    return set(value.split())
+    except OSError:
+        pass
+    return None
+
+
+def detectable_flags():
+    """Flags get_cpu_flags() can see on this OS, or None when it reports them all."""
+    if os.name == "nt":
+        return set(_WINDOWS_FEATURES) | {"popcnt"}
+    return None
+
+
+def build_variant(name):
+    """Map an archive member like 'stockfish/stockfish-ubuntu-x86-64-avx2' to 'x86-64-avx2'."""
+    base = os.path.basename(name)
+    if not base.startswith("stockfish"):
+        return None
+    if (os.name == "nt") != base.endswith(".exe"):
+        return None
+    match = _VARIANT_RE.search(base)
+    return match.group(1) if match else None
+
+
+def rank_builds(candidates, cpu_flags, detectable=None):
+    """
+    Order (variant, source) candidates fastest first, dropping builds the CPU
+    is known not to run. Only flags in `detectable` (all, if None) can rule a
+    build out; with unknown flags everything is kept for the bench check.
+    """
+    ranked = []
+    for index, (variant, required) in enumerate(_variants_for_machine()):
+        if cpu_flags is not None:
+            missing = required - cpu_flags
+            if detectable is not None:
+                missing &= detectable
+            if missing:
+                continue
+        ranked += [(index, c) for c in candidates if c[0] == variant]
+    return [c for _, c in sorted(ranked, key=lambda item: item[0])]
+
+
+def _list_candidates(source: Path):
+    if source.is_dir():
+        return [(build_variant(p.name), p) for p in source.rglob("stockfish*")
+                if p.is_file() and build_variant(p.name)]
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            return [(build_variant(m.filename), m.filename) for m in archive.infolist()
+                    if not m.is_dir() and build_variant(m.filename)]
+    if tarfile.is_tarfile(source):
+        with tarfile.open(source) as archive:
+            return [(build_variant(m.name), m.name) for m in archive.getmembers()
+                    if m.isfile() and build_variant(m.name)]
+    return []
+
+
+def _candidate_path(target: Path, variant) -> Path:
+    """Where a build from an archive is unpacked for its bench check, e.g. src/stockfish-x86-64-avx2."""
+    return target.with_name(f"{target.stem}-{variant}{target.suffix}")
+
+
+def _materialize(source: Path, member, path: Path) -> Path:
+    """
+    Make a build available as an executable file: builds in a release folder
+    are used in place, builds in an archive are unpacked to `path`.
+    """
+    if source.is_dir():
+        path = Path(member)
+    else:
+        if zipfile.is_zipfile(source):
+            with zipfile.ZipFile(source) as archive, archive.open(member) as src:
+                data = src.read()
+        else:
+            with tarfile.open(source) as archive:
+                data = archive.extractfile(member).read()
+        path.write_bytes(data)
+
+    if os.name != "nt":
+        path.chmod(path.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return path
+
+
+def verify_build(path, timeout=30):
+    """Run a tiny bench; builds using unsupported instructions crash here."""
+    try:
+        result = subprocess.run(
+            [str(path), "bench", "16", "1", "1", "default", "depth"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            timeout=timeout,
+            creationflags=subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0,
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.warning("Bench check failed for %s: %s", path, e)
+        return False
+    return result.returncode == 0 and "Nodes searched" in result.stdout
+
+
+def _fingerprint(source: Path, cpu_flags):
+    st = source.stat()
+    flags = ",".join(sorted(cpu_flags)) if cpu_flags is not None else "unknown"
+    return {
+        "source": str(source),
+        "source_mtime": st.st_mtime,
+        "source_size": st.st_size,
+        "cpu": hashlib.sha1(flags.encode()).hexdigest(),
+    }
+
+
+def _load_cache(cache_path: Path):
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def cached_stockfish_build(source: Path, script_dir: Path):
+    """The build chosen for this CPU and `source` on an earlier run, or None; never runs a bench."""
+    cached = _load_cache(script_dir / CACHE_FILE)
+    if not cached:
+        return None
+    fingerprint = _fingerprint(source, get_cpu_flags())
+    if all(cached.get(k) == v for k, v in fingerprint.items()) and Path(cached["path"]).exists():
+        return cached["path"]
+    return None
+
+
+def select_stockfish_build(source: Path, script_dir: Path, stockfish_name: str):
+    """
+    Pick the fastest build in a multi-variant archive or directory that this
+    CPU can run, verify it with a short bench and cache the choice so later
+    startups skip the probe. Returns the executable path or None.
+    """
+    cached = cached_stockfish_build(source, script_dir)
+    if cached:
+        logger.info("Using cached Stockfish build at %s", cached)
+        return cached
+
+    cpu_flags = get_cpu_flags()
+    fingerprint = _fingerprint(source, cpu_flags)
+    cache_path = script_dir / CACHE_FILE
+    candidates = rank_builds(_list_candidates(source), cpu_flags, detectable_flags())
+    if not candidates:
+        logger.warning("No Stockfish build for this CPU found in %s", source)
+        return None
+
+    target = script_dir / stockfish_name
+    for variant, member in candidates:
+        logger.info("Trying Stockfish build %s from %s", variant, source)
+        # Unpacked next to the target, which is only replaced once the build has passed.
+        unpacked = None if source.is_dir() else _candidate_path(target, variant)
+        try:
+            path = _materialize(source, member, unpacked)
+        except (OSError, KeyError, tarfile.TarError, zipfile.BadZipFile) as e:
+            logger.warning("Could not unpack Stockfish build %s: %s", variant, e)
+            continue
+        if not verify_build(path):
+            logger.warning("Stockfish build %s does not run on this CPU", variant)
+            if unpacked is not None:
+                unpacked.unlink(missing_ok=True)
+            continue
+        if unpacked is not None:
+            try:
+                os.replace(unpacked, target)
+                path = target
+            except OSError as e:
+                # E.g. the old binary is still running on Windows; use the build where it is.
+                logger.warning("Could not move %s to %s: %s", unpacked, target, e)
+        with open(cache_path, "w") as f:
+            json.dump({**fingerprint, "variant": variant, "path": str(path)}, f, indent=2)
+        logger.info("Selected Stockfish build %s at %s", variant, path)
+        return str(path)
+    return None
@@ -0,0 +1,333 @@
+"""
+Reconstruct games from a screen recording and write them as PGN.
+
+  python src/video_to_pgn.py game.mp4 -o game.pgn
+  python src/video_to_pgn.py frames/ --fps 30 --sample-fps 4 -o game.pgn
+  python src/video_to_pgn.py session.cpf -o game.pgn
+
+Frames are sampled at --sample-fps (videos are decoded with OpenCV when it
+is installed, otherwise by an ffmpeg process), duplicates are dropped by
+hash, and the rest are recognized in batches by a pool of worker processes,
+one single-threaded ONNX session each. The recognized placements are then
+replayed through GameTracker; a placement has to be seen on --stable
+consecutive samples before it counts, which filters out pieces in mid-drag.
+Every move gets a comment with the time it appeared in the video and a
+[%emt] with the time since the previous move. When the tracker loses the
+game (a new game, a different board) the current game is closed and a new
+one started.
+"""
+import os
+import sys
+import time
+import shutil
+import hashlib
+import logging
+import argparse
+import threading
+import subprocess
+import multiprocessing
+
+from PIL import Image
+
+from utils.logging_setup import setup_console_logging
+from executor.game_tracker import GameTracker
+from executor.pgn import format_pgn
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".webp")
+# Sampled frames are hashed from a small grayscale thumbnail so compression
+# noise does not defeat deduplication, while a moved piece still changes it.
+THUMBNAIL_WIDTH = 96
+THUMBNAIL_SHIFT = 3
+
+
+def _thumbnail_key(image):
+    thumb = image.convert("L").resize((THUMBNAIL_WIDTH, max(1, THUMBNAIL_WIDTH * image.height // image.width)))
+    return hashlib.blake2b(thumb.point(lambda v: v >> THUMBNAIL_SHIFT).tobytes(), digest_size=16).digest()
+
+
+def _raw_payload(image):
+    return ("raw", image.mode, image.size, image.tobytes())
+
+
+def iter_directory(directory, fps, sample_fps):
+    """(timestamp, key, payload) for the image files of `directory` in name order."""
+    names = sorted(name for name in os.listdir(directory) if name.lower().endswith(IMAGE_EXTENSIONS))
+    stride = max(1, round(fps / sample_fps)) if sample_fps else 1
+    for i in range(0, len(names), stride):
+        path = os.path.join(directory, names[i])
+        # Decoding is left to the workers; identical files are still deduplicated.
+        with open(path, "rb") as f:
+            key = hashlib.blake2b(f.read(), digest_size=16).digest()
+        yield i / fps, key, ("path", path)
+
+
+def iter_recording(path, sample_fps):
+    from executor.frame_recording import FrameReader
+    next_sample = 0.0
+    with FrameReader(path) as reader:
+        for frame in reader:
+            if frame.timestamp + 1e-9 < next_sample:
+                continue
+            next_sample = frame.timestamp + 1 / sample_fps
+            yield frame.timestamp, _thumbnail_key(frame.image), _raw_payload(frame.image)
+
+
+def _scaled(image, max_width):
+    if max_width and image.width > max_width:
+        return image.resize((max_width, image.height * max_width // image.width), Image.BILINEAR)
+    return image
+
+
+def _iter_video_cv2(cv2, path, sample_fps, max_width):
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Cannot open video {path}")
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    stride = max(1, round(fps / sample_fps))
+    index = 0
+    try:
+        while capture.grab():
+            if index % stride == 0:
+                ok, frame = capture.retrieve()
+                if not ok:
+                    break
+                image = _scaled(Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)), max_width)
+                yield index / fps, _thumbnail_key(image), _raw_payload(image)
+            index += 1
+    finally:
+        capture.release()
+
+
+def _video_size(path):
+    probe = shutil.which("ffprobe")
+    if not probe:
+        raise RuntimeError("Decoding video needs opencv-python or ffmpeg/ffprobe on PATH")
+    result = subprocess.run([probe, "-v", "error", "-select_streams", "v:0", "-show_entries",
+                             "stream=width,height", "-of", "csv=p=0", path],
+                            capture_output=True, text=True, check=True)
+    width, height = (int(v) for v in result.stdout.strip().split(",")[:2])
+    return width, height
+
+
+def _iter_video_ffmpeg(path, sample_fps, max_width):
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        raise RuntimeError("Decoding video needs opencv-python or ffmpeg on PATH")
+    width, height = _video_size(path)
+    filters = f"fps={sample_fps}"
+    if max_width and width > max_width:
+        # ffmpeg scales on its own threads, which is cheaper than doing it here.
+        height = height * max_width // width // 2 * 2
+        width = max_width
+        filters += f",scale={width}:{height}"
+    command = [ffmpeg, "-v", "error", "-i", path, "-vf", filters, "-f", "rawvideo", "-pix_fmt", "rgb24", "-"]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE)
+    frame_size = width * height * 3
+    index = 0
+    try:
+        while True:
+            data = process.stdout.read(frame_size)
+            if len(data) < frame_size:
+                break
+            image = Image.frombytes("RGB", (width, height), data)
+            yield index / sample_fps, _thumbnail_key(image), ("raw", "RGB", (width, height), data)
+            index += 1
+    finally:
+        process.kill()
+        process.wait()
+
+
+def iter_video(path, sample_fps, max_width):
+    try:
+        import cv2
+    except ImportError:
+        return _iter_video_ffmpeg(path, sample_fps, max_width)
+    return _iter_video_cv2(cv2, path, sample_fps, max_width)
+
+
+def open_source(path, args):
+    if os.path.isdir(path):
+        return iter_directory(path, args.fps, args.sample_fps)
+    if path.lower().endswith(".cpf"):
+        return iter_recording(path, args.sample_fps)
+    return iter_video(path, args.sample_fps, args.max_width)
+
+
+def _init_worker():
+    from board_detection import load_model
+    # One intra-op thread per process: the pool itself provides the parallelism.
+    load_model(threads=1)
+    logging.getLogger("board_detection.fen_extractor").setLevel(logging.ERROR)
+
+
+def _decode(payload):
+    if payload[0] == "path":
+        return Image.open(payload[1]).convert("RGB")
+    _, mode, size, data = payload
+    return Image.frombytes(mode, size, data)
+
+
+def _recognize_batch(batch):
+    """[(key, placement or None)] for a batch of (key, payload), read as if white were at the bottom."""
+    from board_detection import get_positions_batch, get_fen_from_position
+    images = [_decode(payload) for _, payload in batch]
+    results = []
+    for (key, _), (boxes, _, _) in zip(batch, get_positions_batch(images)):
+        extracted = get_fen_from_position("w", boxes) if boxes else None
+        results.append((key, extracted[3].split()[0] if extracted else None))
+    return results
+
+
+def recognize(source, workers, batch_size):
+    """
+    Run recognition over a frame source. Returns the sampled timeline as
+    [(timestamp, key)] and the recognized placement (or None) of each key.
+    """
+    timeline = []
+    placements = {}
+    # Bounds the frames decoded ahead of the workers.
+    in_flight = threading.BoundedSemaphore(workers * 2)
+
+    def batches():
+        seen, batch = set(), []
+        for timestamp, key, payload in source:
+            timeline.append((timestamp, key))
+            if key in seen:
+                continue
+            seen.add(key)
+            batch.append((key, payload))
+            if len(batch) == batch_size:
+                in_flight.acquire()
+                yield batch
+                batch = []
+        if batch:
+            in_flight.acquire()
+            yield batch
+
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(workers, initializer=_init_worker) as pool:
+        for results in pool.imap_unordered(_recognize_batch, batches()):
+            in_flight.release()
+            placements.update(results)
+    return timeline, placements
+
+
+def flip_placements(placements):
+    """Placements as seen with black at the bottom."""
+    from board_detection.fen_extractor import flip_board
+    return {key: flip_board(p + " w").split()[0] if p else None for key, p in placements.items()}
+
+
+def detect_color(placements):
+    """Side at the bottom of most recognized boards."""
+    from board_detection.side_detector import detect_side_from_fen
+    sides = [detect_side_from_fen(p) for p in placements.values() if p]
+    return "b" if sides.count("b") > len(sides) // 2 else "w"
+
+
+def _clock(seconds, digits=1):
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    return f"{hours}:{minutes:02d}:{seconds:0{3 + digits if digits else 2}.{digits}f}"
+
+
+def build_games(timeline, placements, stable=2):
+    """Feed stable placements to a GameTracker; returns [(root_fen, [(uci, timestamp)])]."""
+    tracker = GameTracker()
+    games = []
+    current = None
+    candidate, count, first_seen, last_fed = None, 0, 0.0, None
+
+    for timestamp, key in timeline:
+        placement = placements.get(key)
+        if placement is None:
+            continue
+        if placement != candidate:
+            candidate, count, first_seen = placement, 0, timestamp
+        count += 1
+        if count < stable or placement == last_fed:
+            continue
+        before = len(tracker.moves)
+        found = tracker.update(f"{placement} w - - 0 1")
+        if found is None:
+            # Unexplained; fed again on the next sample so the tracker can resync.
+            continue
+        last_fed = placement
+        root, moves = tracker.history()
+        if current is None or root != current[0] or len(moves) < before:
+            # (Re)synced: a new game, unless the previous one never got a move.
+            if current is not None and current[1]:
+                games.append(current)
+            current = (root, [(uci, first_seen) for uci in moves])
+            continue
+        current[1].extend((uci, first_seen) for uci in found)
+    if current is not None and current[1]:
+        games.append(current)
+    return games
+
+
+def write_pgn(games, path, source_name, video_start=0.0):
+    date = time.strftime("%Y.%m.%d")
+    chunks = []
+    for number, (root, moves) in enumerate(games, 1):
+        comments = {}
+        previous = moves[0][1]
+        for i, (_, timestamp) in enumerate(moves):
+            comments[i] = f"[%emt {_clock(timestamp - previous, 0)}] {_clock(timestamp - video_start)}"
+            previous = timestamp
+        headers = {"Event": "Video import", "Site": source_name, "Date": date, "Round": str(number),
+                   "Annotator": "ChessPilot video_to_pgn"}
+        chunks.append(format_pgn([uci for uci, _ in moves], root, headers, comments))
+    text = "\n".join(chunks)
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Turn a screen recording of a chess game into PGN.")
+    parser.add_argument("source", help="video file, directory of frame images, or .cpf recording")
+    parser.add_argument("-o", "--output", help="PGN file to write (default: stdout)")
+    parser.add_argument("--sample-fps", type=float, default=4.0, help="frames analysed per second of video (default: 4)")
+    parser.add_argument("--fps", type=float, default=30.0, help="frame rate of a frame directory (default: 30)")
+    parser.add_argument("--max-width", type=int, default=1280, help="downscale wider video frames (default: 1280)")
+    parser.add_argument("--color", choices=("auto", "w", "b"), default="auto", help="side at the bottom (default: auto)")
+    parser.add_argument("--stable", type=int, default=2,
+                        help="consecutive samples a position must be seen on before it counts (default: 2)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="recognition processes (default: all cores)")
+    parser.add_argument("--batch-size", type=int, default=4, help="frames per inference call (default: 4)")
+    args = parser.parse_args()
+
+    setup_console_logging()
+    started = time.perf_counter()
+    try:
+        timeline, placements = recognize(open_source(args.source, args), args.workers, args.batch_size)
+    except (OSError, ValueError, RuntimeError, subprocess.CalledProcessError) as e:
+        logger.error(str(e))
+        sys.exit(1)
+    elapsed = time.perf_counter() - started
+    logger.info("%d frames sampled, %d recognized (%d duplicates skipped) in %.1fs: %.1f frames/s on %d workers",
+                len(timeline), len(placements), len(timeline) - len(placements), elapsed,
+                len(placements) / elapsed if elapsed else 0, args.workers)
+
+    color = args.color
+    if color == "auto":
+        color = detect_color(placements)
+        logger.info("Detected %s at the bottom", "white" if color == "w" else "black")
+    if color == "b":
+        placements = flip_placements(placements)
+
+    games = build_games(timeline, placements, args.stable)
+    if not games:
+        logger.error("No moves could be reconstructed from %s", args.source)
+        sys.exit(1)
+    write_pgn(games, args.output, os.path.basename(args.source))
+    logger.info("Wrote %d game(s), %d moves", len(games), sum(len(moves) for _, moves in games))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+Recognition benchmark over a labeled screenshot corpus.
+
+The corpus is a directory with a labels.jsonl file, one object per image:
+
+  {"image": "games/0001.png", "fen": "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1", "color": "w"}
+
+"fen" may also be just the placement field; "color" is the side at the bottom
+of the screenshot (default "w"). Every image is run through get_positions and
+get_fen_from_position; the report covers throughput, latency percentiles per
+stage, exact-placement accuracy and per-class square-level precision/recall.
+Results can be saved as JSON and compared against an earlier run:
+
+  python src/vision_benchmark.py corpus/ --output after.json --compare before.json
+
+A frame recording (see executor/frame_recording.py) can be replayed instead
+of a corpus. It has no labels, so accuracy is reported as agreement with the
+placements of an earlier run on the same recording:
+
+  python src/vision_benchmark.py --replay session.cpf --output base.json
+  python src/vision_benchmark.py --replay session.cpf --compare base.json
+"""
+import os
+import sys
+import json
+import time
+import logging
+import platform
+import argparse
+import itertools
+import subprocess
+from functools import partial
+
+from PIL import Image
+
+from utils.logging_setup import setup_console_logging
+from utils.metrics import metrics
+from board_detection import get_positions, get_fen_from_position, load_model, warm_up, ModelNotFoundError
+from executor.frame_recording import FrameReader
+
+logger = logging.getLogger(__name__)
+
+CLASSES = "PNBRQKpnbrqk"
+EMPTY = "."
+PERCENTILES = (50, 95, 99)
+
+
+def load_corpus(directory, labels_path=None, limit=None):
+    """Return the labels as [(name, path, placement, color)]; images are decoded later by iter_corpus."""
+    labels_path = labels_path or os.path.join(directory, "labels.jsonl")
+    corpus = []
+    with open(labels_path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                label = json.loads(line)
+                name = label["image"]
+                placement = label["fen"].split()[0]
+            except (ValueError, KeyError) as e:
+                raise ValueError(f"{labels_path}:{line_number}: bad label: {e}") from e
+            path = os.path.join(directory, name)
+            if not os.path.isfile(path):
+                raise ValueError(f"{labels_path}:{line_number}: no such image: {name}")
+            corpus.append((name, path, placement, label.get("color", "w")))
+            if limit and len(corpus) >= limit:
+                break
+    return corpus
+
+
+def iter_corpus(corpus):
+    """Yield (name, image, placement, color), decoding one image at a time so memory stays flat."""
+    for name, path, placement, color in corpus:
+        with Image.open(path) as image:
+            yield name, image.convert("RGB"), placement, color
+
+
+def iter_recording(path, color="w", limit=None):
+    """Unlabeled (name, image, None, color) entries for the frames of a .cpf recording, decoded as read."""
+    with FrameReader(path) as reader:
+        for frame in itertools.islice(reader, limit):
+            yield f"frame {frame.index} @ {frame.timestamp:.3f}s", frame.image, None, color
+
+
+def count_recording(path, limit=None):
+    with FrameReader(path) as reader:
+        return min(len(reader), limit) if limit else len(reader)
+
+
+def expand_placement(placement):
+    """64 characters from a8 to h1, EMPTY for empty squares; None if malformed."""
+    squares = []
+    for row in placement.split("/"):
+        for ch in row:
+            squares.extend(EMPTY * int(ch) if ch.isdigit() else ch)
+    return squares if len(squares) == 64 else None
+
+
+def percentiles(values):
+    if not values:
+        return {f"p{p}": None for p in PERCENTILES}
+    ordered = sorted(values)
+    return {f"p{p}": ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] for p in PERCENTILES}
+
+
+def recognize(image, color):
+    """Run the recognition pipeline; returns (placement or None, detect seconds, fen seconds)."""
+    started = time.perf_counter()
+    boxes, _, _ = get_positions(image)
+    detected = time.perf_counter()
+    extracted = get_fen_from_position(color, boxes) if boxes else None
+    finished = time.perf_counter()
+    placement = extracted[3].split()[0] if extracted else None
+    return placement, detected - started, finished - detected
+
+
+def score(results):
+    """Accuracy figures from [(name, truth, predicted)]."""
+    confusion = {c: {"tp": 0, "fp": 0, "fn": 0} for c in CLASSES + EMPTY}
+    exact = correct_squares = boards_found = 0
+    failures = []
+    for name, truth, predicted in results:
+        truth_squares = expand_placement(truth)
+        predicted_squares = expand_placement(predicted) if predicted else None
+        if predicted_squares is None:
+            # No board: every square counts as missed.
+            predicted_squares = [None] * 64
+        else:
+            boards_found += 1
+        if predicted == truth:
+            exact += 1
+        else:
+            failures.append({"image": name, "expected": truth, "got": predicted})
+        for want, got in zip(truth_squares, predicted_squares):
+            if want == got:
+                confusion[want]["tp"] += 1
+                correct_squares += 1
+                continue
+            confusion[want]["fn"] += 1
+            if got is not None:
+                confusion[got]["fp"] += 1
+
+    per_class = {}
+    for cls, c in confusion.items():
+        precision = c["tp"] / (c["tp"] + c["fp"]) if c["tp"] + c["fp"] else None
+        recall = c["tp"] / (c["tp"] + c["fn"]) if c["tp"] + c["fn"] else None
+        per_class[cls] = dict(c, precision=precision, recall=recall)
+    total = len(results)
+    return {
+        "images": total,
+        "board_detection_rate": boards_found / total if total else None,
+        "exact_fen_accuracy": exact / total if total else None,
+        "square_accuracy": correct_squares / (64 * total) if total else None,
+        "per_class": per_class,
+        "failures": failures,
+    }
+
+
+def run_benchmark(frames, repeat=1, warmup=3):
+    """
+    Time recognition over `frames()`, a callable returning a fresh iterator of
+    (name, image, truth, color) for each pass. Images are decoded while the
+    pass runs, so only get_positions and get_fen_from_position are timed and
+    throughput is frames per second of recognition time.
+    """
+    for _, image, _, color in itertools.islice(frames(), warmup):
+        recognize(image, color)
+    metrics.reset()
+
+    detect_times, fen_times, total_times = [], [], []
+    results = []
+    for iteration in range(repeat):
+        for name, image, truth, color in frames():
+            placement, detect, fen = recognize(image, color)
+            detect_times.append(detect)
+            fen_times.append(fen)
+            total_times.append(detect + fen)
+            if iteration == 0:
+                results.append((name, truth, placement))
+    elapsed = sum(total_times)
+
+    stages = {name: {"count": data["count"], **{f"p{int(q * 100)}": v for q, v in data["percentiles"].items()}}
+              for name, data in metrics.snapshot()["stages"].items() if data["count"]}
+    timed = len(total_times)
+    return {
+        "throughput_fps": timed / elapsed if elapsed else None,
+        "frames": timed,
+        "latency": {
+            "total": percentiles(total_times),
+            "get_positions": percentiles(detect_times),
+            "get_fen_from_position": percentiles(fen_times),
+        },
+        "stages": stages,
+        "accuracy": score(results) if all(truth for _, truth, _ in results) else None,
+        "placements": [placement for _, _, placement in results],
+    }
+
+
+def environment():
+    info = {"python": platform.python_version(), "platform": platform.platform(), "processor": platform.processor()}
+    try:
+        import onnxruntime
+        info["onnxruntime"] = onnxruntime.__version__
+    except ImportError:
+        pass
+    try:
+        info["commit"] = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                        cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return info
+
+
+def _fmt_ms(value):
+    return "   n/a" if value is None else f"{value * 1000:6.1f}"
+
+
+def _fmt_pct(value):
+    return "  n/a" if value is None else f"{value * 100:5.1f}%"
+
+
+def print_report(report, baseline=None):
+    accuracy = report["accuracy"]
+    placements = report["placements"]
+    print(f"Images: {len(placements)}  frames timed: {report['frames']}  "
+          f"throughput: {report['throughput_fps']:.2f} fps")
+    if accuracy:
+        print(f"Board detected {_fmt_pct(accuracy['board_detection_rate'])}   exact FEN {_fmt_pct(accuracy['exact_fen_accuracy'])}   "
+              f"squares {_fmt_pct(accuracy['square_accuracy'])}")
+    else:
+        print(f"Board detected {_fmt_pct(sum(1 for p in placements if p) / len(placements))} (unlabeled)")
+    print()
+    print(f"{'latency (ms)':<24}" + "".join(f"{f'p{p}':>8}" for p in PERCENTILES))
+    for name, values in list(report["latency"].items()) + list(report["stages"].items()):
+        print(f"{name:<24}" + "".join(f"{_fmt_ms(values.get(f'p{p}')):>8}" for p in PERCENTILES))
+    if accuracy:
+        print()
+        print(f"{'class':<8}{'precision':>10}{'recall':>10}{'support':>9}")
+        for cls, c in accuracy["per_class"].items():
+            print(f"{cls:<8}{_fmt_pct(c['precision']):>10}{_fmt_pct(c['recall']):>10}{c['tp'] + c['fn']:>9}")
+
+    if baseline:
+        old_accuracy = baseline.get("accuracy") or {}
+        print()
+        print(f"Compared with {baseline.get('environment', {}).get('commit', 'baseline')}:")
+        print(f"  throughput   {baseline['throughput_fps']:8.2f} -> {report['throughput_fps']:8.2f} fps")
+        for p in PERCENTILES:
+            old, new = baseline["latency"]["total"].get(f"p{p}"), report["latency"]["total"].get(f"p{p}")
+            print(f"  total p{p:<4} {_fmt_ms(old)} -> {_fmt_ms(new)} ms")
+        if accuracy:
+            for key in ("exact_fen_accuracy", "square_accuracy"):
+                print(f"  {key:<20} {_fmt_pct(old_accuracy.get(key))} -> {_fmt_pct(accuracy.get(key))}")
+        old_placements = baseline.get("placements")
+        if old_placements and len(old_placements) == len(placements):
+            same = sum(1 for a, b in zip(old_placements, placements) if a == b)
+            print(f"  same placement as baseline on {same}/{len(placements)} frames")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark board recognition on a labeled screenshot corpus.")
+    parser.add_argument("corpus", nargs="?", help="directory containing labels.jsonl and the images it names")
+    parser.add_argument("--replay", help="benchmark the frames of a .cpf recording instead of a corpus")
+    parser.add_argument("--color", choices=("w", "b"), default="w", help="side at the bottom of replayed frames (default: w)")
+    parser.add_argument("--labels", help="labels file (default: <corpus>/labels.jsonl)")
+    parser.add_argument("--limit", type=int, help="only use the first N labeled images")
+    parser.add_argument("--repeat", type=int, default=1, help="timed passes over the corpus (default: 1)")
+    parser.add_argument("--warmup", type=int, default=3, help="untimed images run first (default: 3)")
+    parser.add_argument("--output", help="write the full results as JSON")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    args = parser.parse_args()
+    if bool(args.corpus) == bool(args.replay):
+        parser.error("give either a corpus directory or --replay")
+
+    setup_console_logging()
+    try:
+        load_model()
+        warm_up()
+    except ModelNotFoundError as e:
+        logger.error(str(e))
+        sys.exit(1)
+
+    if args.replay:
+        count = count_recording(args.replay, args.limit)
+        frames = partial(iter_recording, args.replay, args.color, args.limit)
+    else:
+        corpus = load_corpus(args.corpus, args.labels, args.limit)
+        count = len(corpus)
+        frames = partial(iter_corpus, corpus)
+    if not count:
+        logger.error("No labeled images found")
+        sys.exit(1)
+    logger.info("Benchmarking %d images", count)
+
+    report = run_benchmark(frames, repeat=args.repeat, warmup=args.warmup)
+    report["environment"] = environment()
+    report["corpus"] = os.path.abspath(args.replay or args.corpus)
+    report["timestamp"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        logger.info("Results written to %s", args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import pytest
+
+from batch_analyze import Checkpoint, open_output
+
+
+def test_mark_keeps_contiguous_prefix(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "out.ckpt"), "shots")
+    for index in (0, 2, 3, 5):
+        checkpoint.mark(index)
+    assert checkpoint.done_through == 0
+    assert checkpoint.extra == {2, 3, 5}
+    checkpoint.mark(1)
+    assert checkpoint.done_through == 3
+    assert checkpoint.extra == {5}
+    assert [i for i in range(7) if checkpoint.is_done(i)] == [0, 1, 2, 3, 5]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "out.ckpt")
+    checkpoint = Checkpoint(path, "shots")
+    for index in (0, 1, 4):
+        checkpoint.mark(index)
+    checkpoint.save(123, force=True)
+
+    loaded = Checkpoint(path, "shots").load()
+    assert (loaded.done_through, loaded.extra, loaded.output_size) == (1, {4}, 123)
+    assert not (tmp_path / "out.ckpt.tmp").exists()
+
+
+def test_save_is_throttled_unless_forced(tmp_path):
+    path = str(tmp_path / "out.ckpt")
+    checkpoint = Checkpoint(path, "shots")
+    checkpoint.save(10, force=True)
+    checkpoint.save(20)
+    assert Checkpoint(path, "shots").load().output_size == 10
+    checkpoint.save(30, force=True)
+    assert Checkpoint(path, "shots").load().output_size == 30
+
+
+def test_load_rejects_other_source(tmp_path):
+    path = str(tmp_path / "out.ckpt")
+    Checkpoint(path, "shots").save(0, force=True)
+    with pytest.raises(ValueError):
+        Checkpoint(path, "other").load()
+
+
+def test_resume_drops_lines_after_checkpoint(tmp_path):
+    output_path = str(tmp_path / "out.jsonl")
+    checkpoint = Checkpoint(output_path + ".ckpt", "shots")
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write('{"file": "a"}\n')
+        checkpoint.mark(0)
+        checkpoint.save(f.tell(), force=True)
+        f.write('{"file": "b"}\n')
+
+    checkpoint = Checkpoint(checkpoint.path, "shots").load()
+    assert not checkpoint.is_done(1)
+    with open_output(output_path, checkpoint) as output:
+        output.write('{"file": "b2"}\n')
+    with open(output_path, encoding="utf-8") as f:
+        assert f.read() == '{"file": "a"}\n{"file": "b2"}\n'
+
+
+def test_existing_output_without_checkpoint_needs_overwrite(tmp_path):
+    output_path = tmp_path / "out.jsonl"
+    output_path.write_text('{"file": "a"}\n', encoding="utf-8")
+    checkpoint = Checkpoint(str(output_path) + ".ckpt", "shots").load()
+    with pytest.raises(FileExistsError):
+        open_output(str(output_path), checkpoint)
+    assert output_path.read_text(encoding="utf-8") == '{"file": "a"}\n'
+
+    open_output(str(output_path), checkpoint, overwrite=True).close()
+    assert output_path.read_text(encoding="utf-8") == ""
+
+
+def test_overwrite_discards_old_checkpoint(tmp_path):
+    output_path = str(tmp_path / "out.jsonl")
+    checkpoint = Checkpoint(output_path + ".ckpt", "shots")
+    checkpoint.mark(0)
+    checkpoint.save(14, force=True)
+    open_output(output_path, Checkpoint(checkpoint.path, "shots"), overwrite=True).close()
+    assert not (tmp_path / "out.jsonl.ckpt").exists()
@@ -0,0 +1,26 @@
+from executor.bitboard import Position, repair_fen, fen_after_move
+
+START = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
+def test_en_passant_square_only_when_capturable():
+    assert fen_after_move(START, "e2e4") == "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+    fen = "rnbqkbnr/ppp1pppp/8/8/3pP3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 3"
+    fen = fen_after_move(fen, "c2c4")
+    assert fen.split()[3] == "c3"
+    # The key and the FEN agree on whether the square counts.
+    assert Position(fen).zobrist_key() != Position(fen.replace(" c3 ", " - ")).zobrist_key()
+
+
+def test_repair_fen_drops_anything_after_the_fen():
+    assert repair_fen(START + "\nsetoption name Threads value 1024") == START
+    assert repair_fen(START + " moves e2e4") == START
+    assert repair_fen(START.replace(" 0 1", " 0 1\nquit")) == START
+
+
+def test_repair_fen_keeps_canonical_fens():
+    assert repair_fen(START) == START
+    assert repair_fen("4k3/8/8/8/8/8/8/4K111 w - - 0 1") == "4k3/8/8/8/8/8/8/4K3 w - - 0 1"
+    assert repair_fen("4k3/8/8/8/8/8/8/4K2R w Kq - 0 1") == "4k3/8/8/8/8/8/8/4K2R w K - 0 1"
+    assert repair_fen(START.replace(" - ", " e3 ")) == START
+    assert repair_fen("4k3/8/8/8/8/8/8/3K1K2 w - - 0 1") is None
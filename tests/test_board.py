@@ -0,0 +1,16 @@
+from executor.board import Board, as_board
+
+START = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
+def test_as_board_returns_independent_copies():
+    board = as_board(START)
+    board.set_piece("e2", None)
+    assert board.piece_at("e2") is None
+    assert as_board(START).piece_at("e2") == "P"
+    assert as_board(START).fen() == START
+
+
+def test_as_board_passes_boards_through():
+    board = Board(START)
+    assert as_board(board) is board
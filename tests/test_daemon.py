@@ -0,0 +1,58 @@
+from concurrent.futures import Future
+
+import pytest
+
+import daemon
+from daemon import AnalysisService, RequestError
+
+START = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
+class FakePool:
+    size = 1
+
+    def __init__(self):
+        self.calls = []
+
+    def analyse(self, fen, depth=None, movetime=None, history=None):
+        self.calls.append((fen, depth, movetime, history))
+        future = Future()
+        future.set_result({"best_move": "e2e4"})
+        return future
+
+
+@pytest.fixture
+def service():
+    service = AnalysisService(FakePool(), 1)
+    yield service
+    service.shutdown()
+
+
+@pytest.mark.parametrize("request_fields", [
+    {"depth": "1\nquit"},
+    {"depth": 0},
+    {"depth": True},
+    {"movetime": -5},
+    {"movetime": 2.5},
+    {"moves": "e2e4"},
+    {"moves": ["e2e4\nquit"]},
+    {"moves": ["e2e4 d7d5"]},
+])
+def test_analyse_rejects_bad_input(service, request_fields):
+    with pytest.raises(RequestError):
+        service.analyse({"fen": START, **request_fields})
+    assert service.pool.calls == []
+
+
+def test_analyse_passes_parsed_values(service):
+    service.analyse({"fen": START, "moves": ["e2e4", "e7e5"], "movetime": 200})
+    fen, depth, movetime, history = service.pool.calls[0]
+    assert (depth, movetime) == (daemon.DEFAULT_DEPTH, 200)
+    assert history == (START, ("e2e4", "e7e5"))
+    assert fen.startswith("rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w")
+
+
+def test_recognize_reports_missing_model(service, monkeypatch):
+    monkeypatch.setattr(daemon, "_model_error", "chess_detection.onnx not found")
+    with pytest.raises(RequestError, match="Detection model unavailable"):
+        service.recognize({"image_path": "board.png"})
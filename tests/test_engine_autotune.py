@@ -0,0 +1,60 @@
+from executor.engine_autotune import _pick_hash, _pick_threads, recommended_settings, write_engine_config
+from executor.get_best_move import create_default_config, read_engine_config
+
+TUNED = {
+    "cores": 8,
+    "available_mb": 16384,
+    "interactive": {"Threads": 7, "Hash": 1024, "nps": 9000000},
+    "batch": {"Threads": 1, "Hash": 256, "nps": 12000000, "pool_size": 7},
+}
+
+
+def test_pick_hash_prefers_smallest_within_tolerance():
+    assert _pick_hash({16: 980, 64: 1000, 256: 990, 1024: 700}) == 16
+    assert _pick_hash({16: 900, 64: 1000, 256: 990}) == 64
+
+
+def test_pick_threads_stops_when_gain_is_too_small():
+    assert _pick_threads({1: 1000, 2: 1900, 4: 2000}) == (2, 1900)
+
+
+def test_round_trip_keeps_common_lines_and_profiles(tmp_path):
+    path = str(tmp_path / "engine_config.txt")
+    write_engine_config(path, TUNED, ["setoption name Move Overhead value 50", "hot_spare 0"])
+
+    commands, settings = read_engine_config("interactive", path)
+    assert commands == [
+        "setoption name Move Overhead value 50",
+        "setoption name Hash value 1024",
+        "setoption name Threads value 7",
+    ]
+    assert settings == {"hot_spare": "0"}
+
+    commands, settings = read_engine_config("batch", path)
+    assert commands[1:] == ["setoption name Hash value 256", "setoption name Threads value 1"]
+    assert settings == {"hot_spare": "0", "pool_size": "7"}
+
+    commands, settings = read_engine_config(None, path)
+    assert commands == ["setoption name Move Overhead value 50"]
+
+
+def test_tuned_header_names_the_hardware(tmp_path):
+    path = tmp_path / "engine_config.txt"
+    write_engine_config(str(path), TUNED)
+    text = path.read_text()
+    assert "for 8 cores and 16384 MB" in text
+    assert "# bench: 9000000 nodes/second" in text
+
+
+def test_default_config_says_nothing_was_benchmarked(tmp_path):
+    path = tmp_path / "engine_config.txt"
+    create_default_config(str(path))
+    text = path.read_text()
+    assert "?" not in text
+    assert "nothing has been benchmarked" in text
+    assert "python src/autotune.py" in text
+
+    defaults = recommended_settings()
+    commands, settings = read_engine_config("batch", str(path))
+    assert any(command.startswith("setoption name Hash value ") for command in commands)
+    assert settings == {"pool_size": str(defaults["batch"]["pool_size"])}
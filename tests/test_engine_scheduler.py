@@ -0,0 +1,136 @@
+import threading
+
+import pytest
+
+from executor.engine_scheduler import EngineScheduler, INTERACTIVE, BACKGROUND, BATCH
+
+
+class FakeSupervisor:
+    """Just the stop flag EngineScheduler drives; jobs watch it like a search would."""
+
+    def __init__(self):
+        self.stopped = threading.Event()
+        self.stops = 0
+
+    def stop(self):
+        self.stops += 1
+        self.stopped.set()
+
+    def clear_stop(self):
+        self.stopped.clear()
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = EngineScheduler(FakeSupervisor())
+    yield scheduler
+    scheduler.shutdown()
+
+
+def quick(name, log):
+    def job(supervisor):
+        log.append(name)
+        return name
+    return job
+
+
+def gated(name, log, started, release):
+    """Holds the engine until `release` is set, ignoring stop."""
+    def job(supervisor):
+        log.append(name)
+        started.set()
+        release.wait(5)
+        return name
+    return job
+
+
+def searching(name, log, started):
+    """Runs until stopped on its first run, like a search; finishes at once when resumed."""
+    def job(supervisor):
+        log.append(name)
+        if log.count(name) == 1:
+            started.set()
+            supervisor.stopped.wait(5)
+        return {"name": name}
+    return job
+
+
+def hold_engine(scheduler, log):
+    release, started = threading.Event(), threading.Event()
+    scheduler.submit(gated("gate", log, started, release), priority=INTERACTIVE)
+    assert started.wait(5)
+    return release
+
+
+def test_runs_in_priority_then_submission_order(scheduler):
+    log = []
+    release = hold_engine(scheduler, log)
+    futures = [
+        scheduler.submit(quick("batch", log), priority=BATCH),
+        scheduler.submit(quick("background-1", log), priority=BACKGROUND),
+        scheduler.submit(quick("interactive", log), priority=INTERACTIVE),
+        scheduler.submit(quick("background-2", log), priority=BACKGROUND),
+    ]
+    release.set()
+    for future in futures:
+        future.result(timeout=5)
+    assert log == ["gate", "interactive", "background-1", "background-2", "batch"]
+
+
+def test_preempted_search_resumes_at_its_original_place(scheduler):
+    log, started = [], threading.Event()
+    long = scheduler.submit(searching("long", log, started), priority=BATCH)
+    assert started.wait(5)
+    other = scheduler.submit(quick("other", log), priority=BATCH)
+    urgent = scheduler.submit(quick("urgent", log), priority=INTERACTIVE)
+
+    assert urgent.result(timeout=5) == "urgent"
+    assert long.result(timeout=5) == {"name": "long"}
+    assert other.result(timeout=5) == "other"
+    assert log == ["long", "urgent", "long", "other"]
+    assert scheduler.supervisor.stops == 1
+    assert scheduler.get_stats()["batch"]["preempted"] == 1
+
+
+def test_preempted_search_without_resume_returns_its_result(scheduler):
+    log, started = [], threading.Event()
+    long = scheduler.submit(searching("long", log, started), priority=BATCH, resume=False)
+    assert started.wait(5)
+    scheduler.submit(quick("urgent", log), priority=INTERACTIVE)
+    assert long.result(timeout=5) == {"name": "long", "preempted": True}
+    assert log.count("long") == 1
+
+
+def test_same_key_supersedes_pending_request(scheduler):
+    log = []
+    release = hold_engine(scheduler, log)
+    first = scheduler.submit(quick("first", log), key="poll")
+    second = scheduler.submit(quick("second", log), key="poll")
+    release.set()
+    assert second.result(timeout=5) == "second"
+    assert first.cancelled()
+    assert log == ["gate", "second"]
+    assert scheduler.get_stats()["background"]["dropped"] == 1
+
+
+def test_same_key_stops_running_request(scheduler):
+    log, started = [], threading.Event()
+    first = scheduler.submit(searching("first", log, started), key="poll")
+    assert started.wait(5)
+    second = scheduler.submit(quick("second", log), key="poll")
+    assert first.result(timeout=5) is None
+    assert second.result(timeout=5) == "second"
+    assert log == ["first", "second"]
+
+
+def test_stale_request_is_dropped(scheduler):
+    log = []
+    release = hold_engine(scheduler, log)
+    on_screen = {"fen": "a"}
+    stale = scheduler.submit(quick("stale", log), is_current=lambda: on_screen["fen"] == "a")
+    fresh = scheduler.submit(quick("fresh", log), is_current=lambda: on_screen["fen"] == "b")
+    on_screen["fen"] = "b"
+    release.set()
+    assert fresh.result(timeout=5) == "fresh"
+    assert stale.cancelled()
+    assert log == ["gate", "fresh"]
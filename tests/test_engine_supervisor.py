@@ -0,0 +1,73 @@
+import os
+import sys
+import argparse
+
+import pytest
+
+from executor import engine_supervisor
+from executor.engine_supervisor import EngineSupervisor, is_garbled
+
+MOCK_ENGINE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "mock_engine.py")
+MOCK = [sys.executable, MOCK_ENGINE, "--depth-delay", "0.01", "--max-depth", "5"]
+
+
+def configure(engine):
+    engine.send("uci")
+    engine.read_until(lambda line: line == "uciok", 10)
+    engine.sync(10)
+
+
+@pytest.fixture
+def supervisor(monkeypatch):
+    monkeypatch.setattr(engine_supervisor, "STOP_GRACE", 0.3)
+    created = []
+
+    def make(fail):
+        supervisor = EngineSupervisor(MOCK + ["--fail", fail, "--seed", "1"], configure, hot_spare=False).start()
+        # Only the first engine misbehaves; its replacement is spawned healthy.
+        supervisor.command = MOCK
+        created.append(supervisor)
+        return supervisor
+
+    yield make
+    for supervisor in created:
+        supervisor.shutdown()
+
+
+@pytest.mark.parametrize("fail", ["hang@1", "crash@1", "garbage@1"])
+def test_failed_engine_is_replaced_and_request_answered(supervisor, fail):
+    supervisor = supervisor(fail)
+    result = supervisor.search("startpos", "depth 5", stall_timeout=0.5)
+    assert supervisor.restarts == 1
+    assert result["best_move"]
+    assert result["depth"] == 5
+
+
+def test_healthy_engine_is_not_restarted(supervisor):
+    supervisor = supervisor("")
+    assert supervisor.search("startpos", "depth 3")["best_move"]
+    assert supervisor.restarts == 0
+
+
+@pytest.mark.parametrize("line, garbled", [
+    ("info depth 3 score cp 20 pv e2e4", False),
+    ("bestmove e2e4 ponder e7e5", False),
+    ("info string \x00\x07 corrupted", True),
+    ("��", True),
+    ("bestmov", True),
+    ("readyok readyok", True),
+])
+def test_is_garbled(line, garbled):
+    assert is_garbled(line) is garbled
+
+
+def test_unseeded_mocks_differ(monkeypatch):
+    import mock_engine
+
+    def draws(seed, pid):
+        monkeypatch.setattr(mock_engine.os, "getpid", lambda: pid)
+        engine = mock_engine.MockEngine(argparse.Namespace(seed=seed, fail=""))
+        return [engine.rng.random() for _ in range(3)]
+
+    assert draws(None, 100) != draws(None, 101)
+    assert draws(7, 100) == draws(7, 101)
@@ -0,0 +1,95 @@
+from executor.bitboard import Position, STARTING_FEN
+from executor.game_tracker import GameTracker, engine_position
+
+
+def frame(*moves, root=STARTING_FEN, side="w"):
+    """A recognized FEN after `moves`: placement plus the player's colour, like fen_extractor."""
+    position = Position(root)
+    for move in moves:
+        position.push_uci(move)
+    return f"{position.placement()} {side} - - 0 1"
+
+
+def tracker_after(*moves):
+    tracker = GameTracker()
+    assert tracker.update(frame()) == []
+    for i in range(len(moves)):
+        assert tracker.update(frame(*moves[:i + 1])) == [moves[i]]
+    return tracker
+
+
+def test_single_ply_is_inferred():
+    tracker = tracker_after()
+    assert tracker.update(frame("e2e4")) == ["e2e4"]
+    assert tracker.turn == "b"
+    assert tracker.history() == (STARTING_FEN, ("e2e4",))
+    assert tracker.fen() == Position(STARTING_FEN).push_uci("e2e4").fen()
+
+
+def test_unchanged_board_adds_nothing():
+    tracker = tracker_after("e2e4")
+    assert tracker.update(frame("e2e4")) == []
+    assert tracker.history() == (STARTING_FEN, ("e2e4",))
+
+
+def test_missed_frame_covers_two_plies():
+    tracker = tracker_after("e2e4", "e7e5")
+    assert tracker.update(frame("e2e4", "e7e5", "g1f3", "b8c6")) == ["g1f3", "b8c6"]
+    assert tracker.history() == (STARTING_FEN, ("e2e4", "e7e5", "g1f3", "b8c6"))
+    assert tracker.turn == "w"
+
+
+def test_side_to_move_is_corrected_before_the_first_move():
+    root = "r1bqkbnr/pppppppp/2n5/8/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 1"
+    tracker = GameTracker()
+    # The frame only says which side the player has; the tracker assumes it is to move.
+    assert tracker.update(root) == []
+    assert tracker.turn == "w"
+    black_root = root.replace(" w ", " b ")
+    assert tracker.update(frame("e7e5", root=black_root)) == ["e7e5"]
+    assert tracker.turn == "w"
+    root_fen, moves = tracker.history()
+    assert root_fen.split()[1] == "b" and moves == ("e7e5",)
+
+
+def test_castling_is_inferred_from_king_and_rook():
+    root = "r3k2r/pppq1ppp/2npbn2/2b1p3/2B1P3/2NPBN2/PPPQ1PPP/R3K2R w KQkq - 0 1"
+    tracker = GameTracker()
+    assert tracker.update(root) == []
+    assert tracker.update(frame("e1g1", root=root)) == ["e1g1"]
+    assert tracker.update(frame("e1g1", "e8c8", root=root)) == ["e8c8"]
+    assert tracker.fen().split()[2] == "-"
+
+
+def test_en_passant_capture():
+    tracker = tracker_after("e2e4", "a7a6", "e4e5", "d7d5")
+    assert tracker.fen().split()[3] == "d6"
+    assert tracker.update(frame("e2e4", "a7a6", "e4e5", "d7d5", "e5d6")) == ["e5d6"]
+    assert tracker.fen().startswith("rnbqkbnr/1pp1pppp/p2P4/8/8/8/PPPP1PPP/RNBQKBNR b")
+
+
+def test_single_misread_frame_is_ignored():
+    tracker = tracker_after("e2e4")
+    assert tracker.update("8/8/8/8/8/8/8/K6k w - - 0 1") is None
+    assert tracker.update(frame("e2e4", "e7e5")) == ["e7e5"]
+    assert tracker.history() == (STARTING_FEN, ("e2e4", "e7e5"))
+
+
+def test_resyncs_after_repeated_unmatched_frames():
+    tracker = tracker_after("e2e4", "e7e5")
+    other = "4k3/8/8/8/8/8/4P3/4K3 w - - 0 1"
+    assert tracker.update(other) is None
+    assert tracker.update(other) == []
+    root_fen, moves = tracker.history()
+    assert root_fen.split()[0] == "4k3/8/8/8/8/8/4P3/4K3" and moves == ()
+    assert tracker.update(frame("e2e4", root=other)) == ["e2e4"]
+
+
+def test_new_game_resyncs_to_startpos():
+    tracker = tracker_after("e2e4", "e7e5", "g1f3")
+    assert tracker.update(frame()) is None
+    assert tracker.update(frame()) == []
+    assert tracker.history() == (STARTING_FEN, ())
+    assert engine_position(*tracker.history()) == "startpos"
+    assert tracker.update(frame("d2d4")) == ["d2d4"]
+    assert engine_position(*tracker.history()) == "startpos moves d2d4"
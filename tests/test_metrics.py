@@ -0,0 +1,89 @@
+import re
+
+import pytest
+
+from utils.metrics import (
+    BUCKET_COUNT,
+    SUB_BUCKETS,
+    Histogram,
+    MetricsRegistry,
+    _bucket_index,
+    _bucket_value,
+    format_stats,
+)
+
+
+def test_small_values_have_exact_buckets():
+    for value in range(2 * SUB_BUCKETS):
+        assert _bucket_value(_bucket_index(value)) == value
+
+
+@pytest.mark.parametrize("value", [64, 65, 100, 1000, 12345, 999_999, 2 ** 30 + 7])
+def test_bucket_bounds_value_within_resolution(value):
+    index = _bucket_index(value)
+    upper = _bucket_value(index)
+    assert _bucket_value(index - 1) < value <= upper
+    assert (upper - value) / value < 1 / SUB_BUCKETS
+
+
+def test_bucket_index_is_monotonic_and_clamped():
+    indices = [_bucket_index(v) for v in range(0, 200_000, 7)]
+    assert indices == sorted(indices)
+    assert _bucket_index(2 ** 60) == BUCKET_COUNT - 1
+
+
+def test_percentiles_of_uniform_samples():
+    histogram = Histogram()
+    for ms in range(1, 1001):
+        histogram.record(ms / 1000)
+    p = histogram.percentiles((0.5, 0.95, 0.99, 1.0))
+    for q, exact in ((0.5, 0.5), (0.95, 0.95), (0.99, 0.99), (1.0, 1.0)):
+        assert exact <= p[q] <= exact * (1 + 1 / SUB_BUCKETS)
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 1000
+    assert snapshot["max"] == 1.0
+    assert snapshot["sum"] == pytest.approx(500.5)
+
+
+def test_empty_histogram_reports_zero():
+    histogram = Histogram()
+    assert histogram.percentiles() == {0.5: 0.0, 0.95: 0.0, 0.99: 0.0}
+    histogram.record(0.01)
+    histogram.reset()
+    assert histogram.snapshot()["count"] == 0
+
+
+def test_render_prometheus():
+    registry = MetricsRegistry(prefix="test")
+    for _ in range(3):
+        registry.stage("fen").record(0.002)
+    registry.stage("capture").record(0.5)
+    registry.increment("frames", 4)
+
+    lines = registry.render_prometheus().splitlines()
+    assert lines[:2] == ["# HELP test_stage_seconds Time spent in each pipeline stage.",
+                         "# TYPE test_stage_seconds summary"]
+    # Stages are sorted; each has its quantiles, then _sum and _count.
+    assert re.fullmatch(r'test_stage_seconds\{stage="capture",quantile="0.5"\} 0\.5\d{5}', lines[2])
+    assert lines[5:7] == ['test_stage_seconds_sum{stage="capture"} 0.500000',
+                          'test_stage_seconds_count{stage="capture"} 1']
+    assert re.fullmatch(r'test_stage_seconds\{stage="fen",quantile="0.99"\} 0\.002\d{3}', lines[9])
+    assert lines[10:12] == ['test_stage_seconds_sum{stage="fen"} 0.006000',
+                            'test_stage_seconds_count{stage="fen"} 3']
+    assert lines[12:] == [
+        "# HELP test_stage_seconds_max Slowest observation of each stage.",
+        "# TYPE test_stage_seconds_max gauge",
+        'test_stage_seconds_max{stage="capture"} 0.500000',
+        'test_stage_seconds_max{stage="fen"} 0.002000',
+        "# TYPE test_frames_total counter",
+        "test_frames_total 4",
+    ]
+
+
+def test_format_stats_table():
+    registry = MetricsRegistry()
+    registry.stage("engine").record(0.25)
+    header, row = format_stats(registry).splitlines()
+    assert header.split() == ["stage", "n", "p50", "p95", "p99"]
+    assert row.split()[:2] == ["engine", "1"]
+    assert row.split()[2].endswith("ms")
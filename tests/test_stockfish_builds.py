@@ -0,0 +1,101 @@
+import io
+import os
+import tarfile
+
+import pytest
+
+from utils import stockfish_builds
+from utils import chess_resources_manager as resources
+from utils.stockfish_builds import X86_VARIANTS, rank_builds
+
+CANDIDATES = [(variant, variant) for variant, _ in X86_VARIANTS]
+
+
+def ranked(cpu_flags, detectable=None):
+    return [variant for variant, _ in rank_builds(CANDIDATES, cpu_flags, detectable)]
+
+
+def test_known_flags_filter_builds():
+    assert ranked({"sse4_1", "popcnt", "avx2"}) == ["x86-64-avx2", "x86-64-sse41-popcnt", "x86-64-modern", "x86-64"]
+
+
+def test_unknown_flags_keep_everything():
+    assert ranked(None) == [variant for variant, _ in X86_VARIANTS]
+
+
+def test_undetectable_flags_left_to_the_bench():
+    # What Windows reports for an AVX2 CPU: no BMI2/VNNI bits at all.
+    builds = ranked({"sse4_1", "popcnt", "avx2"}, detectable={"sse4_1", "avx2", "avx512f", "popcnt"})
+    assert builds[:3] == ["x86-64-vnni256", "x86-64-avxvnni", "x86-64-bmi2"]
+    # A detectable flag that is missing still rules a build out.
+    assert "x86-64-avx512" not in builds and "x86-64-vnni512" not in builds
+
+
+def test_vnni_variants_differ():
+    flags = dict(X86_VARIANTS)
+    assert flags["x86-64-vnni256"] != flags["x86-64-vnni512"]
+
+GOOD = b"#!/bin/sh\necho 'Nodes searched  : 1234'\n"
+BAD = b"#!/bin/sh\nexit 132\n"
+
+
+def _add(archive, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mode = 0o755
+    archive.addfile(info, io.BytesIO(data))
+
+
+@pytest.fixture
+def release(tmp_path, monkeypatch):
+    monkeypatch.setattr(stockfish_builds, "get_cpu_flags", lambda: None)
+    source = tmp_path / "stockfish.tar"
+    with tarfile.open(source, "w") as archive:
+        _add(archive, "stockfish/stockfish-ubuntu-x86-64-vnni512", BAD)
+        _add(archive, "stockfish/stockfish-ubuntu-x86-64-avx2", GOOD)
+    script_dir = tmp_path / "src"
+    script_dir.mkdir()
+    return source, script_dir
+
+
+@pytest.mark.skipif(os.name == "nt", reason="shell-script stand-ins for Stockfish")
+def test_selected_build_replaces_target_after_bench(release):
+    source, script_dir = release
+    path = stockfish_builds.select_stockfish_build(source, script_dir, "stockfish")
+    assert path == str(script_dir / "stockfish")
+    assert (script_dir / "stockfish").read_bytes() == GOOD
+    # Candidates that failed the bench are cleaned up.
+    assert sorted(p.name for p in script_dir.iterdir()) == ["stockfish", stockfish_builds.CACHE_FILE]
+
+
+@pytest.mark.skipif(os.name == "nt", reason="shell-script stand-ins for Stockfish")
+def test_failed_selection_keeps_installed_binary(release, monkeypatch):
+    source, script_dir = release
+    installed = script_dir / "stockfish"
+    installed.write_bytes(b"user's own build")
+    monkeypatch.setattr(stockfish_builds, "verify_build", lambda path, timeout=30: False)
+    assert stockfish_builds.select_stockfish_build(source, script_dir, "stockfish") is None
+    assert installed.read_bytes() == b"user's own build"
+    assert sorted(p.name for p in script_dir.iterdir()) == ["stockfish"]
+
+
+@pytest.mark.skipif(os.name == "nt", reason="shell-script stand-ins for Stockfish")
+def test_first_run_probe_is_deferred(release, monkeypatch):
+    source, script_dir = release
+    benched = []
+    verify = stockfish_builds.verify_build
+    monkeypatch.setattr(stockfish_builds, "verify_build", lambda path, timeout=30: benched.append(path) or verify(path))
+    monkeypatch.setattr(resources, "which", lambda name: None)
+    monkeypatch.delenv("CHESSPILOT_ENGINE", raising=False)
+    monkeypatch.delenv("STOCKFISH_PATH", raising=False)
+    monkeypatch.setenv("ONNX_PATH", str(source))
+
+    assert resources.setup_resources(str(script_dir), str(source.parent), probe_builds=False)
+    assert benched == [] and "STOCKFISH_PATH" not in os.environ
+
+    assert resources.select_pending_stockfish_build() == str(script_dir / "stockfish")
+    assert os.environ["STOCKFISH_PATH"] == str(script_dir / "stockfish")
+    # Later starts find the cached choice without a probe.
+    benched.clear()
+    assert resources.setup_resources(str(script_dir), str(source.parent), probe_builds=False)
+    assert benched == [] and resources.select_pending_stockfish_build() == str(script_dir / "stockfish")
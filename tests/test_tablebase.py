@@ -0,0 +1,119 @@
+"""
+Tablebase range checks against a small local table set.
+
+Empty *.rtbw files stand in for the tables when only their presence
+matters. The probing tests need real tables: point SYZYGY_TEST_PATH at a
+directory holding at least KQvK and KRvK (the 3-4-5 set works).
+"""
+import os
+import importlib
+
+import pytest
+
+from executor import tablebase
+
+# The package re-exports the get_best_move function under the module's name.
+best_move_module = importlib.import_module("executor.get_best_move")
+
+REAL_TABLES = os.environ.get("SYZYGY_TEST_PATH")
+
+KQVK = "8/8/8/4k3/8/8/3QK3/8 w - - 0 1"
+KRVK = "8/8/8/4k3/8/8/3RK3/8 w - - 0 1"
+KRPVKR = "8/8/3rk3/8/8/4P3/3RK3/8 w - - 0 1"
+
+
+@pytest.fixture
+def tables(tmp_path, monkeypatch):
+    """A SYZYGY_PATH holding empty KQvK and KRPvKR tables."""
+    for name in ("KQvK", "KRPvKR"):
+        (tmp_path / f"{name}.rtbw").touch()
+    monkeypatch.setenv("SYZYGY_PATH", str(tmp_path))
+    tablebase._tables_cache.clear()
+    yield tmp_path
+    tablebase._tables_cache.clear()
+
+
+def test_table_names_cover_both_sides():
+    assert tablebase.table_names(KRPVKR) == ("KRPvKR", "KRvKRP")
+    assert tablebase.table_names("8/8/8/4k3/8/8/3qK3/8 b - - 0 1") == ("KvKQ", "KQvK")
+
+
+def test_max_pieces_from_present_tables(tables):
+    assert tablebase.syzygy_max_pieces(str(tables)) == 5
+
+
+def test_in_range_only_with_the_material_table(tables):
+    assert tablebase.in_tablebase_range(KQVK)
+    assert tablebase.in_tablebase_range(KRPVKR)
+    # Three pieces, well under the 5-piece maximum, but no KRvK table.
+    assert not tablebase.in_tablebase_range(KRVK)
+
+
+def test_in_range_without_tables(monkeypatch):
+    monkeypatch.delenv("SYZYGY_PATH", raising=False)
+    assert not tablebase.in_tablebase_range(KQVK)
+
+
+class _Supervisor:
+    def __init__(self):
+        self.go = []
+
+    def search(self, position, go, *args, **kwargs):
+        self.go.append(go)
+        return {"best_move": "d2d1", "mate_flag": False}
+
+
+class _Scheduler:
+    def __init__(self, supervisor):
+        self.supervisor = supervisor
+
+    def submit(self, job, **kwargs):
+        from concurrent.futures import Future
+        future = Future()
+        future.set_result(job(self.supervisor))
+        return future
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    supervisor = _Supervisor()
+    monkeypatch.setattr(best_move_module, "_initialize_stockfish", lambda: _Scheduler(supervisor))
+    monkeypatch.setattr(best_move_module, "probe_best_move", lambda fen: None)
+    monkeypatch.delenv("CHESSPILOT_OPENING_INDEX", raising=False)
+    best_move_module._result_cache.clear()
+    yield supervisor
+    best_move_module._result_cache.clear()
+
+
+def test_depth_capped_when_the_table_exists(tables, engine):
+    best_move_module.get_best_move(22, KQVK)
+    assert engine.go == [f"depth {tablebase.TABLEBASE_SEARCH_DEPTH}"]
+
+
+def test_depth_kept_when_the_table_is_missing(tables, engine):
+    before = tablebase.get_tablebase_stats()["engine_shortcuts"]
+    best_move_module.get_best_move(22, KRVK)
+    assert engine.go == ["depth 22"]
+    assert tablebase.get_tablebase_stats()["engine_shortcuts"] == before
+
+
+@pytest.mark.skipif(not REAL_TABLES, reason="SYZYGY_TEST_PATH not set")
+def test_probe_finds_the_winning_move(monkeypatch):
+    pytest.importorskip("chess.syzygy")
+    monkeypatch.setenv("SYZYGY_PATH", REAL_TABLES)
+    tablebase.close_tablebase()
+    # Qa8 mates at once; every other queen move only keeps the win.
+    best_move, updated_fen, mate_flag = tablebase.probe_best_move("7k/8/6K1/8/8/8/8/Q7 w - - 0 1")
+    assert best_move == "a1a8"
+    assert mate_flag
+    tablebase.close_tablebase()
+
+
+@pytest.mark.skipif(not REAL_TABLES, reason="SYZYGY_TEST_PATH not set")
+def test_probe_returns_none_for_missing_material(monkeypatch):
+    pytest.importorskip("chess.syzygy")
+    monkeypatch.setenv("SYZYGY_PATH", REAL_TABLES)
+    tablebase.close_tablebase()
+    # Seven pieces: beyond any 3-4-5 set.
+    assert tablebase.probe_best_move("8/8/3rk3/2n5/8/4P3/2NRK3/8 w - - 0 1") is None
+    tablebase.close_tablebase()